@@ -0,0 +1,61 @@
+"""Baseline schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+The user and activity tables as the old create_all() startup created them.
+Those databases already have this schema: mark them with `alembic stamp 0001`,
+run `alembic upgrade head`, then fill the rollup and tag tables added by later
+revisions from the existing activities with `python rebuild_rollups.py`.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+activity_type = sa.Enum("WORK", "STUDY", "EXERCISE", "LEISURE", "OTHER", name="activitytype")
+
+
+def upgrade():
+    op.create_table(
+        "user",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("full_name", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("is_superuser", sa.Boolean(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_user_email", "user", ["email"], unique=True)
+
+    op.create_table(
+        "activity",
+        sa.Column("title", sa.String(length=200), nullable=False),
+        sa.Column("activity_type", activity_type, nullable=False),
+        sa.Column("duration_minutes", sa.Integer(), nullable=False),
+        sa.Column("description", sa.String(length=1000), nullable=True),
+        sa.Column("tags", sa.JSON(), nullable=True),
+        sa.Column("date", sa.DateTime(), nullable=False),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("idx_user_date", "activity", ["user_id", "date"])
+    op.create_index("ix_activity_user_id", "activity", ["user_id"])
+    op.create_index("idx_activity_type", "activity", ["activity_type"])
+
+
+def downgrade():
+    op.drop_table("activity")
+    op.drop_table("user")
+    activity_type.drop(op.get_bind(), checkfirst=True)
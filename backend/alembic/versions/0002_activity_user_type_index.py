@@ -0,0 +1,26 @@
+"""Index activity type filters per user
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+Every type filter (list, export, bulk selections) is scoped to one user and
+ordered or ranged by date, which the global idx_activity_type cannot serve.
+
+"""
+from app.core.migrations import create_index_online, drop_index_online
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    create_index_online("idx_user_type_date", "activity", ["user_id", "activity_type", "date"])
+    drop_index_online("idx_activity_type", "activity")
+
+
+def downgrade():
+    create_index_online("idx_activity_type", "activity", ["activity_type"])
+    drop_index_online("idx_user_type_date", "activity")
@@ -0,0 +1,39 @@
+"""Daily rollups of activity minutes and counts
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+Stats read per-day totals from this table instead of scanning activity.
+Rows are written with each activity change; on databases that already hold
+activities, fill it with `python rebuild_rollups.py`.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# Created with the activity table in 0001.
+activity_type = postgresql.ENUM("WORK", "STUDY", "EXERCISE", "LEISURE", "OTHER", name="activitytype", create_type=False)
+
+
+def upgrade():
+    op.create_table(
+        "user_daily_rollup",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("activity_type", activity_type, nullable=False),
+        sa.Column("minutes", sa.Integer(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("user_id", "day", "activity_type"),
+    )
+
+
+def downgrade():
+    op.drop_table("user_daily_rollup")
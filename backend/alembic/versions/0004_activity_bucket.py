@@ -0,0 +1,41 @@
+"""Weekly and monthly analytics buckets per tag and type
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+Keyed so a series for one user, granularity and tag reads a contiguous
+range of buckets. Filled by `python rebuild_rollups.py` on databases that
+already hold activities.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# Created with the activity table in 0001.
+activity_type = postgresql.ENUM("WORK", "STUDY", "EXERCISE", "LEISURE", "OTHER", name="activitytype", create_type=False)
+
+
+def upgrade():
+    op.create_table(
+        "activity_bucket",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("granularity", sa.String(length=5), nullable=False),
+        sa.Column("tag", sa.String(), nullable=False),
+        sa.Column("bucket", sa.Date(), nullable=False),
+        sa.Column("activity_type", activity_type, nullable=False),
+        sa.Column("minutes", sa.Integer(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("user_id", "granularity", "tag", "bucket", "activity_type"),
+    )
+
+
+def downgrade():
+    op.drop_table("activity_bucket")
@@ -0,0 +1,38 @@
+"""Index activity tags in their own table
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+Tag filters look up (user_id, tag) here instead of scanning the JSON tags of
+every activity. Filled by `python rebuild_rollups.py` on databases that
+already hold activities.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.migrations import create_index_online, drop_index_online
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "activity_tag",
+        sa.Column("activity_id", sa.Integer(), nullable=False),
+        sa.Column("tag", sa.String(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["activity_id"], ["activity.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("activity_id", "tag"),
+    )
+    create_index_online("idx_activity_tag_user_tag", "activity_tag", ["user_id", "tag"])
+
+
+def downgrade():
+    drop_index_online("idx_activity_tag_user_tag", "activity_tag")
+    op.drop_table("activity_tag")
@@ -0,0 +1,82 @@
+"""Full-text search over activity titles and descriptions
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+On PostgreSQL, adding the stored generated column rewrites the activity
+table under an exclusive lock; schedule it like any other table rewrite. The
+GIN index is then built concurrently.
+
+"""
+from alembic import op
+
+from app.core.config import settings
+from app.core.migrations import create_index_online, drop_index_online
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+# PostgreSQL: a stored tsvector generated from title (weight A) and
+# description (weight B), indexed with GIN. SQLite: an external-content FTS5
+# table kept in sync by triggers.
+POSTGRESQL_SEARCH = (
+    f"""
+    ALTER TABLE activity ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{settings.search_config}'::regconfig, coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('{settings.search_config}'::regconfig, coalesce(description, '')), 'B')
+    ) STORED
+    """,
+)
+
+SQLITE_SEARCH = (
+    """
+    CREATE VIRTUAL TABLE activity_fts USING fts5(
+        title, description,
+        content='activity', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER activity_fts_insert AFTER INSERT ON activity BEGIN
+        INSERT INTO activity_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER activity_fts_delete AFTER DELETE ON activity BEGIN
+        INSERT INTO activity_fts(activity_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER activity_fts_update AFTER UPDATE OF title, description ON activity BEGIN
+        INSERT INTO activity_fts(activity_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO activity_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    # Index the activities that existed before the table did.
+    "INSERT INTO activity_fts(activity_fts) VALUES ('rebuild')",
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for statement in {"postgresql": POSTGRESQL_SEARCH, "sqlite": SQLITE_SEARCH}.get(dialect, ()):
+        op.execute(statement)
+    if dialect == "postgresql":
+        create_index_online("idx_activity_search", "activity", ["search_vector"], postgresql_using="gin")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        drop_index_online("idx_activity_search", "activity")
+        op.execute("ALTER TABLE activity DROP COLUMN search_vector")
+    elif dialect == "sqlite":
+        for trigger in ("activity_fts_insert", "activity_fts_delete", "activity_fts_update"):
+            op.execute(f"DROP TRIGGER {trigger}")
+        op.execute("DROP TABLE activity_fts")
@@ -0,0 +1,25 @@
+"""Per-user time zone
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+
+Existing users get UTC, the zone every day boundary used before.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("user", sa.Column("timezone", sa.String(length=64), nullable=False, server_default="UTC"))
+
+
+def downgrade():
+    with op.batch_alter_table("user") as batch:
+        batch.drop_column("timezone")
@@ -0,0 +1,27 @@
+"""Write-behind journal checkpoints
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "write_behind_checkpoint",
+        sa.Column("journal", sa.String(length=255), nullable=False),
+        sa.Column("seq", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("journal"),
+    )
+
+
+def downgrade():
+    op.drop_table("write_behind_checkpoint")
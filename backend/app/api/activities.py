@@ -1,56 +1,271 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import tuple_
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List, Optional
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 
-from app.core.database import get_session
-from app.models.activity import Activity, ActivityType, ActivityCreate, ActivityUpdate
+from app.core.budget import QueryBudget
+from app.core.cache import cache
+from app.core.conditional import freshness
+from app.core.config import settings
+from app.core.database import get_async_session
+from app.core.responses import negotiate
+from app.models.activity import Activity, ActivityType, ActivityCreate, ActivityUpdate, to_utc
+from app.schemas.activity import ACTIVITY_READ_COLUMNS, ActivityBulkUpdate, ActivityRead, ActivitySelection
+from app.services.admission import admitted_stream
 from app.services.auth import get_current_user
+from app.services.dates import user_zone, within_local_days
+from app.services.events import stats_events
+from app.services.export import MEDIA_TYPES, export_query, stream_export
+from app.services.ingest import InvalidRow, UnsupportedMediaType, ingest_activities
+from app.services.mutations import TooManyActivities, bulk_delete_activities, bulk_update_activities
+from app.services.pagination import decode_cursor, decode_rank_cursor, encode_cursor, encode_rank_cursor
+from app.services.rollup import (
+    locked_user_zone,
+    record_activity_created,
+    record_activity_deleted,
+    record_activity_updated,
+    rollup_snapshot,
+)
+from app.services.routing import get_read_session
+from app.services.search import search_activities
+from app.services.tags import forget_activity_tags, record_activity_tags, tagged_activity_ids
+from app.services import write_behind as write_behind_service
 
 router = APIRouter()
 
-@router.post("/", response_model=Activity, status_code=status.HTTP_201_CREATED)
-def create_activity(
+@router.post("/", response_model=Activity, status_code=status.HTTP_201_CREATED, dependencies=[Depends(QueryBudget(9))])
+async def create_activity(
     activity_data: ActivityCreate,
-    session: Session = Depends(get_session),
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
     current_user = Depends(get_current_user)
 ):
+    # Clients that can tolerate a short delay before the activity shows up
+    # in reads opt into write-behind per request; the 202 carries the
+    # journal sequence instead of a database id.
+    if settings.write_behind_enabled and "respond-async" in request.headers.get("prefer", ""):
+        sequence = await write_behind_service.write_behind.submit(current_user.id, activity_data)
+        return ORJSONResponse(
+            {"queued": True, "sequence": sequence, "activity": activity_data.model_dump(mode="json")},
+            status_code=status.HTTP_202_ACCEPTED,
+            headers={"Preference-Applied": "respond-async"}
+        )
+    
     activity = Activity(
         **activity_data.dict(),
         user_id=current_user.id,
         updated_at=datetime.now(timezone.utc)
     )
     
+    zone = await session.run_sync(locked_user_zone, current_user.id)
     session.add(activity)
-    session.commit()
-    session.refresh(activity)
+    await session.run_sync(record_activity_tags, activity)
+    await session.run_sync(record_activity_created, activity, zone)
+    await session.commit()
+    await cache.bump_user_version(current_user.id)
+    await stats_events.publish(current_user.id)
+    await session.refresh(activity)
     return activity
 
-@router.get("/", response_model=List[Activity])
-def get_activities(
-    skip: int = 0,
-    limit: int = 100,
+@router.post("/bulk", dependencies=[Depends(QueryBudget(2))])
+async def bulk_create_activities(
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
+    current_user = Depends(get_current_user)
+):
+    user_id = current_user.id
+    try:
+        result = await ingest_activities(request, session, user_id)
+    except UnsupportedMediaType as e:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Unsupported content type: {e}"
+        )
+    except InvalidRow as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    if result["inserted"]:
+        await cache.bump_user_version(user_id)
+        await stats_events.publish(user_id)
+    
+    return result
+
+@router.patch("/bulk", dependencies=[Depends(QueryBudget(10))])
+async def bulk_update_user_activities(
+    changes: ActivityBulkUpdate,
+    session: AsyncSession = Depends(get_async_session),
+    current_user = Depends(get_current_user)
+):
+    try:
+        updated = await session.run_sync(bulk_update_activities, current_user.id, changes)
+    except TooManyActivities as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if updated:
+        await cache.bump_user_version(current_user.id)
+        await stats_events.publish(current_user.id)
+    
+    return {"updated": updated}
+
+@router.delete("/bulk", dependencies=[Depends(QueryBudget(9))])
+async def bulk_delete_user_activities(
+    selection: ActivitySelection,
+    session: AsyncSession = Depends(get_async_session),
+    current_user = Depends(get_current_user)
+):
+    try:
+        deleted = await session.run_sync(bulk_delete_activities, current_user.id, selection)
+    except TooManyActivities as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if deleted:
+        await cache.bump_user_version(current_user.id)
+        await stats_events.publish(current_user.id)
+    
+    return {"deleted": deleted}
+
+@router.get("/", response_model=List[ActivityRead], response_class=ORJSONResponse, dependencies=[Depends(QueryBudget(3))])
+async def get_activities(
+    request: Request,
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=1000),
     activity_type: Optional[ActivityType] = None,
-    session: Session = Depends(get_session),
+    tag: Optional[str] = None,
+    day: Optional[date] = None,
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_session),
     current_user = Depends(get_current_user)
 ):
-    query = select(Activity).where(Activity.user_id == current_user.id)
+    validators = await freshness(request, current_user.id)
+    if validators.matches(request):
+        return validators.not_modified()
+    
+    query = select(*ACTIVITY_READ_COLUMNS).where(Activity.user_id == current_user.id)
     
     if activity_type:
         query = query.where(Activity.activity_type == activity_type)
     
-    query = query.offset(skip).limit(limit).order_by(Activity.date.desc())
+    if tag:
+        query = query.where(Activity.id.in_(tagged_activity_ids(current_user.id, tag)))
+    
+    if day:
+        query = query.where(within_local_days(Activity.date, day, day, user_zone(current_user)))
     
-    activities = session.exec(query).all()
-    return activities
+    if cursor:
+        try:
+            cursor_date, cursor_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        query = query.where(tuple_(Activity.date, Activity.id) < tuple_(cursor_date, cursor_id))
+    elif skip:
+        query = query.offset(skip)
+    
+    query = query.order_by(Activity.date.desc(), Activity.id.desc()).limit(limit + 1)
+    
+    activities = [row._asdict() for row in (await session.exec(query)).all()]
+    
+    headers = validators.headers
+    if len(activities) > limit:
+        activities = activities[:limit]
+        last = activities[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last["date"], last["id"])
+    
+    return negotiate(request, activities, headers)
+
+@router.get("/export", dependencies=[Depends(QueryBudget(2))])
+async def export_activities(
+    request: Request,
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    activity_type: Optional[ActivityType] = None,
+    session: AsyncSession = Depends(get_read_session),
+    current_user = Depends(get_current_user)
+):
+    query = export_query(current_user.id, to_utc(start), to_utc(end), activity_type)
+    
+    return admitted_stream(
+        request,
+        stream_export(session, query, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="activities.{format}"'}
+    )
 
-@router.get("/{activity_id}", response_model=Activity)
-def get_activity(
+@router.get("/search", response_model=List[ActivityRead], response_class=ORJSONResponse, dependencies=[Depends(QueryBudget(2))])
+async def search_user_activities(
+    request: Request,
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    activity_type: Optional[ActivityType] = None,
+    tag: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_session),
+    current_user = Depends(get_current_user)
+):
+    validators = await freshness(request, current_user.id)
+    if validators.matches(request):
+        return validators.not_modified()
+    
+    after = None
+    if cursor:
+        try:
+            after = decode_rank_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    
+    try:
+        results = await session.run_sync(
+            search_activities,
+            current_user.id,
+            q,
+            limit + 1,
+            after,
+            to_utc(start),
+            to_utc(end),
+            activity_type,
+            tag
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    headers = validators.headers
+    if len(results) > limit:
+        results = results[:limit]
+        last, rank = results[-1]
+        headers["X-Next-Cursor"] = encode_rank_cursor(rank, last["id"])
+    
+    return negotiate(request, [activity for activity, _ in results], headers)
+
+@router.get("/{activity_id}", response_model=Activity, dependencies=[Depends(QueryBudget(2))])
+async def get_activity(
     activity_id: int,
-    session: Session = Depends(get_session),
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_read_session),
     current_user = Depends(get_current_user)
 ):
-    activity = session.get(Activity, activity_id)
+    validators = await freshness(request, current_user.id)
+    if validators.matches(request):
+        return validators.not_modified()
+    
+    activity = await session.get(Activity, activity_id)
     
     if not activity or activity.user_id != current_user.id:
         raise HTTPException(
@@ -58,16 +273,19 @@ def get_activity(
             detail="Activity not found"
         )
     
+    response.headers.update(validators.headers)
     return activity
 
-@router.put("/{activity_id}", response_model=Activity)
-def update_activity(
+@router.put("/{activity_id}", response_model=Activity, dependencies=[Depends(QueryBudget(8))])
+async def update_activity(
     activity_id: int,
     activity_update: ActivityUpdate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user = Depends(get_current_user)
 ):
-    activity = session.get(Activity, activity_id)
+    # Locked so concurrent writes to the row apply their rollup deltas
+    # against the state the other one committed.
+    activity = await session.get(Activity, activity_id, with_for_update=True)
     
     if not activity or activity.user_id != current_user.id:
         raise HTTPException(
@@ -75,23 +293,32 @@ def update_activity(
             detail="Activity not found"
         )
     
-    for key, value in activity_update.dict(exclude_unset=True).items():
+    zone = await session.run_sync(locked_user_zone, current_user.id)
+    previous = rollup_snapshot(activity, zone)
+    
+    updates = activity_update.dict(exclude_unset=True)
+    for key, value in updates.items():
         setattr(activity, key, value)
     
     activity.updated_at = datetime.now(timezone.utc)
     session.add(activity)
-    session.commit()
-    session.refresh(activity)
+    if "tags" in updates:
+        await session.run_sync(record_activity_tags, activity)
+    await session.run_sync(record_activity_updated, previous, activity, zone)
+    await session.commit()
+    await cache.bump_user_version(current_user.id)
+    await stats_events.publish(current_user.id)
+    await session.refresh(activity)
     
     return activity
 
-@router.delete("/{activity_id}")
-def delete_activity(
+@router.delete("/{activity_id}", dependencies=[Depends(QueryBudget(7))])
+async def delete_activity(
     activity_id: int,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user = Depends(get_current_user)
 ):
-    activity = session.get(Activity, activity_id)
+    activity = await session.get(Activity, activity_id, with_for_update=True)
     
     if not activity or activity.user_id != current_user.id:
         raise HTTPException(
@@ -99,7 +326,12 @@ def delete_activity(
             detail="Activity not found"
         )
     
-    session.delete(activity)
-    session.commit()
+    zone = await session.run_sync(locked_user_zone, current_user.id)
+    await session.run_sync(forget_activity_tags, activity)
+    await session.delete(activity)
+    await session.run_sync(record_activity_deleted, activity, zone)
+    await session.commit()
+    await cache.bump_user_version(current_user.id)
+    await stats_events.publish(current_user.id)
     
     return {"message": "Activity deleted successfully"}
\ No newline at end of file
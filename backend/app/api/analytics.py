@@ -0,0 +1,88 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import ORJSONResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+from datetime import date, timedelta
+from typing import Optional
+
+from app.core.budget import QueryBudget
+from app.core.cache import cache
+from app.core.conditional import freshness
+from app.core.responses import negotiate
+from app.services.analytics import MAX_BUCKETS, compute_series, count_buckets
+from app.services.auth import get_current_user
+from app.services.dates import local_today, user_zone
+from app.services.routing import get_read_session
+
+router = APIRouter(default_response_class=ORJSONResponse)
+
+DEFAULT_SPANS = {
+    "day": timedelta(days=29),
+    "week": timedelta(weeks=11),
+    "month": timedelta(days=334),
+}
+
+async def _series(
+    request: Request,
+    granularity: str,
+    start: Optional[date],
+    end: Optional[date],
+    tag: Optional[str],
+    session: AsyncSession,
+    current_user
+):
+    end = end or local_today(user_zone(current_user))
+    start = start or end - DEFAULT_SPANS[granularity]
+    if start > end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must not be after end")
+    if count_buckets(start, end, granularity) > MAX_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range too large: at most {MAX_BUCKETS} buckets per request"
+        )
+    
+    validators = await freshness(request, current_user.id, start, end)
+    if validators.matches(request):
+        return validators.not_modified()
+    
+    async def compute():
+        return await session.run_sync(compute_series, current_user.id, granularity, start, end, tag)
+    
+    series = await cache.get_or_compute(
+        current_user.id,
+        f"series:{granularity}:{start.isoformat()}:{end.isoformat()}:{tag or ''}",
+        compute
+    )
+    return negotiate(request, series, validators.headers)
+
+@router.get("/daily", dependencies=[Depends(QueryBudget(2))])
+async def get_daily_series(
+    request: Request,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    tag: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_session),
+    current_user = Depends(get_current_user)
+):
+    return await _series(request, "day", start, end, tag, session, current_user)
+
+@router.get("/weekly", dependencies=[Depends(QueryBudget(2))])
+async def get_weekly_series(
+    request: Request,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    tag: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_session),
+    current_user = Depends(get_current_user)
+):
+    return await _series(request, "week", start, end, tag, session, current_user)
+
+@router.get("/monthly", dependencies=[Depends(QueryBudget(2))])
+async def get_monthly_series(
+    request: Request,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    tag: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_session),
+    current_user = Depends(get_current_user)
+):
+    return await _series(request, "month", start, end, tag, session, current_user)
@@ -1,49 +1,63 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from app.models.user import User, UserCreate, UserRead
-from app.services.auth import get_password_hash, verify_password, create_access_token
-from app.core.database import get_session
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models.user import User, UserCreate, UserPreferences, UserRead
+from app.services.auth import get_current_user, get_password_hash, verify_and_update_password, create_access_token
+from app.services.dates import user_zone
+from app.services.events import stats_events
+from app.services.hashing import hashing_pool
+from app.services.rollup import rebuild_rollups
+from app.core.budget import QueryBudget
+from app.core.cache import cache
+from app.core.database import get_async_session
 from datetime import timedelta
 
 router = APIRouter()
 
-@router.post("/register", response_model=UserRead)
-def register_user(user_data: UserCreate, db: Session = Depends(get_session)):
+@router.post("/register", response_model=UserRead, dependencies=[Depends(QueryBudget(4))])
+async def register_user(user_data: UserCreate, db: AsyncSession = Depends(get_async_session)):
     statement = select(User).where(User.email == user_data.email)
-    existing_user = db.exec(statement).first()
+    existing_user = (await db.exec(statement)).first()
     
     if existing_user:
         raise HTTPException(status_code=400, detail="Email já cadastrado")
     
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hashing_pool.run(get_password_hash, user_data.password)
     
     db_user = User(
         email=user_data.email,
         hashed_password=hashed_password,
-        full_name=user_data.full_name
+        full_name=user_data.full_name,
+        timezone=user_data.timezone
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
-@router.post("/login")
-def login_user(
+@router.post("/login", dependencies=[Depends(QueryBudget(3))])
+async def login_user(
     email: str,
     password: str,
-    db: Session = Depends(get_session)
+    db: AsyncSession = Depends(get_async_session)
 ):
     statement = select(User).where(User.email == email)
-    user = db.exec(statement).first()
+    user = (await db.exec(statement)).first()
     
     if not user:
         raise HTTPException(status_code=401, detail="Email ou senha incorretos")
     
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await hashing_pool.run(verify_and_update_password, password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=401, detail="Email ou senha incorretos")
     
+    if new_hash:
+        user.hashed_password = new_hash
+        db.add(user)
+        await db.commit()
+    
     access_token_expires = timedelta(days=30)
     access_token = create_access_token(
         user=user,
@@ -58,6 +72,40 @@ def login_user(
             "id": user.id,
             "email": user.email,
             "full_name": user.full_name,
-            "created_at": user.created_at.isoformat() if user.created_at else None
+            "created_at": user.created_at.isoformat() if user.created_at else None,
+            "timezone": user.timezone
         }
-    }
\ No newline at end of file
+    }
+
+@router.get("/me", response_model=UserRead, dependencies=[Depends(QueryBudget(1))])
+async def read_current_user(current_user = Depends(get_current_user)):
+    return current_user
+
+@router.patch("/me", response_model=UserRead, dependencies=[Depends(QueryBudget(12))])
+async def update_current_user(
+    preferences: UserPreferences,
+    db: AsyncSession = Depends(get_async_session),
+    current_user = Depends(get_current_user)
+):
+    user = (await db.exec(select(User).where(User.id == current_user.id).with_for_update())).one()
+    updates = preferences.model_dump(exclude_unset=True, exclude_none=True)
+    timezone_changed = "timezone" in updates and updates["timezone"] != user.timezone
+    
+    for key, value in updates.items():
+        setattr(user, key, value)
+    db.add(user)
+    
+    # Rollups are bucketed by the user's local day, so a new time zone
+    # re-buckets their history and invalidates every cached response. The
+    # rebuild commits together with the new zone, under the row lock, so
+    # readers never see one without the other.
+    if timezone_changed:
+        await db.flush()
+        await db.run_sync(rebuild_rollups, user.id)
+    await db.commit()
+    
+    if timezone_changed:
+        await cache.bump_user_version(user.id)
+        await stats_events.publish(user.id, zone=user_zone(user))
+    
+    return user
\ No newline at end of file
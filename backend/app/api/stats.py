@@ -1,96 +1,104 @@
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, select, func, and_
-from datetime import datetime, timedelta, date, timezone
-from typing import Dict, List
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+from datetime import date, timedelta
+from typing import Optional
 
-from app.core.database import get_session
-from app.models.activity import Activity, ActivityType
-from app.services.auth import get_current_user
+from app.core.budget import QueryBudget
+from app.core.cache import cache
+from app.core.conditional import freshness
+from app.core.config import settings
+from app.core.responses import negotiate
+from app.services.auth import create_stream_token, get_current_user, get_stream_user
+from app.services.dates import local_today, parse_timezone, user_zone
+from app.services.events import stats_events
+from app.services.heatmap import compute_heatmap
+from app.services.routing import get_read_session
+from app.services.stats import cached_user_stats
+from app.services.tags import compute_tag_stats
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
-@router.get("/")
-def get_user_stats(
-    session: Session = Depends(get_session),
+@router.get("/", dependencies=[Depends(QueryBudget(5))])
+async def get_user_stats(
+    request: Request,
+    session: AsyncSession = Depends(get_read_session),
     current_user = Depends(get_current_user)
 ):
-    today = datetime.now(timezone.utc).date()
-    week_ago = today - timedelta(days=7)
+    today = local_today(user_zone(current_user))
+    validators = await freshness(request, current_user.id, today)
+    if validators.matches(request):
+        return validators.not_modified()
     
-    total_activities_query = select(func.count(Activity.id)).where(
-        Activity.user_id == current_user.id
-    )
-    total_activities = session.exec(total_activities_query).first() or 0
-    
-    total_minutes_query = select(func.sum(Activity.duration_minutes)).where(
-        Activity.user_id == current_user.id
-    )
-    total_minutes = session.exec(total_minutes_query).first() or 0
+    stats = await cached_user_stats(session, current_user.id, today)
+    return negotiate(request, stats, validators.headers)
+
+# Server-sent events replacing /stats/ polling. The "stats" event on connect
+# carries the same payload as GET /stats/; after each change and at local
+# midnight a "delta" event carries a JSON merge patch (RFC 7386) against the
+# previous event. Snapshots come from the stats cache and are shared by the
+# user's streams on this worker; the request's own session (used for
+# authentication) is released before streaming starts.
+@router.get("/stream", dependencies=[Depends(QueryBudget(1))])
+async def stream_user_stats(current_user = Depends(get_stream_user)):
+    if stats_events.streams(current_user.id) >= settings.events_max_streams_per_user:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many open stats streams")
     
-    week_minutes_query = select(func.sum(Activity.duration_minutes)).where(
-        and_(
-            Activity.user_id == current_user.id,
-            func.date(Activity.date) >= week_ago
-        )
+    return StreamingResponse(
+        stats_events.stream(current_user.id, user_zone(current_user), settings.events_keepalive_seconds),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
-    week_minutes = session.exec(week_minutes_query).first() or 0
-    
-    activities_by_type = {}
-    for activity_type in ActivityType:
-        type_query = select(func.count(Activity.id)).where(
-            and_(
-                Activity.user_id == current_user.id,
-                Activity.activity_type == activity_type
-            )
-        )
-        count = session.exec(type_query).first() or 0
-        if count > 0:
-            activities_by_type[activity_type.value] = count
+
+@router.post("/stream-token", dependencies=[Depends(QueryBudget(1))])
+async def issue_stream_token(current_user = Depends(get_current_user)):
+    return {"token": create_stream_token(current_user.id), "expires_in": settings.events_token_expire_seconds}
+
+@router.get("/heatmap", dependencies=[Depends(QueryBudget(2))])
+async def get_heatmap(
+    request: Request,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    tz: Optional[str] = None,
+    session: AsyncSession = Depends(get_read_session),
+    current_user = Depends(get_current_user)
+):
+    try:
+        zone = parse_timezone(tz) if tz else user_zone(current_user)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
-    most_frequent_type = max(activities_by_type.items(), key=lambda x: x[1]) if activities_by_type else None
+    end = end or local_today(zone)
+    start = start or end - timedelta(days=364)
+    if start > end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must not be after end")
     
-    recent_activities_query = select(Activity).where(
-        Activity.user_id == current_user.id
-    ).order_by(Activity.date.desc()).limit(5)
-    recent_activities = session.exec(recent_activities_query).all()
+    validators = await freshness(request, current_user.id, zone.key, start, end)
+    if validators.matches(request):
+        return validators.not_modified()
     
-    consecutive_days = 0
-    current_day = today
-    while True:
-        day_query = select(func.count(Activity.id)).where(
-            and_(
-                Activity.user_id == current_user.id,
-                func.date(Activity.date) == current_day
-            )
-        )
-        day_count = session.exec(day_query).first() or 0
-        
-        if day_count > 0:
-            consecutive_days += 1
-            current_day = current_day - timedelta(days=1)
-        else:
-            break
+    async def compute():
+        return await session.run_sync(compute_heatmap, current_user.id, zone, start, end)
     
-    daily_goal = 480
-    daily_minutes_query = select(func.sum(Activity.duration_minutes)).where(
-        and_(
-            Activity.user_id == current_user.id,
-            func.date(Activity.date) == today
-        )
+    heatmap = await cache.get_or_compute(
+        current_user.id,
+        f"heatmap:{zone.key}:{start.isoformat()}:{end.isoformat()}",
+        compute
     )
-    today_minutes = session.exec(daily_minutes_query).first() or 0
-    daily_goal_percentage = min(100, int((today_minutes / daily_goal) * 100)) if daily_goal > 0 else 0
+    return negotiate(request, heatmap, validators.headers)
+
+@router.get("/tags", dependencies=[Depends(QueryBudget(2))])
+async def get_tag_stats(
+    request: Request,
+    session: AsyncSession = Depends(get_read_session),
+    current_user = Depends(get_current_user)
+):
+    validators = await freshness(request, current_user.id)
+    if validators.matches(request):
+        return validators.not_modified()
+    
+    async def compute():
+        return await session.run_sync(compute_tag_stats, current_user.id)
     
-    return {
-        "total_activities": total_activities,
-        "total_minutes": total_minutes,
-        "total_hours": round(total_minutes / 60, 1),
-        "week_minutes": week_minutes,
-        "week_hours": round(week_minutes / 60, 1),
-        "activities_by_type": activities_by_type,
-        "most_frequent_type": most_frequent_type[0] if most_frequent_type else None,
-        "consecutive_days": consecutive_days,
-        "daily_goal_percentage": daily_goal_percentage,
-        "today_minutes": today_minutes,
-        "recent_activities": recent_activities
-    }
\ No newline at end of file
+    tags = await cache.get_or_compute(current_user.id, "tags", compute)
+    return negotiate(request, tags, validators.headers)
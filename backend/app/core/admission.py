@@ -0,0 +1,299 @@
+import asyncio
+import contextvars
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional
+
+import redis
+import redis.asyncio
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .cache import KEY_PREFIX
+from .config import settings
+from .metrics import Counter, registry
+
+logger = logging.getLogger(__name__)
+
+QUERY_CANCELED = "57014"
+
+rejected_requests = registry.register(Counter(
+    "kairoflow_admission_rejected_total", "Requests shed by admission control.", ("route", "reason")))
+
+
+class DeadlineExceeded(RuntimeError):
+    pass
+
+
+# Bounds the requests running at once. Waiters queue in FIFO order for at
+# most the queue timeout, and only max_queue of them may wait, so a spike is
+# answered quickly instead of piling up on the connection pool until every
+# endpoint times out.
+class ConcurrencyLimiter:
+    def __init__(self, limit: int, max_queue: int):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, timeout: float) -> bool:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True
+        if len(self._waiters) >= self.max_queue or timeout <= 0:
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            # The slot may have been handed over just as the timeout fired.
+            return future.done() and not future.cancelled()
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            if future in self._waiters:
+                self._waiters.remove(future)
+
+    def release(self):
+        # The slot passes straight to the oldest live waiter, so active only
+        # drops when nobody is queued.
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(True)
+                return
+        self.active -= 1
+
+
+class MemoryBuckets:
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: int, cost: float) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.pop(key, None) or [float(burst), now]
+        tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / rate
+        self._buckets[key] = [tokens, now]
+        while len(self._buckets) > self.max_entries:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        self._buckets.clear()
+
+
+# The bucket is refilled and debited atomically on the server, using the
+# server's clock so workers with skewed clocks agree.
+TOKEN_BUCKET_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(state[1]) or burst
+local at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - at) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class RedisBuckets:
+    name = "redis"
+
+    def __init__(self, client: "redis.asyncio.Redis"):
+        self.client = client
+        self.script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: int, cost: float) -> float:
+        return float(await self.script(keys=[f"{KEY_PREFIX}:ratelimit:{key}"], args=[rate, burst, cost]))
+
+
+# Per-identity token buckets. Like the cache, Redis shares the buckets
+# across workers when reachable and the in-process buckets take over while
+# it is not, so an outage loosens limits to per-worker instead of failing
+# requests.
+class RateLimiter:
+    def __init__(
+        self,
+        backend: str = "auto",
+        redis_url: Optional[str] = None,
+        rate: float = 20,
+        burst: int = 100,
+        max_entries: int = 10000,
+        retry_interval: float = 30.0,
+    ):
+        self.backend_name = backend
+        self.redis_url = redis_url
+        self.rate = rate
+        self.burst = burst
+        self.retry_interval = retry_interval
+        self.memory = MemoryBuckets(max_entries)
+        self._redis: Optional[RedisBuckets] = None
+        self._redis_retry_at = 0.0
+
+    async def _backend(self):
+        if self.backend_name == "memory" or not self.redis_url:
+            return self.memory
+        if self._redis is not None:
+            return self._redis
+        if time.monotonic() < self._redis_retry_at:
+            return self.memory
+
+        client = redis.asyncio.Redis.from_url(
+            self.redis_url,
+            decode_responses=True,
+            socket_connect_timeout=0.25,
+            socket_timeout=0.25,
+        )
+        try:
+            await client.ping()
+        except redis.RedisError as e:
+            logger.warning("Redis unavailable (%s), rate limiting per process", e)
+            self._redis_retry_at = time.monotonic() + self.retry_interval
+            await client.aclose()
+            return self.memory
+
+        self._redis = RedisBuckets(client)
+        return self._redis
+
+    async def take(self, key: str, cost: float = 1) -> float:
+        # Returns 0 when the request may proceed, otherwise the seconds
+        # until enough tokens are available.
+        backend = await self._backend()
+        if backend is self.memory:
+            return await self.memory.take(key, self.rate, self.burst, cost)
+        try:
+            return await backend.take(key, self.rate, self.burst, cost)
+        except redis.RedisError as e:
+            logger.warning("Redis error (%s), rate limiting per process", e)
+            self._redis = None
+            self._redis_retry_at = time.monotonic() + self.retry_interval
+            return await self.memory.take(key, self.rate, self.burst, cost)
+
+    @property
+    def active_backend(self) -> str:
+        return self._redis.name if self._redis is not None else self.memory.name
+
+
+class Admission:
+    def __init__(self, max_concurrency: int, route_concurrency: Dict[str, int], max_queue: int, queue_timeout: float):
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.route_concurrency = dict(route_concurrency)
+        self.total = ConcurrencyLimiter(max_concurrency, max_queue)
+        self.routes: Dict[str, ConcurrencyLimiter] = {}
+
+    def limiter(self, route: str) -> Optional[ConcurrencyLimiter]:
+        limit = self.route_concurrency.get(route)
+        if limit is None:
+            return None
+        limiter = self.routes.get(route)
+        if limiter is None:
+            limiter = self.routes[route] = ConcurrencyLimiter(limit, self.max_queue)
+        return limiter
+
+    async def acquire(self, route: str) -> Optional[list]:
+        # Route slot first, so requests queued behind a saturated route do
+        # not hold global slots that other routes could use.
+        held = []
+        deadline = time.monotonic() + self.queue_timeout
+        for limiter in (self.limiter(route), self.total):
+            if limiter is None:
+                continue
+            if not await limiter.acquire(deadline - time.monotonic()):
+                for acquired in held:
+                    acquired.release()
+                return None
+            held.append(limiter)
+        return held
+
+
+rate_limiter = RateLimiter(
+    backend=settings.rate_limit_backend,
+    redis_url=settings.redis_url,
+    rate=settings.rate_limit_per_second,
+    burst=settings.rate_limit_burst,
+    max_entries=settings.cache_max_entries,
+)
+
+admission = Admission(
+    settings.max_concurrency,
+    settings.admission_route_concurrency,
+    settings.admission_queue_size,
+    settings.admission_queue_timeout_ms / 1000,
+)
+
+
+@registry.collector
+def collect_admission():
+    for route, limiter in (("*", admission.total), *admission.routes.items()):
+        labels = {"route": route}
+        yield "kairoflow_admission_active", "gauge", "Admitted requests running.", labels, limiter.active
+        yield "kairoflow_admission_queued", "gauge", "Requests waiting for admission.", labels, limiter.waiting
+
+
+# Absolute deadline (time.monotonic()) of the current request.
+current_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("current_deadline", default=None)
+
+
+def remaining_seconds() -> Optional[float]:
+    deadline = current_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def is_deadline_error(error: BaseException) -> bool:
+    return isinstance(error, DeadlineExceeded) or getattr(getattr(error, "orig", None), "sqlstate", None) == QUERY_CANCELED
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _check_deadline(conn, cursor, statement, parameters, context, executemany):
+    remaining = remaining_seconds()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded("Request deadline exceeded before running a SQL statement")
+
+
+@event.listens_for(Engine, "begin")
+def _set_statement_timeout(conn):
+    # Once per transaction, so a statement can run for at most what is
+    # left of the request's deadline. The raw cursor keeps the SET out of
+    # statement metrics and query budgets; SET LOCAL ends with the
+    # transaction, so pooled connections come back clean.
+    remaining = remaining_seconds()
+    if remaining is None or conn.dialect.name != "postgresql":
+        return
+    if remaining <= 0:
+        raise DeadlineExceeded("Request deadline exceeded before starting a transaction")
+
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f"SET LOCAL statement_timeout = {max(1, math.ceil(remaining * 1000))}")
+    finally:
+        cursor.close()
@@ -0,0 +1,139 @@
+import contextvars
+import logging
+import time
+from collections import deque
+from typing import List, Optional
+
+from fastapi import Request
+
+from .config import settings
+from .metrics import Counter, registry, statement_observers
+
+logger = logging.getLogger(__name__)
+
+# Per-endpoint statement budgets. Routes declare their ceiling with
+# dependencies=[Depends(QueryBudget(n))]; statements run by the route and by
+# its other dependencies (authentication included) count against it. An
+# overrun raises QueryBudgetExceeded when QUERY_BUDGET_MODE=raise (the test
+# suite) and is logged otherwise, so an N+1 fails CI instead of surfacing in
+# production latency.
+
+SLOW_QUERY_LOG_SIZE = 100
+
+EXPLAIN_PREFIXES = {
+    "postgresql": "EXPLAIN ",
+    "sqlite": "EXPLAIN QUERY PLAN ",
+}
+
+slow_statements = registry.register(Counter(
+    "kairoflow_sql_slow_statements_total", "SQL statements slower than the slow query threshold.", ("engine",)))
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+class Budget:
+    __slots__ = ("limit", "route", "statements", "slow")
+
+    def __init__(self, limit: int, route: str):
+        self.limit = limit
+        self.route = route
+        self.statements: List[str] = []
+        self.slow: List[dict] = []
+
+
+current_budget: contextvars.ContextVar[Optional[Budget]] = contextvars.ContextVar("current_budget", default=None)
+
+slow_queries: deque = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+
+class QueryBudget:
+    def __init__(self, limit: int):
+        self.limit = limit
+
+    async def __call__(self, request: Request):
+        if settings.query_budget_mode == "off":
+            yield None
+            return
+
+        route = getattr(request.scope.get("route"), "path", request.url.path)
+        budget = Budget(self.limit, f"{request.method} {route}")
+        token = current_budget.set(budget)
+        try:
+            yield budget
+        finally:
+            current_budget.reset(token)
+
+        if len(budget.statements) > budget.limit:
+            message = (
+                f"{budget.route} ran {len(budget.statements)} SQL statements, budget is {budget.limit}:\n"
+                + "\n".join(f"  {statement}" for statement in budget.statements)
+            )
+            if settings.query_budget_mode == "raise":
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+
+def allow(statements: int):
+    # Raises the current request's budget for work that repeats a bounded
+    # number of times by design, such as one round of statements per bulk
+    # chunk, so the route's own budget keeps covering the fixed part.
+    budget = current_budget.get()
+    if budget is not None:
+        budget.limit += statements
+
+
+def _explain(conn, statement: str, parameters) -> Optional[str]:
+    prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+
+    # A fresh DBAPI cursor keeps the original cursor's pending rows intact and
+    # bypasses the engine events. On PostgreSQL a savepoint keeps a failing
+    # EXPLAIN from aborting the caller's transaction.
+    savepoint = conn.dialect.name == "postgresql"
+    cursor = conn.connection.cursor()
+    try:
+        if savepoint:
+            cursor.execute("SAVEPOINT query_budget_explain")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            plan = "\n".join(str(row[-1]) for row in cursor.fetchall())
+        except Exception as e:
+            if savepoint:
+                cursor.execute("ROLLBACK TO SAVEPOINT query_budget_explain")
+            logger.debug("Could not explain slow statement (%s)", e)
+            return None
+        if savepoint:
+            cursor.execute("RELEASE SAVEPOINT query_budget_explain")
+        return plan
+    finally:
+        cursor.close()
+
+
+def _observe_statement(conn, cursor, statement, parameters, executemany, elapsed):
+    budget = current_budget.get()
+    if budget is not None:
+        budget.statements.append(statement)
+
+    threshold = settings.slow_query_ms
+    if not threshold or elapsed * 1000 < threshold:
+        return
+
+    engine = conn.engine.url.get_backend_name()
+    slow_statements.inc(engine)
+    entry = {
+        "route": budget.route if budget is not None else None,
+        "statement": statement,
+        "duration_ms": round(elapsed * 1000, 2),
+        "plan": None if executemany or not settings.slow_query_explain else _explain(conn, statement, parameters),
+        "at": time.time(),
+    }
+    slow_queries.append(entry)
+    if budget is not None:
+        budget.slow.append(entry)
+    logger.warning("Slow SQL statement (%.1f ms) in %s: %s\n%s", entry["duration_ms"], entry["route"], statement, entry["plan"] or "")
+
+
+statement_observers.append(_observe_statement)
@@ -0,0 +1,282 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+import redis
+import redis.asyncio
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "kairoflow"
+
+
+def new_version() -> str:
+    # Millisecond timestamp of the write, then a random part so two writes
+    # in the same millisecond still get distinct versions.
+    return f"{time.time_ns() // 1_000_000:x}.{uuid.uuid4().hex[:16]}"
+
+
+def version_timestamp(version: str) -> Optional[datetime]:
+    try:
+        return datetime.fromtimestamp(int(version.split(".", 1)[0], 16) / 1000, timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+class CacheCounters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def incr(self, name: str, amount: int = 1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def reset(self):
+        with self._lock:
+            self.hits = self.misses = self.evictions = self.errors = 0
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class MemoryBackend:
+    name = "memory"
+
+    def __init__(self, max_entries: int, counters: CacheCounters):
+        self.max_entries = max_entries
+        self.counters = counters
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.counters.incr("evictions")
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None, only_if_missing: bool = False) -> bool:
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            if only_if_missing and key in self._entries:
+                return False
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters.incr("evictions")
+        return True
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend:
+    name = "redis"
+
+    def __init__(self, client: "redis.asyncio.Redis"):
+        self.client = client
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: str, ttl: Optional[int] = None, only_if_missing: bool = False) -> bool:
+        return bool(await self.client.set(key, value, ex=ttl, nx=only_if_missing))
+
+    async def delete(self, key: str):
+        await self.client.delete(key)
+
+    async def clear(self):
+        async for key in self.client.scan_iter(f"{KEY_PREFIX}:*"):
+            await self.client.delete(key)
+
+
+# Entries are keyed by user and by an opaque per-user data version. Every
+# activity write replaces that version, so entries written before the write
+# can no longer be addressed and simply age out. The in-process fallback is
+# only coherent within a single worker, so versions expire with the entries
+# they address: a worker that never saw another worker's write, or a Redis
+# that missed bumps made during an outage, serves a stale version (and so a
+# stale ETag) for at most one TTL. Bumps made during an outage are also
+# replayed once Redis is reachable again.
+class Cache:
+    def __init__(
+        self,
+        backend: str = "auto",
+        redis_url: Optional[str] = None,
+        ttl: int = 300,
+        max_entries: int = 10000,
+        retry_interval: float = 30.0,
+    ):
+        self.backend_name = backend
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self.counters = CacheCounters()
+        self.memory = MemoryBackend(max_entries, self.counters)
+        self._redis: Optional[RedisBackend] = None
+        self._redis_retry_at = 0.0
+        self._missed_bumps: set = set()
+
+    async def _backend(self):
+        if self.backend_name == "memory" or not self.redis_url:
+            return self.memory
+        if self._redis is not None:
+            return self._redis
+        if time.monotonic() < self._redis_retry_at:
+            return self.memory
+
+        client = redis.asyncio.Redis.from_url(
+            self.redis_url,
+            decode_responses=True,
+            socket_connect_timeout=0.25,
+            socket_timeout=0.25,
+        )
+        try:
+            await client.ping()
+        except redis.RedisError as e:
+            logger.warning("Redis unavailable (%s), using in-process cache", e)
+            self._redis_retry_at = time.monotonic() + self.retry_interval
+            await client.aclose()
+            return self.memory
+
+        self._redis = RedisBackend(client)
+        await self._replay_missed_bumps()
+        return self._redis
+
+    async def _replay_missed_bumps(self):
+        missed, self._missed_bumps = self._missed_bumps, set()
+        for user_id in missed:
+            await self.bump_user_version(user_id)
+
+    async def _call(self, method: str, *args, **kwargs):
+        backend = await self._backend()
+        if backend is self.memory:
+            return getattr(self.memory, method)(*args, **kwargs)
+        try:
+            return await getattr(backend, method)(*args, **kwargs)
+        except redis.RedisError as e:
+            logger.warning("Redis error (%s), falling back to in-process cache", e)
+            self.counters.incr("errors")
+            self._redis = None
+            self._redis_retry_at = time.monotonic() + self.retry_interval
+            return getattr(self.memory, method)(*args, **kwargs)
+
+    @property
+    def active_backend(self) -> str:
+        return self._redis.name if self._redis is not None else self.memory.name
+
+    # Whether other workers see the same entries; the in-process fallback
+    # only holds what this worker wrote.
+    @property
+    def shared(self) -> bool:
+        return self._redis is not None
+
+    def _version_key(self, user_id: int) -> str:
+        return f"{KEY_PREFIX}:version:{user_id}"
+
+    async def user_version(self, user_id: int) -> str:
+        key = self._version_key(user_id)
+        version = await self._call("get", key)
+        if version is None:
+            await self._call("set", key, new_version(), ttl=self.ttl, only_if_missing=True)
+            version = await self._call("get", key) or ""
+        return version
+
+    async def bump_user_version(self, user_id: int) -> str:
+        version = new_version()
+        await self._call("set", self._version_key(user_id), version, ttl=self.ttl)
+        if self._redis is None and self.backend_name != "memory" and self.redis_url:
+            self._missed_bumps.add(user_id)
+        return version
+
+    async def get_json(self, key: str) -> Optional[Any]:
+        cached = await self._call("get", key)
+        if cached is None:
+            self.counters.incr("misses")
+            return None
+        self.counters.incr("hits")
+        return json.loads(cached)
+
+    async def set_json(self, key: str, value: Any, ttl: Optional[int] = None):
+        await self._call("set", key, json.dumps(value), ttl=ttl or self.ttl)
+
+    async def delete(self, key: str):
+        await self._call("delete", key)
+        self.memory.delete(key)
+
+    async def get_or_compute(
+        self,
+        user_id: int,
+        name: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None,
+    ) -> Any:
+        key = f"{KEY_PREFIX}:user:{user_id}:{await self.user_version(user_id)}:{name}"
+
+        cached = await self.get_json(key)
+        if cached is not None:
+            return cached
+
+        value = await compute()
+        await self.set_json(key, value, ttl=ttl)
+        return value
+
+    async def clear(self):
+        await self._call("clear")
+        self.memory.clear()
+        self.counters.reset()
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.active_backend,
+            "memory_entries": len(self.memory),
+            **self.counters.as_dict(),
+        }
+
+
+cache = Cache(
+    backend=settings.cache_backend,
+    redis_url=settings.redis_url,
+    ttl=settings.cache_ttl_seconds,
+    max_entries=settings.cache_max_entries,
+)
+
+principal_cache = Cache(
+    backend=settings.cache_backend,
+    redis_url=settings.redis_url,
+    ttl=settings.principal_cache_ttl_seconds,
+    max_entries=settings.principal_cache_max_entries,
+)
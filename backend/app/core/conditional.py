@@ -0,0 +1,53 @@
+import hashlib
+from email.utils import format_datetime
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.cache import cache, version_timestamp
+from app.core.responses import wants_msgpack
+
+
+# Validators for read endpoints, derived from the per-user data version in
+# the cache. The ETag also covers the path, query string, negotiated media
+# type and any extra inputs the route passes (e.g. the current day for
+# payloads relative to "today"). Only If-None-Match produces a 304:
+# Last-Modified follows writes but not those date-relative inputs, so
+# If-Modified-Since is not trusted on its own.
+class Freshness:
+    def __init__(self, etag: str, last_modified: Optional[str]):
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def headers(self) -> dict:
+        headers = {"ETag": self.etag, "Cache-Control": "private, no-cache", "Vary": "Accept"}
+        if self.last_modified:
+            headers["Last-Modified"] = self.last_modified
+        return headers
+
+    def matches(self, request: Request) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if not if_none_match:
+            return False
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or any(tag.removeprefix("W/") == self.etag for tag in candidates)
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers=self.headers)
+
+
+async def freshness(request: Request, user_id: int, *variant) -> Freshness:
+    version = await cache.user_version(user_id)
+    parts = [
+        version,
+        request.url.path,
+        "&".join(sorted(f"{key}={value}" for key, value in request.query_params.multi_items())),
+        "msgpack" if wants_msgpack(request) else "json",
+        *(str(part) for part in variant),
+    ]
+    etag = f'"{hashlib.sha256("|".join(parts).encode()).hexdigest()[:32]}"'
+
+    modified = version_timestamp(version)
+    return Freshness(etag, format_datetime(modified, usegmt=True) if modified else None)
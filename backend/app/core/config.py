@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field, field_validator, SecretStr
+from typing import Dict, List, Optional
 
 class Settings(BaseSettings):
     postgres_host: str = "localhost"
@@ -8,13 +9,100 @@ class Settings(BaseSettings):
     postgres_user: str = "postgres"
     postgres_password: SecretStr
     
+    database_pool_size: int = Field(default=10, ge=1)
+    database_max_overflow: int = Field(default=20, ge=0)
+    database_pool_timeout: float = Field(default=30, gt=0)
+    
+    # Comma-separated SQLAlchemy URLs of read replicas (same driver as the
+    # primary, e.g. postgresql+psycopg://...). Empty means reads use the primary.
+    read_replica_urls: str = ""
+    replica_pool_size: int = Field(default=10, ge=1)
+    replica_max_overflow: int = Field(default=20, ge=0)
+    replica_read_your_writes_seconds: float = Field(default=5, ge=0)
+    replica_health_interval_seconds: float = Field(default=10, gt=0)
+    database_health_cache_seconds: float = Field(default=5, ge=0)
+    
     redis_host: str = "localhost"
     redis_port: int = 6379
     
+    cache_backend: str = Field(default="auto", pattern="^(auto|redis|memory)$")
+    cache_ttl_seconds: int = Field(default=300, ge=1)
+    cache_max_entries: int = Field(default=10000, ge=1)
+    principal_cache_ttl_seconds: int = Field(default=60, ge=1)
+    principal_cache_max_entries: int = Field(default=10000, ge=1)
+    
+    # Live stats pushed over /stats/stream. "redis" fans events out to every
+    # worker through pub/sub; "memory" only reaches streams in this process.
+    events_backend: str = Field(default="memory", pattern="^(memory|redis)$")
+    events_keepalive_seconds: float = Field(default=15, gt=0)
+    events_max_streams_per_user: int = Field(default=10, ge=1)
+    # Browsers (EventSource) cannot send an Authorization header and open
+    # the stream with ?token= from POST /stats/stream-token instead.
+    events_token_expire_seconds: int = Field(default=60, ge=5, le=3600)
+    
     secret_key: SecretStr = Field(min_length=32)
     algorithm: str = "HS256"
     access_token_expire_minutes: int = Field(default=30, ge=5, le=1440)
     
+    hashing_workers: int = Field(default=2, ge=1)
+    hashing_queue_limit: int = Field(default=16, ge=0)
+    
+    bulk_chunk_size: int = Field(default=1000, ge=1)
+    bulk_max_rows: int = Field(default=50000, ge=1)
+    
+    # Opt-in write-behind for creates sent with "Prefer: respond-async":
+    # acknowledged once journaled locally, inserted by a background flusher.
+    # Each worker journals to <path>.<slot>; hosts sharing a database need
+    # distinct paths.
+    write_behind_enabled: bool = False
+    write_behind_journal_path: str = "write_behind.journal"
+    write_behind_batch_size: int = Field(default=500, ge=1)
+    write_behind_flush_interval_ms: int = Field(default=200, ge=1)
+    write_behind_fsync: bool = True
+    
+    search_config: str = Field(default="simple", pattern="^[a-z_]+$")
+    
+    metrics_enabled: bool = True
+    
+    # Admission control, checked before a request touches the database.
+    # Concurrency limits are keyed by "METHOD /route/template"; routes
+    # without an entry share only the global limit, which defaults to the
+    # primary pool's capacity. Waiters beyond the queue, or still waiting
+    # after the queue timeout, get 503; identities over their token bucket
+    # get 429. Deadlines become PostgreSQL's statement_timeout.
+    admission_enabled: bool = True
+    admission_max_concurrency: Optional[int] = Field(default=None, ge=1)
+    admission_route_concurrency: Dict[str, int] = {
+        "GET /stats/": 8,
+        "GET /stats/heatmap": 4,
+        "GET /stats/tags": 4,
+        "GET /analytics/daily": 4,
+        "GET /analytics/weekly": 4,
+        "GET /analytics/monthly": 4,
+        "GET /activities/export": 2,
+        "GET /activities/search": 6,
+        "POST /activities/bulk": 2,
+        "PATCH /activities/bulk": 2,
+        "DELETE /activities/bulk": 2,
+    }
+    admission_queue_size: int = Field(default=64, ge=0)
+    admission_queue_timeout_ms: float = Field(default=1000, ge=0)
+    rate_limit_backend: str = Field(default="auto", pattern="^(auto|redis|memory)$")
+    rate_limit_per_second: float = Field(default=20, gt=0)
+    rate_limit_burst: int = Field(default=100, ge=1)
+    request_timeout_ms: float = Field(default=10000, ge=0)
+    request_route_timeouts_ms: Dict[str, float] = {
+        "GET /activities/export": 300000,
+        "POST /activities/bulk": 120000,
+        "PATCH /activities/bulk": 60000,
+        "DELETE /activities/bulk": 60000,
+        "PATCH /auth/me": 60000,
+    }
+    
+    query_budget_mode: str = Field(default="log", pattern="^(log|raise|off)$")
+    slow_query_ms: float = Field(default=200, ge=0)
+    slow_query_explain: bool = True
+    
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -30,7 +118,15 @@ class Settings(BaseSettings):
     
     @property
     def database_url(self) -> str:
-        return f"postgresql://{self.postgres_user}:{self.postgres_password.get_secret_value()}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
+        return f"postgresql+psycopg://{self.postgres_user}:{self.postgres_password.get_secret_value()}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
+    
+    @property
+    def replica_urls(self) -> List[str]:
+        return [url.strip() for url in self.read_replica_urls.split(",") if url.strip()]
+    
+    @property
+    def max_concurrency(self) -> int:
+        return self.admission_max_concurrency or self.database_pool_size + self.database_max_overflow
     
     @property
     def redis_url(self) -> str:
@@ -1,14 +1,160 @@
+import asyncio
+import itertools
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from .config import settings
+from .metrics import instrument_pool, registry
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_TIMEOUT_SECONDS = 2.0
 
 engine = create_engine(
     settings.database_url,
     echo=False,
-    pool_size=10,
-    max_overflow=20, 
+    pool_size=settings.database_pool_size,
+    max_overflow=settings.database_max_overflow,
+    pool_timeout=settings.database_pool_timeout,
+    pool_pre_ping=True
+)
+
+async_engine = create_async_engine(
+    settings.database_url,
+    echo=False,
+    pool_size=settings.database_pool_size,
+    max_overflow=settings.database_max_overflow,
+    pool_timeout=settings.database_pool_timeout,
     pool_pre_ping=True
 )
 
+replica_engines = [
+    create_async_engine(
+        url,
+        echo=False,
+        pool_size=settings.replica_pool_size,
+        max_overflow=settings.replica_max_overflow,
+        pool_timeout=settings.database_pool_timeout,
+        pool_pre_ping=True
+    )
+    for url in settings.replica_urls
+]
+
+instrument_pool(engine, "sync")
+instrument_pool(async_engine, "async")
+for index, replica in enumerate(replica_engines):
+    instrument_pool(replica, f"replica{index}")
+
+
+def pool_status(engine) -> dict:
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, name):
+            status[name] = getattr(pool, name)()
+    return status
+
+
+# Picks the engine for read-only requests. Replicas are used round-robin
+# while they pass health checks; a user who wrote within the read-your-writes
+# window (or whose last write time is unknown) reads from the primary, so
+# replication lag never hides their own changes. The window should exceed
+# the replicas' expected lag.
+class ReadRouter:
+    def __init__(self, primary: AsyncEngine, replicas: Sequence[AsyncEngine] = (), read_your_writes_seconds: float = 5):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self.healthy = [True] * len(self.replicas)
+        self.checked_at: Optional[datetime] = None
+        self._turn = itertools.count()
+        self._status: Optional[dict] = None
+        self._status_at = 0.0
+        self._status_lock = asyncio.Lock()
+
+    def engine_for(self, last_write: Optional[datetime]) -> AsyncEngine:
+        if not self.replicas or last_write is None:
+            return self.primary
+        if (datetime.now(timezone.utc) - last_write).total_seconds() < self.read_your_writes_seconds:
+            return self.primary
+
+        candidates = [replica for replica, healthy in zip(self.replicas, self.healthy) if healthy]
+        if not candidates:
+            return self.primary
+        return candidates[next(self._turn) % len(candidates)]
+
+    async def ping(self, engine: AsyncEngine) -> Optional[str]:
+        try:
+            async with asyncio.timeout(HEALTH_CHECK_TIMEOUT_SECONDS):
+                async with engine.connect() as connection:
+                    await connection.execute(text("SELECT 1"))
+        except Exception as e:
+            return str(e) or type(e).__name__
+        return None
+
+    async def check_health(self):
+        for index, replica in enumerate(self.replicas):
+            error = await self.ping(replica)
+            if error is not None and self.healthy[index]:
+                logger.warning("Read replica %d unavailable (%s), reading from the primary", index, error)
+            elif error is None and not self.healthy[index]:
+                logger.warning("Read replica %d is back", index)
+            self.healthy[index] = error is None
+        self.checked_at = datetime.now(timezone.utc)
+
+    async def monitor(self, interval: float):
+        while True:
+            await self.check_health()
+            await asyncio.sleep(interval)
+
+    # Probing opens a connection to every engine, so results are reused for
+    # max_age seconds and concurrent callers share one probe; health checks
+    # from load balancers cannot then add load to the pools.
+    async def status(self, max_age: float = 0) -> dict:
+        async with self._status_lock:
+            if self._status is None or time.monotonic() - self._status_at >= max_age:
+                primary_error = await self.ping(self.primary)
+                await self.check_health()
+                self._status = {
+                    "primary": {"healthy": primary_error is None, "error": primary_error},
+                    "replicas": [{"healthy": healthy} for healthy in self.healthy],
+                    "checked_at": self.checked_at.isoformat() if self.checked_at else None,
+                }
+                self._status_at = time.monotonic()
+
+        return {
+            "primary": {**self._status["primary"], **pool_status(self.primary)},
+            "replicas": [
+                {**health, **pool_status(replica)}
+                for replica, health in zip(self.replicas, self._status["replicas"])
+            ],
+            "checked_at": self._status["checked_at"],
+        }
+
+    async def dispose(self):
+        for replica in self.replicas:
+            await replica.dispose()
+
+
+read_router = ReadRouter(async_engine, replica_engines, settings.replica_read_your_writes_seconds)
+
+
+@registry.collector
+def collect_replicas():
+    for index, healthy in enumerate(read_router.healthy):
+        yield "kairoflow_db_replica_up", "gauge", "Whether the read replica passed its last health check.", {"replica": str(index)}, int(healthy)
+
+
 def get_session():
     with Session(engine) as session:
-        yield session
\ No newline at end of file
+        yield session
+
+async def get_async_session():
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
@@ -0,0 +1,309 @@
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# A small Prometheus text-format registry. Updates are a dict lookup and an
+# addition under a lock, cheap enough to stay enabled in production; values
+# that already live elsewhere (cache counters, pool state, hashing queue)
+# are read through collector callbacks only when /metrics is scraped.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Labels, float] = {}
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in items]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, list] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+
+        lines = []
+        for labels, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        self.collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+
+        # Collected samples are grouped by name so each family gets a single
+        # HELP/TYPE header, as the exposition format requires.
+        families: Dict[str, Tuple[str, str, List[str]]] = {}
+        for collect in self.collectors:
+            for name, kind, documentation, labels, value in collect():
+                family = families.setdefault(name, (kind, documentation, []))
+                family[2].append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+        for name, (kind, documentation, samples) in families.items():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        for metric in self.metrics:
+            metric.reset()
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    "kairoflow_http_requests_total", "HTTP requests by route, method and status.", ("method", "route", "status")))
+http_latency = registry.register(Histogram(
+    "kairoflow_http_request_duration_seconds", "HTTP request latency.", ("method", "route")))
+http_in_flight = registry.register(Gauge(
+    "kairoflow_http_requests_in_flight", "HTTP requests currently being served.", ("method",)))
+request_statements = registry.register(Histogram(
+    "kairoflow_http_request_sql_statements", "SQL statements executed per request.", ("method", "route"), COUNT_BUCKETS))
+request_sql_time = registry.register(Histogram(
+    "kairoflow_http_request_sql_seconds", "Time spent in SQL per request.", ("method", "route")))
+sql_statements = registry.register(Counter(
+    "kairoflow_sql_statements_total", "SQL statements executed.", ("engine",)))
+sql_time = registry.register(Counter(
+    "kairoflow_sql_seconds_total", "Time spent executing SQL statements.", ("engine",)))
+pool_wait = registry.register(Histogram(
+    "kairoflow_db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", ("engine",)))
+
+
+class RequestStats:
+    __slots__ = ("statements", "sql_seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.sql_seconds = 0.0
+
+
+# Per-request SQL accounting. Async sessions run their sync core on a
+# greenlet inside the request task, so the context variable set by the
+# middleware is visible to the engine events below.
+current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("current_request", default=None)
+
+# Callbacks run after every statement with (conn, cursor, statement,
+# parameters, executemany, elapsed), so other per-request accounting can reuse
+# the timing above instead of registering a second pair of engine events.
+statement_observers: List[Callable] = []
+
+
+def engine_label(conn) -> str:
+    return conn.engine.url.get_backend_name()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _finish_statement(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("statement_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+
+    label = engine_label(conn)
+    sql_statements.inc(label)
+    sql_time.inc(label, amount=elapsed)
+
+    stats = current_request.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.sql_seconds += elapsed
+
+    for observer in statement_observers:
+        observer(conn, cursor, statement, parameters, executemany, elapsed)
+
+
+@event.listens_for(Engine, "handle_error")
+def _discard_statement(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("statement_started"):
+        connection.info["statement_started"].pop()
+
+
+def instrument_pool(engine, name: str):
+    # The pool exposes no "before checkout" event, so the wait is timed by
+    # wrapping the pool's own acquire step (which also covers opening a new
+    # connection when the pool grows).
+    pool = engine.pool
+    acquire = pool._do_get
+
+    def timed_acquire():
+        started = time.perf_counter()
+        try:
+            return acquire()
+        finally:
+            pool_wait.observe(time.perf_counter() - started, name)
+
+    pool._do_get = timed_acquire
+
+    @registry.collector
+    def collect_pool():
+        current = engine.pool
+        if not hasattr(current, "checkedout"):
+            return []
+        labels = {"engine": name}
+        samples = [
+            ("kairoflow_db_pool_checked_out", "gauge", "Connections currently checked out.", labels, current.checkedout()),
+        ]
+        if hasattr(current, "size"):
+            samples.append(("kairoflow_db_pool_size", "gauge", "Configured pool size.", labels, current.size()))
+        if hasattr(current, "overflow"):
+            samples.append(("kairoflow_db_pool_overflow", "gauge", "Connections open beyond the pool size.", labels, current.overflow()))
+        return samples
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = "500"
+        http_in_flight.inc(method)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request.reset(token)
+            http_in_flight.dec(method)
+
+            # The router stores the matched route in the shared scope, so the
+            # template ("/activities/{activity_id}") keeps label cardinality
+            # bounded; unmatched paths collapse into a single series.
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            http_requests.inc(method, route, status)
+            http_latency.observe(elapsed, method, route)
+            request_statements.observe(stats.statements, method, route)
+            request_sql_time.observe(stats.sql_seconds, method, route)
+
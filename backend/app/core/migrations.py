@@ -0,0 +1,93 @@
+import os
+from typing import List, Optional, Set
+
+from alembic import command, op
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(__file__), "..", "..", "alembic.ini")
+
+# The schema is owned by the migrations in alembic/versions. Workers never
+# run DDL: they only compare the database's revision with the one this build
+# was written against and refuse to start on a mismatch, so a deploy that
+# skipped `alembic upgrade head` fails at boot instead of on first query.
+
+
+class SchemaVersionMismatch(RuntimeError):
+    pass
+
+
+def alembic_config(connection: Optional[Connection] = None) -> Config:
+    config = Config(os.path.abspath(ALEMBIC_INI))
+    config.attributes["configure_logger"] = False
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+def expected_revisions() -> Set[str]:
+    return set(ScriptDirectory.from_config(alembic_config()).get_heads())
+
+
+def current_revisions(engine: Engine) -> Set[str]:
+    with engine.connect() as connection:
+        return set(MigrationContext.configure(connection).get_current_heads())
+
+
+def check_schema_version(engine: Engine):
+    expected = expected_revisions()
+    current = current_revisions(engine)
+    if current != expected:
+        raise SchemaVersionMismatch(
+            f"Database schema is at {', '.join(sorted(current)) or 'no revision'}, "
+            f"this build expects {', '.join(sorted(expected))}. Run `alembic upgrade head` before starting the API."
+        )
+
+
+def upgrade(engine: Engine, revision: str = "head"):
+    with engine.connect() as connection:
+        command.upgrade(alembic_config(connection), revision)
+        connection.commit()
+
+
+def downgrade(engine: Engine, revision: str):
+    with engine.connect() as connection:
+        command.downgrade(alembic_config(connection), revision)
+        connection.commit()
+
+
+# Helpers for migrations that touch large tables. On PostgreSQL, index
+# builds and drops run CONCURRENTLY, outside the migration's transaction, so
+# writes to the table continue while they run; other dialects use the
+# plain statements.
+
+def create_index_online(name: str, table: str, columns: List[str], **kw):
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        op.create_index(name, table, columns, **kw)
+        return
+
+    context = op.get_context()
+    with context.autocommit_block():
+        # An interrupted CONCURRENTLY build leaves an INVALID index behind,
+        # which IF NOT EXISTS would otherwise accept as done. Offline (--sql)
+        # runs cannot look, so they rely on IF NOT EXISTS alone.
+        invalid = not context.as_sql and bind.execute(text(
+            "SELECT 1 FROM pg_index WHERE indexrelid = to_regclass(:name) AND NOT indisvalid"
+        ), {"name": name}).first()
+        if invalid:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+        op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kw)
+
+
+def drop_index_online(name: str, table: str):
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        op.drop_index(name, table_name=table)
+        return
+
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -1,8 +1,14 @@
 from sqlmodel import SQLModel, Field, Column, JSON, Index
+from pydantic import field_validator
 from datetime import datetime, timezone
 from typing import Optional, List
 from enum import Enum
 
+def to_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc)
+    return value
+
 class ActivityType(str, Enum):
     WORK = "WORK"
     STUDY = "STUDY"
@@ -17,6 +23,11 @@ class ActivityBase(SQLModel):
     description: Optional[str] = Field(default=None, max_length=1000)
     tags: List[str] = Field(default=[], sa_column=Column(JSON))
     date: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    
+    @field_validator('date')
+    @classmethod
+    def normalize_date(cls, v: datetime) -> datetime:
+        return to_utc(v)
 
 class ActivityCreate(ActivityBase):
     pass
@@ -28,6 +39,11 @@ class ActivityUpdate(SQLModel):
     description: Optional[str] = Field(default=None, max_length=1000)
     tags: Optional[List[str]] = None
     date: Optional[datetime] = None
+    
+    @field_validator('date')
+    @classmethod
+    def normalize_date(cls, v: Optional[datetime]) -> Optional[datetime]:
+        return to_utc(v)
 
 class Activity(ActivityBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -55,5 +71,16 @@ class Activity(ActivityBase, table=True):
     
     __table_args__ = (
         Index('idx_user_date', 'user_id', 'date'),
-        Index('idx_activity_type', 'activity_type'),
-    )
\ No newline at end of file
+        Index('idx_user_type_date', 'user_id', 'activity_type', 'date'),
+    )
+
+class ActivityTag(SQLModel, table=True):
+    __tablename__ = "activity_tag"
+
+    activity_id: int = Field(foreign_key="activity.id", primary_key=True)
+    tag: str = Field(primary_key=True)
+    user_id: int = Field(foreign_key="user.id")
+    
+    __table_args__ = (
+        Index('idx_activity_tag_user_tag', 'user_id', 'tag'),
+    )
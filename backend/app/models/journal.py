@@ -0,0 +1,10 @@
+from sqlmodel import SQLModel, Field
+
+# Highest write-behind journal sequence committed to the database, written in
+# the same transaction as each flushed batch so replay after a crash skips
+# records that already made it in.
+class WriteBehindCheckpoint(SQLModel, table=True):
+    __tablename__ = "write_behind_checkpoint"
+
+    journal: str = Field(primary_key=True, max_length=255)
+    seq: int = 0
@@ -0,0 +1,26 @@
+from sqlmodel import SQLModel, Field
+from datetime import date
+
+from app.models.activity import ActivityType
+
+class UserDailyRollup(SQLModel, table=True):
+    __tablename__ = "user_daily_rollup"
+
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    day: date = Field(primary_key=True)
+    activity_type: ActivityType = Field(primary_key=True)
+    minutes: int = 0
+    count: int = 0
+
+# The key leads with every column the analytics series filters on by
+# equality, so its bucket range is one contiguous slice of the index.
+class ActivityBucket(SQLModel, table=True):
+    __tablename__ = "activity_bucket"
+
+    user_id: int = Field(foreign_key="user.id", primary_key=True)
+    granularity: str = Field(primary_key=True, max_length=5)
+    tag: str = Field(default="", primary_key=True)
+    bucket: date = Field(primary_key=True)
+    activity_type: ActivityType = Field(primary_key=True)
+    minutes: int = 0
+    count: int = 0
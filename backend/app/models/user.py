@@ -2,8 +2,16 @@ from sqlmodel import SQLModel, Field
 from datetime import datetime, timezone
 from pydantic import field_validator, ConfigDict
 from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import re
 
+def validate_timezone_name(v: str) -> str:
+    try:
+        ZoneInfo(v)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError("Fuso horário inválido")
+    return v
+
 class User(SQLModel, table=True):
     id: int | None = Field(default=None, primary_key=True)
     email: str = Field(unique=True, index=True)
@@ -12,6 +20,7 @@ class User(SQLModel, table=True):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     is_active: bool = True
     is_superuser: bool = False
+    timezone: str = Field(default="UTC", max_length=64)
     
     @property
     def is_admin(self) -> bool:
@@ -51,6 +60,12 @@ class UserBase(SQLModel):
 
 class UserCreate(UserBase):
     password: str = Field(min_length=8, max_length=50)
+    timezone: str = Field(default="UTC", max_length=64)
+    
+    @field_validator('timezone')
+    @classmethod
+    def validate_timezone(cls, v: str) -> str:
+        return validate_timezone_name(v)
     
     @field_validator('password')
     @classmethod
@@ -77,7 +92,17 @@ class UserUpdate(SQLModel):
             return v.lower()
         return v
 
+class UserPreferences(SQLModel):
+    full_name: Optional[str] = Field(default=None, min_length=1, max_length=100)
+    timezone: Optional[str] = Field(default=None, max_length=64)
+    
+    @field_validator('timezone')
+    @classmethod
+    def validate_timezone(cls, v: Optional[str]) -> Optional[str]:
+        return validate_timezone_name(v) if v is not None else v
+
 class UserRead(UserBase):
     id: int
     is_active: bool
-    created_at: datetime
\ No newline at end of file
+    created_at: datetime
+    timezone: str = "UTC"
\ No newline at end of file
@@ -0,0 +1,65 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+from app.models.activity import Activity, ActivityType, ActivityUpdate, to_utc
+
+
+class ActivityRead(BaseModel):
+    id: int
+    user_id: int
+    title: str
+    activity_type: ActivityType
+    duration_minutes: int
+    description: Optional[str] = None
+    tags: List[str] = []
+    date: datetime
+    created_at: datetime
+    updated_at: datetime
+
+
+# List endpoints select these columns directly and serialize the rows as
+# plain dicts; ActivityRead only documents the payload.
+ACTIVITY_READ_COLUMNS = tuple(Activity.__table__.c[name] for name in ActivityRead.model_fields)
+
+
+BULK_MUTATION_LIMIT = 10000
+
+
+class ActivityFilter(BaseModel):
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    activity_type: Optional[ActivityType] = None
+    tag: Optional[str] = None
+
+    @field_validator("start", "end")
+    @classmethod
+    def normalize_bounds(cls, v: Optional[datetime]) -> Optional[datetime]:
+        return to_utc(v)
+
+
+# Bulk mutations select their rows either by id or by filter, never both;
+# an empty filter ({}) deliberately selects every activity of the user.
+class ActivitySelection(BaseModel):
+    ids: Optional[List[int]] = Field(default=None, min_length=1, max_length=BULK_MUTATION_LIMIT)
+    filter: Optional[ActivityFilter] = None
+
+    @model_validator(mode="after")
+    def check_selection(self):
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Provide either ids or filter")
+        return self
+
+
+class ActivityBulkUpdate(ActivitySelection):
+    changes: ActivityUpdate
+
+    @model_validator(mode="after")
+    def check_changes(self):
+        if not self.changes.model_fields_set:
+            raise ValueError("No changes given")
+        for name in self.changes.model_fields_set - {"description"}:
+            if getattr(self.changes, name) is None:
+                raise ValueError(f"{name} cannot be null")
+        return self
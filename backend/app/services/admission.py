@@ -0,0 +1,102 @@
+import math
+import time
+from typing import AsyncIterator, Optional
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from jose import JWTError
+from starlette.background import BackgroundTask
+
+from app.core import admission as control
+from app.core.config import settings
+from app.services.principals import verify_token
+
+
+def request_identity(request: Request) -> str:
+    # Bearer tokens are verified without touching the database (the result
+    # is cached per token); anonymous or invalid requests are limited per
+    # client address and rejected later by authentication if needed.
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            return f"user:{verify_token(token)}"
+        except (JWTError, ValueError):
+            pass
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def _reject(route: str, reason: str, status_code: int, detail: str, retry_after: float):
+    control.rejected_requests.inc(route, reason)
+    raise HTTPException(
+        status_code=status_code,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+class AdmissionHold:
+    # The slots and deadline of an admitted request. Releasing is
+    # idempotent, since a streamed response may release from its body and
+    # from its background task.
+    def __init__(self, held: list, deadline: Optional[float]):
+        self.held = held
+        self.deadline = deadline
+        self.streaming = False
+
+    def release(self):
+        held, self.held = self.held, []
+        for limiter in held:
+            limiter.release()
+
+
+# Router-level dependency: it runs after routing, so the route template is
+# known, but before the route's own dependencies open a database session.
+async def admit(request: Request):
+    if not settings.admission_enabled:
+        yield
+        return
+
+    route = f"{request.method} {getattr(request.scope.get('route'), 'path', request.url.path)}"
+
+    wait = await control.rate_limiter.take(request_identity(request))
+    if wait > 0:
+        _reject(route, "rate_limited", status.HTTP_429_TOO_MANY_REQUESTS, "Too many requests", wait)
+
+    held = await control.admission.acquire(route)
+    if held is None:
+        _reject(route, "overloaded", status.HTTP_503_SERVICE_UNAVAILABLE, "Server is overloaded, try again shortly", 1)
+
+    timeout_ms = settings.request_route_timeouts_ms.get(route, settings.request_timeout_ms)
+    hold = request.state.admission = AdmissionHold(held, time.monotonic() + timeout_ms / 1000 if timeout_ms else None)
+    token = control.current_deadline.set(hold.deadline)
+    try:
+        yield
+    finally:
+        control.current_deadline.reset(token)
+        if not hold.streaming:
+            hold.release()
+
+
+# Dependency teardown runs before a StreamingResponse sends its body, so
+# routes that stream from the database build their response here: the
+# request keeps its slots and deadline until the body ends, and the
+# background task releases them if the body never starts (e.g. the client
+# left first).
+def admitted_stream(request: Request, body: AsyncIterator, **kwargs) -> StreamingResponse:
+    hold = getattr(request.state, "admission", None)
+    if hold is None:
+        return StreamingResponse(body, **kwargs)
+
+    hold.streaming = True
+    return StreamingResponse(_held_stream(hold, body), background=BackgroundTask(hold.release), **kwargs)
+
+
+async def _held_stream(hold: AdmissionHold, body: AsyncIterator) -> AsyncIterator:
+    token = control.current_deadline.set(hold.deadline)
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        control.current_deadline.reset(token)
+        hold.release()
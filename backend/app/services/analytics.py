@@ -0,0 +1,82 @@
+from datetime import date
+from typing import Dict, Optional
+
+from sqlmodel import Session, select
+
+from app.models.activity import ActivityType
+from app.models.rollup import ActivityBucket
+from app.services.rollup import ALL_TAGS, bucket_start, next_bucket
+
+MAX_BUCKETS = 1000
+
+
+def count_buckets(start: date, end: date, granularity: str) -> int:
+    start = bucket_start(start, granularity)
+    end = bucket_start(end, granularity)
+    if granularity == "week":
+        return (end - start).days // 7 + 1
+    if granularity == "month":
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    return (end - start).days + 1
+
+
+def _empty_point(start: date) -> dict:
+    return {
+        "bucket": start.isoformat(),
+        "total_minutes": 0,
+        "total_count": 0,
+        "minutes": {activity_type.value: 0 for activity_type in ActivityType},
+        "counts": {activity_type.value: 0 for activity_type in ActivityType},
+    }
+
+
+def series_query(user_id: int, granularity: str, first: date, last: date, tag: Optional[str] = None):
+    return select(
+        ActivityBucket.bucket,
+        ActivityBucket.activity_type,
+        ActivityBucket.minutes,
+        ActivityBucket.count,
+    ).where(
+        ActivityBucket.user_id == user_id,
+        ActivityBucket.granularity == granularity,
+        ActivityBucket.tag == (tag or ALL_TAGS),
+        ActivityBucket.bucket >= first,
+        ActivityBucket.bucket <= last,
+    )
+
+
+def compute_series(
+    session: Session,
+    user_id: int,
+    granularity: str,
+    start: date,
+    end: date,
+    tag: Optional[str] = None,
+) -> dict:
+    first = bucket_start(start, granularity)
+    last = bucket_start(end, granularity)
+    query = series_query(user_id, granularity, first, last, tag)
+
+    points: Dict[date, dict] = {}
+    cursor = first
+    while cursor <= last:
+        points[cursor] = _empty_point(cursor)
+        cursor = next_bucket(cursor, granularity)
+
+    for bucket, activity_type, minutes, count in session.exec(query).all():
+        if isinstance(bucket, str):
+            bucket = date.fromisoformat(bucket)
+        point = points[bucket]
+        activity_type = ActivityType(activity_type).value
+        point["minutes"][activity_type] += minutes
+        point["counts"][activity_type] += count
+        point["total_minutes"] += minutes
+        point["total_count"] += count
+
+    return {
+        "granularity": granularity,
+        "start": first.isoformat(),
+        "end": last.isoformat(),
+        "tag": tag,
+        "series": list(points.values()),
+    }
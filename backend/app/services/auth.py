@@ -1,14 +1,15 @@
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.config import settings
-from app.core.database import get_session
+from app.core.database import get_async_session
 from app.models.user import User
+from app.services.principals import STREAM_SCOPE, resolve_principal, verify_stream_token, verify_token
 
 pwd_context = CryptContext(
     schemes=["argon2", "bcrypt"],
@@ -20,6 +21,7 @@ pwd_context = CryptContext(
 )
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -27,6 +29,9 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def create_access_token(user: User, expires_delta: Optional[timedelta] = None):
     to_encode = {
         "sub": str(user.id),
@@ -42,9 +47,17 @@ def create_access_token(user: User, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.secret_key.get_secret_value(), algorithm=settings.algorithm)
     return encoded_jwt
 
-def get_current_user(
+def create_stream_token(user_id: int) -> str:
+    to_encode = {
+        "sub": str(user_id),
+        "scope": STREAM_SCOPE,
+        "exp": datetime.now(timezone.utc) + timedelta(seconds=settings.events_token_expire_seconds)
+    }
+    return jwt.encode(to_encode, settings.secret_key.get_secret_value(), algorithm=settings.algorithm)
+
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -53,19 +66,43 @@ def get_current_user(
     )
     
     try:
-        payload = jwt.decode(token, settings.secret_key.get_secret_value(), algorithms=[settings.algorithm])
-        user_id_str: str = payload.get("sub")  
-        
-        if user_id_str is None:
-            raise credentials_exception
-        
-        user_id = int(user_id_str)
-            
+        user_id = verify_token(token)
     except (JWTError, ValueError) as e:
           raise credentials_exception
     
-    user = session.get(User, user_id)
-    if user is None:
+    user = await resolve_principal(session, user_id)
+    if user is None or not user.is_active:
+        raise credentials_exception
+    
+    return user
+
+async def get_stream_user(
+    token: Optional[str] = None,
+    bearer: Optional[str] = Depends(optional_oauth2_scheme),
+    session: AsyncSession = Depends(get_async_session)
+) -> User:
+    if token is None:
+        if bearer is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return await get_current_user(bearer, session)
+    
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    try:
+        user_id = verify_stream_token(token)
+    except (JWTError, ValueError):
+        raise credentials_exception
+    
+    user = await resolve_principal(session, user_id)
+    if user is None or not user.is_active:
         raise credentials_exception
     
-    return user
\ No newline at end of file
+    return user
@@ -0,0 +1,81 @@
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import and_
+
+UTC = ZoneInfo("UTC")
+
+
+def parse_timezone(name: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        raise ValueError(f"Unknown time zone: {name}") from e
+
+
+def zone_or_utc(name: Optional[str]) -> ZoneInfo:
+    try:
+        return parse_timezone(name or "UTC")
+    except ValueError:
+        return UTC
+
+
+def user_zone(user) -> ZoneInfo:
+    return zone_or_utc(getattr(user, "timezone", None))
+
+
+def local_today(zone: ZoneInfo) -> date:
+    return datetime.now(zone).date()
+
+
+def local_date(moment: datetime, zone: ZoneInfo) -> date:
+    # Naive datetimes are UTC, as stored in Activity.date.
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(zone).date()
+
+
+def local_midnight_utc(day: date, zone: ZoneInfo) -> datetime:
+    # Activity.date is stored as naive UTC, so bounds are naive UTC too.
+    return datetime.combine(day, time.min, zone).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def local_day_range(start: date, end: date, zone: ZoneInfo) -> Tuple[datetime, datetime]:
+    return local_midnight_utc(start, zone), local_midnight_utc(end + timedelta(days=1), zone)
+
+
+def within_local_days(column, start: date, end: date, zone: ZoneInfo):
+    # Local days [start, end] as a half-open UTC range on the raw column.
+    # Wrapping the column in date() or a time zone conversion instead would
+    # keep (user_id, date) indexes from bounding the scan.
+    start_utc, end_utc = local_day_range(start, end, zone)
+    return and_(column >= start_utc, column < end_utc)
+
+
+def utc_offset_minutes(moment_utc: datetime, zone: ZoneInfo) -> int:
+    local = moment_utc.replace(tzinfo=timezone.utc).astimezone(zone)
+    return int(local.utcoffset().total_seconds() // 60)
+
+
+def utc_offset_segments(zone: ZoneInfo, start_utc: datetime, end_utc: datetime) -> List[Tuple[datetime, int]]:
+    # Splits [start_utc, end_utc) into spans with a constant UTC offset, as
+    # (span start, offset in minutes). Transitions are located day by day and
+    # then bisected to the second.
+    segments = [(start_utc, utc_offset_minutes(start_utc, zone))]
+    cursor = start_utc
+    while cursor < end_utc:
+        following = min(cursor + timedelta(days=1), end_utc)
+        current = segments[-1][1]
+        if utc_offset_minutes(following, zone) != current:
+            low, high = 0, int((following - cursor).total_seconds())
+            while high - low > 1:
+                middle = (low + high) // 2
+                if utc_offset_minutes(cursor + timedelta(seconds=middle), zone) == current:
+                    low = middle
+                else:
+                    high = middle
+            transition = cursor + timedelta(seconds=high)
+            segments.append((transition, utc_offset_minutes(transition, zone)))
+        cursor = following
+    return segments
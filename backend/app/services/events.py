@@ -0,0 +1,262 @@
+import asyncio
+import contextvars
+import json
+import logging
+import time
+import uuid
+from datetime import date
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+import redis
+import redis.asyncio
+from sqlmodel.ext.asyncio.session import AsyncSession
+from zoneinfo import ZoneInfo
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.metrics import registry
+from app.services.dates import local_today
+from app.services.routing import read_engine
+from app.services.stats import cached_user_stats
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "kairoflow:stats-events"
+
+Snapshot = Callable[[int, date], Awaitable[dict]]
+
+
+async def live_stats(user_id: int, today: date) -> dict:
+    async with AsyncSession(await read_engine(user_id), expire_on_commit=False) as session:
+        return await cached_user_stats(session, user_id, today)
+
+
+def merge_patch(before: dict, after: dict) -> dict:
+    # RFC 7386 JSON merge patch turning before into after: changed fields
+    # only, nested objects patched recursively, removed keys as null.
+    patch = {key: None for key in before.keys() - after.keys()}
+    for key, value in after.items():
+        previous = before.get(key)
+        if isinstance(value, dict) and isinstance(previous, dict):
+            nested = merge_patch(previous, value)
+            if nested:
+                patch[key] = nested
+        elif key not in before or previous != value:
+            patch[key] = value
+    return patch
+
+
+# One open /stats/stream. Writes only mark it stale; the stream then
+# recomputes the user's /stats/ payload and sends what changed since its
+# last event, so fields that cannot be folded from increments (streak, most
+# frequent type, goal, recent activities) stay right. The last payload is
+# the snapshot shared by the user's streams, not a copy. A slow reader holds
+# at most one pending "stale" flag however many writes happen meanwhile,
+# and publishers never wait on it.
+class Subscription:
+    __slots__ = ("user_id", "zone", "stale", "day", "ready", "sent")
+
+    def __init__(self, user_id: int, zone: ZoneInfo):
+        self.user_id = user_id
+        self.zone = zone
+        self.stale = True
+        self.day: Optional[date] = None
+        self.ready = asyncio.Event()
+        self.ready.set()
+        self.sent: Optional[dict] = None
+
+    def mark_stale(self, zone: Optional[ZoneInfo] = None):
+        if zone is not None:
+            self.zone = zone
+        self.stale = True
+        self.ready.set()
+
+    @property
+    def day_changed(self) -> bool:
+        # "Today" and "this week" move at local midnight even without writes.
+        return self.day is not None and local_today(self.zone) != self.day
+
+
+class StatsEvents:
+    def __init__(
+        self,
+        backend: str = "memory",
+        redis_url: Optional[str] = None,
+        retry_interval: float = 30.0,
+        snapshot: Snapshot = live_stats,
+    ):
+        self.backend_name = backend
+        self.redis_url = redis_url
+        self.retry_interval = retry_interval
+        self.snapshot = snapshot
+        self.origin = uuid.uuid4().hex
+        self.published = 0
+        self._streams: Dict[int, Set[Subscription]] = {}
+        self._changes: Dict[int, int] = {}
+        self._computing: Dict[Tuple[int, date], Tuple[int, asyncio.Task]] = {}
+        self._redis: Optional[redis.asyncio.Redis] = None
+        self._redis_retry_at = 0.0
+
+    @property
+    def fan_out(self) -> bool:
+        return self.backend_name == "redis" and bool(self.redis_url)
+
+    def streams(self, user_id: Optional[int] = None) -> int:
+        if user_id is not None:
+            return len(self._streams.get(user_id, ()))
+        return sum(len(streams) for streams in self._streams.values())
+
+    def subscribe(self, user_id: int, zone: ZoneInfo) -> Subscription:
+        subscription = Subscription(user_id, zone)
+        self._streams.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        streams = self._streams.get(subscription.user_id)
+        if streams is None:
+            return
+        streams.discard(subscription)
+        if not streams:
+            del self._streams[subscription.user_id]
+            self._changes.pop(subscription.user_id, None)
+
+    async def stream(self, user_id: int, zone: ZoneInfo, keepalive: float):
+        # Subscribing inside the generator ties the subscription's lifetime
+        # to the response body, so a client that disconnects before the
+        # first event cannot leave it behind.
+        subscription = self.subscribe(user_id, zone)
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(subscription.ready.wait(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    if not subscription.day_changed:
+                        yield b": keepalive\n\n"
+                        continue
+                yield await self.next_event(subscription)
+        finally:
+            self.unsubscribe(subscription)
+
+    async def next_event(self, subscription: Subscription) -> bytes:
+        # "stats" carries the full payload, first on every connection;
+        # "delta" events are merge patches against the previous event.
+        subscription.stale = False
+        subscription.ready.clear()
+        day = local_today(subscription.zone)
+        stats = await self._stats(subscription.user_id, day)
+        subscription.day = day
+        if subscription.sent is None:
+            name, data = "stats", stats
+        else:
+            name, data = "delta", merge_patch(subscription.sent, stats)
+            if not data:
+                return b": keepalive\n\n"
+        subscription.sent = stats
+        return f"event: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+    async def _stats(self, user_id: int, day: date) -> dict:
+        # A user's streams share one computation, unless a change arrived
+        # after it started and so might be missing from it. It runs in an
+        # empty context: the stream request's query budget and deadline do
+        # not apply to work done on behalf of every stream.
+        key = (user_id, day)
+        generation = self._changes.get(user_id, 0)
+        entry = self._computing.get(key)
+        if entry is None or entry[0] != generation:
+            task = asyncio.create_task(self.snapshot(user_id, day), context=contextvars.Context())
+            entry = self._computing[key] = (generation, task)
+            task.add_done_callback(lambda task: self._computed(key, entry, task))
+        return await asyncio.shield(entry[1])
+
+    def _computed(self, key: Tuple[int, date], entry: Tuple[int, asyncio.Task], task: asyncio.Task):
+        if self._computing.get(key) is entry:
+            del self._computing[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Could not compute live stats for user %d (%s)", key[0], task.exception())
+
+    def deliver(self, user_id: int, zone: Optional[ZoneInfo] = None):
+        streams = self._streams.get(user_id)
+        if not streams:
+            return
+        self._changes[user_id] = self._changes.get(user_id, 0) + 1
+        for subscription in streams:
+            subscription.mark_stale(zone)
+
+    async def publish(self, user_id: int, zone: Optional[ZoneInfo] = None):
+        # Called after the write commits and the user's data version is
+        # bumped; a new zone moves the streams' "today" and "this week".
+        self.published += 1
+        self.deliver(user_id, zone)
+        if not self.fan_out:
+            return
+
+        client = await self._client()
+        if client is None:
+            return
+        message = {"origin": self.origin, "user_id": user_id, "zone": zone.key if zone is not None else None}
+        try:
+            await client.publish(CHANNEL, json.dumps(message, separators=(",", ":")))
+        except redis.RedisError as e:
+            logger.warning("Could not publish stats event to Redis (%s)", e)
+            await self._reset()
+
+    async def _client(self) -> Optional[redis.asyncio.Redis]:
+        if self._redis is None and time.monotonic() >= self._redis_retry_at:
+            self._redis = redis.asyncio.Redis.from_url(
+                self.redis_url,
+                decode_responses=True,
+                socket_connect_timeout=0.25,
+                socket_timeout=0.25,
+            )
+        return self._redis
+
+    async def _reset(self):
+        if self._redis is not None:
+            await self._redis.aclose()
+        self._redis = None
+        self._redis_retry_at = time.monotonic() + self.retry_interval
+
+    async def receive(self, data: str):
+        message = json.loads(data)
+        if message["origin"] == self.origin or message["user_id"] not in self._streams:
+            return
+        # On the in-process cache fallback this worker never saw the
+        # writer's version bump and would keep serving its cached stats.
+        if cache.active_backend == "memory":
+            await cache.bump_user_version(message["user_id"])
+        zone = ZoneInfo(message["zone"]) if message.get("zone") else None
+        self.deliver(message["user_id"], zone)
+
+    async def listen(self):
+        # Runs for the worker's lifetime when fan-out is enabled. Events
+        # published while the subscription was down are lost, so every local
+        # stream is refreshed once it is back.
+        while True:
+            client = redis.asyncio.Redis.from_url(self.redis_url, decode_responses=True)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(CHANNEL)
+                    for user_id in list(self._streams):
+                        self.deliver(user_id)
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            await self.receive(message["data"])
+            except redis.RedisError as e:
+                logger.warning("Stats event subscription lost (%s), retrying in %.0fs", e, self.retry_interval)
+            finally:
+                await client.aclose()
+            await asyncio.sleep(self.retry_interval)
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+
+stats_events = StatsEvents(backend=settings.events_backend, redis_url=settings.redis_url)
+
+
+@registry.collector
+def collect_stats_events():
+    yield "kairoflow_stats_streams", "gauge", "Open live stats streams.", {}, stats_events.streams()
+    yield "kairoflow_stats_events_published_total", "counter", "Stats events published by this worker.", {}, stats_events.published
@@ -0,0 +1,83 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.activity import Activity, ActivityType
+from app.services.ingest import CSV_TAG_SEPARATOR
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = (
+    "id", "title", "activity_type", "duration_minutes", "description",
+    "tags", "date", "created_at", "updated_at",
+)
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def export_query(
+    user_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    activity_type: Optional[ActivityType] = None,
+):
+    query = select(*(getattr(Activity, column) for column in EXPORT_COLUMNS)).where(
+        Activity.user_id == user_id
+    )
+
+    if start is not None:
+        query = query.where(Activity.date >= start)
+    if end is not None:
+        query = query.where(Activity.date < end)
+    if activity_type:
+        query = query.where(Activity.activity_type == activity_type)
+
+    return query.order_by(Activity.date, Activity.id)
+
+
+def _row_values(row) -> dict:
+    values = dict(zip(EXPORT_COLUMNS, row))
+    values["activity_type"] = ActivityType(values["activity_type"]).value
+    for column in ("date", "created_at", "updated_at"):
+        if values[column] is not None:
+            values[column] = values[column].isoformat()
+    return values
+
+
+def _ndjson_chunk(rows) -> str:
+    return "".join(json.dumps(_row_values(row), ensure_ascii=False) + "\n" for row in rows)
+
+
+def _csv_chunk(rows) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        values = _row_values(row)
+        values["tags"] = CSV_TAG_SEPARATOR.join(values["tags"] or [])
+        writer.writerow(values[column] for column in EXPORT_COLUMNS)
+    return buffer.getvalue()
+
+
+async def stream_export(session: AsyncSession, query, format: str) -> AsyncIterator[str]:
+    # Rows are fetched through a server-side cursor and serialized one
+    # partition at a time, so memory use does not depend on history size.
+    serialize = _csv_chunk if format == "csv" else _ndjson_chunk
+    try:
+        if format == "csv":
+            header = io.StringIO()
+            csv.writer(header).writerow(EXPORT_COLUMNS)
+            yield header.getvalue()
+
+        result = await session.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield serialize(rows)
+    finally:
+        await session.close()
@@ -0,0 +1,86 @@
+from datetime import date
+from typing import Dict, List
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Integer, case, cast, extract, literal
+from sqlmodel import Session, select, func
+
+from app.models.activity import Activity, ActivityType
+from app.services.dates import local_day_range, utc_offset_segments, within_local_days
+
+
+def _empty_matrix() -> List[List[int]]:
+    return [[0] * 24 for _ in range(7)]
+
+
+def _postgresql_query(user_id: int, zone: ZoneInfo, start: date, end: date):
+    local = func.timezone(zone.key, func.timezone("UTC", Activity.date))
+    return select(
+        Activity.activity_type,
+        (cast(extract("isodow", local), Integer) - 1).label("weekday"),
+        cast(extract("hour", local), Integer).label("hour"),
+        func.sum(Activity.duration_minutes),
+        func.count(Activity.id),
+    ).where(
+        Activity.user_id == user_id,
+        within_local_days(Activity.date, start, end, zone),
+    ).group_by(Activity.activity_type, "weekday", "hour")
+
+
+def _sqlite_query(user_id: int, zone: ZoneInfo, start: date, end: date):
+    # SQLite has no time zone support. The offsets in effect over the range
+    # are resolved in Python (one span per DST period) and applied in SQL, so
+    # the grouping still happens in the database.
+    start_utc, end_utc = local_day_range(start, end, zone)
+    segments = utc_offset_segments(zone, start_utc, end_utc)
+    offset = case(
+        *((Activity.date < boundary, minutes) for (_, minutes), (boundary, _) in zip(segments, segments[1:])),
+        else_=segments[-1][1],
+    ) if len(segments) > 1 else literal(segments[0][1])
+    local = func.datetime(Activity.date, func.printf("%+d minutes", offset))
+
+    return select(
+        Activity.activity_type,
+        ((cast(func.strftime("%w", local), Integer) + 6) % 7).label("weekday"),
+        cast(func.strftime("%H", local), Integer).label("hour"),
+        func.sum(Activity.duration_minutes),
+        func.count(Activity.id),
+    ).where(
+        Activity.user_id == user_id,
+        within_local_days(Activity.date, start, end, zone),
+    ).group_by(Activity.activity_type, "weekday", "hour")
+
+
+def heatmap_query(dialect: str, user_id: int, zone: ZoneInfo, start: date, end: date):
+    if dialect == "postgresql":
+        return _postgresql_query(user_id, zone, start, end)
+    return _sqlite_query(user_id, zone, start, end)
+
+
+def compute_heatmap(session: Session, user_id: int, zone: ZoneInfo, start: date, end: date) -> dict:
+    query = heatmap_query(session.get_bind().dialect.name, user_id, zone, start, end)
+    cells = session.exec(query).all()
+
+    by_type: Dict[str, dict] = {
+        activity_type.value: {"minutes": _empty_matrix(), "counts": _empty_matrix()}
+        for activity_type in ActivityType
+    }
+    minutes_total = _empty_matrix()
+    counts_total = _empty_matrix()
+
+    for activity_type, weekday, hour, minutes, count in cells:
+        matrices = by_type[ActivityType(activity_type).value]
+        matrices["minutes"][weekday][hour] += minutes or 0
+        matrices["counts"][weekday][hour] += count
+        minutes_total[weekday][hour] += minutes or 0
+        counts_total[weekday][hour] += count
+
+    return {
+        "timezone": zone.key,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "weekdays": ["MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN"],
+        "minutes": minutes_total,
+        "counts": counts_total,
+        "by_type": by_type,
+    }
@@ -0,0 +1,300 @@
+import codecs
+import csv
+import json
+from datetime import datetime, timezone
+from typing import AsyncIterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.util import await_only
+from sqlmodel import Session, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.requests import Request
+
+from app.core.budget import allow
+from app.core.config import settings
+from app.models.activity import Activity, ActivityCreate
+from app.services.dates import UTC
+from app.services.rollup import RollupDelta, activity_day, apply_rollup_delta, locked_user_zones
+from app.services.tags import insert_activity_tags
+
+JSON_TYPES = {"application/json"}
+NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+CSV_TYPES = {"text/csv"}
+
+CSV_FIELDS = ["title", "activity_type", "duration_minutes", "description", "tags", "date"]
+CSV_IGNORED_FIELDS = {"id", "created_at", "updated_at"}
+CSV_TAG_SEPARATOR = ";"
+
+# Statements issued by one insert_chunk round: owner's zone, max id,
+# insert, tag index, two rollup upserts and the commit.
+CHUNK_QUERY_BUDGET = 7
+
+COPY_COLUMNS = (
+    "user_id", "title", "activity_type", "duration_minutes",
+    "description", "tags", "date", "created_at", "updated_at",
+)
+
+
+class UnsupportedMediaType(ValueError):
+    pass
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+class ChunkFailed(Exception):
+    pass
+
+
+async def _iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in stream:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        yield buffer.rstrip("\r")
+
+
+async def _iter_json(request: Request):
+    try:
+        rows = json.loads(await request.body())
+    except ValueError as e:
+        raise InvalidRow(f"Invalid JSON body: {e}") from e
+
+    if not isinstance(rows, list):
+        raise InvalidRow("Expected a JSON array of activities")
+
+    for row in rows:
+        yield row
+
+
+async def _iter_ndjson(request: Request):
+    async for line in _iter_lines(request.stream()):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield InvalidRow(f"Invalid JSON line: {e}")
+
+
+def _csv_row(header: List[str], record: str):
+    values = next(csv.reader([record]))
+    if len(values) != len(header):
+        return InvalidRow(f"Expected {len(header)} columns, got {len(values)}")
+
+    row = {}
+    for field, value in zip(header, values):
+        if value == "" or field in CSV_IGNORED_FIELDS:
+            continue
+        if field == "tags":
+            row["tags"] = [tag for tag in value.split(CSV_TAG_SEPARATOR) if tag]
+        else:
+            row[field] = value
+    return row
+
+
+async def _iter_csv(request: Request):
+    header: Optional[List[str]] = None
+    pending = ""
+    async for line in _iter_lines(request.stream()):
+        # A quoted field may contain newlines: keep joining lines until the
+        # double quotes balance out.
+        pending = f"{pending}\n{line}" if pending else line
+        if pending.count('"') % 2:
+            continue
+        record, pending = pending, ""
+
+        if header is None:
+            header = [field.strip() for field in next(csv.reader([record]))]
+            unknown = set(header) - set(CSV_FIELDS) - CSV_IGNORED_FIELDS
+            if unknown:
+                raise InvalidRow(f"Unknown CSV columns: {', '.join(sorted(unknown))}")
+            continue
+        if not record.strip():
+            continue
+        yield _csv_row(header, record)
+
+    if pending:
+        yield InvalidRow("Unterminated quoted field")
+
+
+def iter_rows(request: Request):
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    if content_type in JSON_TYPES:
+        return _iter_json(request)
+    if content_type in NDJSON_TYPES:
+        return _iter_ndjson(request)
+    if content_type in CSV_TYPES:
+        return _iter_csv(request)
+    raise UnsupportedMediaType(content_type)
+
+
+def _format_errors(error: Exception) -> List[dict]:
+    if isinstance(error, ValidationError):
+        return [
+            {"field": ".".join(str(part) for part in item["loc"]), "message": item["msg"]}
+            for item in error.errors()
+        ]
+    return [{"field": None, "message": str(error)}]
+
+
+def _validate(raw) -> Tuple[Optional[ActivityCreate], Optional[Exception]]:
+    if isinstance(raw, Exception):
+        return None, raw
+    if not isinstance(raw, dict):
+        return None, InvalidRow("Expected an object")
+    try:
+        return ActivityCreate.model_validate(raw), None
+    except ValidationError as e:
+        return None, e
+
+
+def _copy_record(row: dict) -> tuple:
+    return (
+        row["user_id"],
+        row["title"],
+        row["activity_type"].name,
+        row["duration_minutes"],
+        row["description"],
+        json.dumps(row["tags"]),
+        row["date"],
+        row["created_at"],
+        row["updated_at"],
+    )
+
+
+async def _copy_rows_async(raw_connection, statement: str, rows: List[dict]):
+    async with raw_connection.cursor() as cursor:
+        async with cursor.copy(statement) as copy:
+            for row in rows:
+                await copy.write_row(_copy_record(row))
+
+
+def _copy_rows(session: Session, rows: List[dict]):
+    import psycopg
+
+    raw_connection = session.connection().connection.driver_connection
+    statement = f"COPY activity ({', '.join(COPY_COLUMNS)}) FROM STDIN"
+
+    # Under AsyncSession.run_sync we are on a greenlet that can wait on the
+    # async driver directly.
+    if isinstance(raw_connection, psycopg.AsyncConnection):
+        await_only(_copy_rows_async(raw_connection, statement, rows))
+        return
+
+    with raw_connection.cursor() as cursor:
+        with cursor.copy(statement) as copy:
+            for row in rows:
+                copy.write_row(_copy_record(row))
+
+
+def insert_activity_rows(session: Session, items: List[Tuple[int, ActivityCreate]]) -> int:
+    # Inserts (user_id, activity) items of any number of users with one
+    # insert and one upsert per rollup table; each row's day is taken in
+    # its owner's zone.
+    now = datetime.now(timezone.utc)
+    zones = locked_user_zones(session, (user_id for user_id, _ in items))
+    rows = []
+    delta = RollupDelta()
+
+    for user_id, item in items:
+        zone = zones.get(user_id, UTC)
+        row = item.model_dump()
+        row.update(user_id=user_id, created_at=now, updated_at=now)
+        rows.append(row)
+        delta.add_key(
+            (user_id, activity_day(row["date"], zone), row["activity_type"]),
+            row["duration_minutes"],
+            tags=row["tags"],
+        )
+
+    # Neither COPY nor executemany report the new ids. These rows are the
+    # users' rows above the highest id seen before inserting; re-expanding
+    # a concurrent insert's tags is harmless since conflicts are ignored.
+    last_id = session.exec(select(func.max(Activity.id))).one() or 0
+    if session.get_bind().dialect.name == "postgresql":
+        _copy_rows(session, rows)
+    else:
+        session.exec(insert(Activity.__table__), params=rows)
+    user_ids = {row["user_id"] for row in rows}
+    insert_activity_tags(session, Activity.user_id.in_(user_ids), Activity.id > last_id)
+    apply_rollup_delta(session, delta)
+    return len(rows)
+
+
+def insert_chunk_rows(session: Session, user_id: int, items: List[ActivityCreate]) -> int:
+    return insert_activity_rows(session, [(user_id, item) for item in items])
+
+
+def insert_chunk(session: Session, user_id: int, items: List[ActivityCreate]) -> int:
+    try:
+        inserted = insert_chunk_rows(session, user_id, items)
+        session.commit()
+    except (SQLAlchemyError, session.get_bind().dialect.loaded_dbapi.Error) as e:
+        session.rollback()
+        raise ChunkFailed(str(getattr(e, "orig", None) or e)) from e
+
+    return inserted
+
+
+async def ingest_activities(request: Request, session: AsyncSession, user_id: int) -> dict:
+    chunk_size = settings.bulk_chunk_size
+    max_rows = settings.bulk_max_rows
+
+    received = 0
+    inserted = 0
+    truncated = False
+    errors = []
+    batch: List[ActivityCreate] = []
+    batch_rows: List[int] = []
+
+    async def flush():
+        nonlocal inserted
+        allow(CHUNK_QUERY_BUDGET)
+        try:
+            inserted += await session.run_sync(insert_chunk, user_id, batch)
+        except ChunkFailed as e:
+            errors.extend(
+                {"row": row, "errors": [{"field": None, "message": str(e)}]}
+                for row in batch_rows
+            )
+        batch.clear()
+        batch_rows.clear()
+
+    async for raw in iter_rows(request):
+        if received >= max_rows:
+            truncated = True
+            break
+
+        row_number = received
+        received += 1
+
+        item, error = _validate(raw)
+        if error is not None:
+            errors.append({"row": row_number, "errors": _format_errors(error)})
+            continue
+
+        batch.append(item)
+        batch_rows.append(row_number)
+        if len(batch) >= chunk_size:
+            await flush()
+
+    if batch:
+        await flush()
+
+    return {
+        "received": received,
+        "inserted": inserted,
+        "failed": len(errors),
+        "truncated": truncated,
+        "errors": errors,
+    }
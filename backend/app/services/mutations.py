@@ -0,0 +1,114 @@
+from datetime import datetime, timezone
+from typing import List, Tuple
+
+from sqlalchemy import delete, update
+from sqlmodel import Session, select
+
+from app.models.activity import Activity, ActivityTag, ActivityType
+from app.schemas.activity import BULK_MUTATION_LIMIT, ActivityBulkUpdate, ActivitySelection
+from app.services.rollup import RollupDelta, activity_day, apply_rollup_delta, locked_user_zone
+from app.services.tags import insert_activity_tags, tagged_activity_ids
+
+# Fields whose change moves an activity between rollup rows or buckets.
+ROLLUP_FIELDS = {"date", "activity_type", "duration_minutes", "tags"}
+
+
+class TooManyActivities(ValueError):
+    pass
+
+
+def selection_conditions(user_id: int, selection: ActivitySelection) -> list:
+    conditions = [Activity.user_id == user_id]
+    if selection.ids is not None:
+        conditions.append(Activity.id.in_(selection.ids))
+        return conditions
+
+    criteria = selection.filter
+    if criteria.start is not None:
+        conditions.append(Activity.date >= criteria.start)
+    if criteria.end is not None:
+        conditions.append(Activity.date < criteria.end)
+    if criteria.activity_type:
+        conditions.append(Activity.activity_type == criteria.activity_type)
+    if criteria.tag:
+        conditions.append(Activity.id.in_(tagged_activity_ids(user_id, criteria.tag)))
+    return conditions
+
+
+def _lock_selected(session: Session, user_id: int, selection: ActivitySelection) -> List[Tuple]:
+    # Resolves the selection once, locking the rows on PostgreSQL, and keeps
+    # what the rollup delta needs. Every later statement targets these ids,
+    # so a tag filter still matches after the tag index is rewritten.
+    query = select(
+        Activity.id,
+        Activity.date,
+        Activity.activity_type,
+        Activity.duration_minutes,
+        Activity.tags,
+    ).where(*selection_conditions(user_id, selection)).limit(BULK_MUTATION_LIMIT + 1).with_for_update()
+
+    rows = session.exec(query).all()
+    if len(rows) > BULK_MUTATION_LIMIT:
+        raise TooManyActivities(f"Selection matches more than {BULK_MUTATION_LIMIT} activities")
+    return rows
+
+
+def bulk_update_activities(session: Session, user_id: int, request: ActivityBulkUpdate) -> int:
+    changes = request.changes.model_dump(exclude_unset=True)
+    rows = _lock_selected(session, user_id, request)
+    if not rows:
+        return 0
+    ids = [row[0] for row in rows]
+
+    if ROLLUP_FIELDS & changes.keys():
+        zone = locked_user_zone(session, user_id)
+        delta = RollupDelta()
+        for _, moment, activity_type, minutes, tags in rows:
+            delta.add_key((user_id, activity_day(moment, zone), ActivityType(activity_type)), minutes, -1, tags or ())
+            delta.add_key(
+                (
+                    user_id,
+                    activity_day(changes.get("date", moment), zone),
+                    ActivityType(changes.get("activity_type", activity_type)),
+                ),
+                changes.get("duration_minutes", minutes),
+                tags=changes.get("tags", tags) or (),
+            )
+        apply_rollup_delta(session, delta)
+
+    result = session.exec(
+        update(Activity)
+        .where(Activity.user_id == user_id, Activity.id.in_(ids))
+        .values(**changes, updated_at=datetime.now(timezone.utc))
+        .execution_options(synchronize_session=False)
+    )
+
+    if "tags" in changes:
+        session.exec(delete(ActivityTag).where(ActivityTag.user_id == user_id, ActivityTag.activity_id.in_(ids)))
+        insert_activity_tags(session, Activity.user_id == user_id, Activity.id.in_(ids))
+
+    session.commit()
+    return result.rowcount
+
+
+def bulk_delete_activities(session: Session, user_id: int, selection: ActivitySelection) -> int:
+    rows = _lock_selected(session, user_id, selection)
+    if not rows:
+        return 0
+    ids = [row[0] for row in rows]
+
+    zone = locked_user_zone(session, user_id)
+    delta = RollupDelta()
+    for _, moment, activity_type, minutes, tags in rows:
+        delta.add_key((user_id, activity_day(moment, zone), ActivityType(activity_type)), minutes, -1, tags or ())
+    apply_rollup_delta(session, delta)
+
+    session.exec(delete(ActivityTag).where(ActivityTag.user_id == user_id, ActivityTag.activity_id.in_(ids)))
+    result = session.exec(
+        delete(Activity)
+        .where(Activity.user_id == user_id, Activity.id.in_(ids))
+        .execution_options(synchronize_session=False)
+    )
+
+    session.commit()
+    return result.rowcount
@@ -0,0 +1,151 @@
+import hashlib
+import logging
+import time
+from typing import Iterable, Optional
+
+import redis
+from jose import jwt
+from sqlalchemy import event
+from sqlalchemy.exc import MissingGreenlet
+from sqlalchemy.util import await_only
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import KEY_PREFIX, CacheCounters, MemoryBackend, principal_cache
+from app.core.config import settings
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Signature checks never change for a given token, so they are cached per
+# process only. Resolved users live in principal_cache, which is shared
+# through Redis when available so an invalidation reaches every worker.
+token_counters = CacheCounters()
+verified_tokens = MemoryBackend(settings.principal_cache_max_entries, token_counters)
+
+
+# Claim of tokens that may only open /stats/stream (see
+# auth.create_stream_token); they are not accepted as bearer tokens.
+STREAM_SCOPE = "stats:stream"
+
+
+def token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def principal_key(user_id: int) -> str:
+    return f"{KEY_PREFIX}:principal:{user_id}"
+
+
+def verify_token(token: str) -> int:
+    key = token_hash(token)
+    cached = verified_tokens.get(key)
+    if cached is not None:
+        token_counters.incr("hits")
+        return int(cached)
+
+    token_counters.incr("misses")
+    payload = jwt.decode(token, settings.secret_key.get_secret_value(), algorithms=[settings.algorithm])
+    user_id_str = payload.get("sub")
+    if user_id_str is None:
+        raise ValueError("Token without subject")
+    if payload.get("scope") is not None:
+        raise ValueError("Scoped token used as a bearer token")
+    user_id = int(user_id_str)
+
+    ttl = settings.principal_cache_ttl_seconds
+    if payload.get("exp") is not None:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        verified_tokens.set(key, str(user_id), ttl=ttl)
+
+    return user_id
+
+
+def verify_stream_token(token: str) -> int:
+    payload = jwt.decode(token, settings.secret_key.get_secret_value(), algorithms=[settings.algorithm])
+    if payload.get("scope") != STREAM_SCOPE or payload.get("sub") is None:
+        raise ValueError("Not a stream token")
+    return int(payload["sub"])
+
+
+def _snapshot(user: User) -> dict:
+    return {
+        "id": user.id,
+        "email": user.email,
+        "full_name": user.full_name,
+        "created_at": user.created_at.isoformat() if user.created_at else None,
+        "is_active": user.is_active,
+        "is_superuser": user.is_superuser,
+        "timezone": user.timezone,
+    }
+
+
+async def resolve_principal(session: AsyncSession, user_id: int) -> Optional[User]:
+    key = principal_key(user_id)
+    snapshot = await principal_cache.get_json(key)
+    if snapshot is not None:
+        return User.model_validate(snapshot)
+
+    user = await session.get(User, user_id)
+    if user is None:
+        return None
+
+    await principal_cache.set_json(key, _snapshot(user))
+    return user
+
+
+async def invalidate_principals(user_ids: Iterable[int]):
+    for user_id in user_ids:
+        await principal_cache.delete(principal_key(user_id))
+
+
+def _invalidate_principals_sync(user_ids: Iterable[int]):
+    keys = [principal_key(user_id) for user_id in user_ids]
+    for key in keys:
+        principal_cache.memory.delete(key)
+
+    if principal_cache.backend_name == "memory" or not principal_cache.redis_url:
+        return
+    try:
+        client = redis.Redis.from_url(principal_cache.redis_url, socket_connect_timeout=0.25, socket_timeout=0.25)
+        client.delete(*keys)
+        client.close()
+    except redis.RedisError as e:
+        logger.warning("Could not invalidate principals in Redis (%s)", e)
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_changed_users(session, flush_context, instances):
+    changed = session.info.setdefault("changed_principals", set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and obj.id is not None:
+            changed.add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    user_ids = session.info.pop("changed_principals", None)
+    if not user_ids:
+        return
+
+    # Commits issued through AsyncSession run on a greenlet that can await
+    # the async cache directly; plain sync sessions (scripts) cannot.
+    coroutine = invalidate_principals(user_ids)
+    try:
+        await_only(coroutine)
+    except MissingGreenlet:
+        coroutine.close()
+        _invalidate_principals_sync(user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("changed_principals", None)
+
+
+def principal_cache_stats() -> dict:
+    return {
+        "principals": principal_cache.stats(),
+        "tokens": {"entries": len(verified_tokens), **token_counters.as_dict()},
+    }
@@ -0,0 +1,318 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select, func
+
+from app.core.budget import allow
+from app.models.activity import Activity, ActivityType
+from app.models.rollup import ActivityBucket, UserDailyRollup
+from app.models.user import User
+from app.services.dates import UTC, local_date, zone_or_utc
+
+RollupKey = Tuple[int, date, ActivityType]
+BucketKey = Tuple[int, str, date, str, ActivityType]
+
+GRANULARITIES = ("day", "week", "month")
+ALL_TAGS = ""
+REBUILD_BATCH_SIZE = 1000
+
+DIALECT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+# Rollup days and buckets are the owner's local days, so every write path
+# passes the user's zone; changing it means rebuilding that user's rollups.
+def activity_day(value: datetime, zone: ZoneInfo = UTC) -> date:
+    return local_date(value, zone)
+
+
+# Zones for a write, read in the writing transaction. FOR SHARE orders the
+# write against a time zone change, which rebuilds the user's rollups while
+# holding FOR UPDATE on the user row, so no delta is filed under the days
+# of a zone the user has already left.
+def locked_user_zones(session: Session, user_ids: Iterable[int]) -> Dict[int, ZoneInfo]:
+    rows = session.exec(
+        select(User.id, User.timezone).where(User.id.in_(set(user_ids))).with_for_update(read=True)
+    ).all()
+    return {user_id: zone_or_utc(zone) for user_id, zone in rows}
+
+
+def locked_user_zone(session: Session, user_id: int) -> ZoneInfo:
+    return locked_user_zones(session, [user_id]).get(user_id, UTC)
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(start: date, granularity: str) -> date:
+    if granularity == "week":
+        return start + timedelta(days=7)
+    if granularity == "month":
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start + timedelta(days=1)
+
+
+def rollup_key(activity: Activity, zone: ZoneInfo = UTC) -> RollupKey:
+    return (activity.user_id, activity_day(activity.date, zone), ActivityType(activity.activity_type))
+
+
+class RollupSnapshot(NamedTuple):
+    key: RollupKey
+    minutes: int
+    tags: Tuple[str, ...]
+
+
+def rollup_snapshot(activity: Activity, zone: ZoneInfo = UTC) -> RollupSnapshot:
+    return RollupSnapshot(rollup_key(activity, zone), activity.duration_minutes, tuple(activity.tags or ()))
+
+
+class RollupDelta:
+    # Accumulates signed changes for the daily rollup and for the
+    # day/week/month buckets behind the analytics series. Every activity
+    # counts once in the untagged bucket and once per distinct tag.
+    def __init__(self):
+        self._deltas: Dict[RollupKey, List[int]] = defaultdict(lambda: [0, 0])
+        self._buckets: Dict[BucketKey, List[int]] = defaultdict(lambda: [0, 0])
+
+    def add(self, activity: Activity, sign: int = 1, zone: ZoneInfo = UTC):
+        self.add_snapshot(rollup_snapshot(activity, zone), sign)
+
+    def add_snapshot(self, snapshot: RollupSnapshot, sign: int = 1):
+        self.add_key(snapshot.key, snapshot.minutes, sign, snapshot.tags)
+
+    def add_key(self, key: RollupKey, minutes: int, sign: int = 1, tags: Sequence[str] = ()):
+        delta = self._deltas[key]
+        delta[0] += sign * minutes
+        delta[1] += sign
+
+        user_id, day, activity_type = key
+        for granularity in GRANULARITIES:
+            start = bucket_start(day, granularity)
+            for tag in {ALL_TAGS, *tags}:
+                bucket = self._buckets[(user_id, granularity, start, tag, activity_type)]
+                bucket[0] += sign * minutes
+                bucket[1] += sign
+
+    def rows(self) -> List[dict]:
+        return [
+            {
+                "user_id": user_id,
+                "day": day,
+                "activity_type": activity_type,
+                "minutes": minutes,
+                "count": count,
+            }
+            for (user_id, day, activity_type), (minutes, count) in self._deltas.items()
+            if minutes or count
+        ]
+
+    def bucket_rows(self) -> List[dict]:
+        return [
+            {
+                "user_id": user_id,
+                "granularity": granularity,
+                "bucket": start,
+                "tag": tag,
+                "activity_type": activity_type,
+                "minutes": minutes,
+                "count": count,
+            }
+            for (user_id, granularity, start, tag, activity_type), (minutes, count) in self._buckets.items()
+            if minutes or count
+        ]
+
+
+def _upsert(session: Session, model, rows: List[dict]):
+    if not rows:
+        return
+
+    table = model.__table__
+    dialect_insert = DIALECT_INSERTS.get(session.get_bind().dialect.name)
+    if dialect_insert is None:
+        _apply_rows_orm(session, model, rows)
+        return
+
+    # Executed as executemany so the statement compiles once (and stays in
+    # the compiled cache) however many rows a bulk chunk touches.
+    statement = dialect_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(table.primary_key.columns),
+        set_={
+            "minutes": table.c.minutes + statement.excluded.minutes,
+            "count": table.c.count + statement.excluded.count,
+        },
+    )
+    session.exec(statement, params=rows)
+
+
+def apply_rollup_delta(session: Session, delta: RollupDelta):
+    _upsert(session, UserDailyRollup, delta.rows())
+    _upsert(session, ActivityBucket, delta.bucket_rows())
+
+
+def _apply_rows_orm(session: Session, model, rows: List[dict]):
+    primary_key = [column.name for column in model.__table__.primary_key.columns]
+    for row in rows:
+        rollup = session.get(model, tuple(row[name] for name in primary_key))
+        if rollup is None:
+            rollup = model(**row)
+        else:
+            rollup.minutes += row["minutes"]
+            rollup.count += row["count"]
+        session.add(rollup)
+    session.flush()
+
+
+def record_activity_created(session: Session, activity: Activity, zone: ZoneInfo = UTC):
+    delta = RollupDelta()
+    delta.add(activity, zone=zone)
+    apply_rollup_delta(session, delta)
+
+
+def record_activity_deleted(session: Session, activity: Activity, zone: ZoneInfo = UTC):
+    delta = RollupDelta()
+    delta.add(activity, sign=-1, zone=zone)
+    apply_rollup_delta(session, delta)
+
+
+def record_activity_updated(session: Session, previous: RollupSnapshot, activity: Activity, zone: ZoneInfo = UTC):
+    delta = RollupDelta()
+    delta.add_snapshot(previous, sign=-1)
+    delta.add(activity, zone=zone)
+    apply_rollup_delta(session, delta)
+
+
+def _expected_rollups(session: Session, user_id: Optional[int] = None) -> RollupDelta:
+    # Local days depend on each owner's time zone and tags live in a JSON
+    # column, so expected rollups and buckets are recomputed by streaming the
+    # activities through a RollupDelta rather than in a single statement.
+    query = select(
+        Activity.user_id,
+        Activity.date,
+        Activity.activity_type,
+        Activity.duration_minutes,
+        Activity.tags,
+        User.timezone,
+    ).join(User, User.id == Activity.user_id).execution_options(yield_per=REBUILD_BATCH_SIZE)
+    if user_id is not None:
+        query = query.where(Activity.user_id == user_id)
+
+    delta = RollupDelta()
+    for owner, moment, activity_type, minutes, tags, zone_name in session.exec(query):
+        zone = zone_or_utc(zone_name)
+        delta.add_key((owner, activity_day(moment, zone), ActivityType(activity_type)), minutes, tags=tags or ())
+    return delta
+
+
+def rebuild_rollups(session: Session, user_id: Optional[int] = None) -> int:
+    for model in (UserDailyRollup, ActivityBucket):
+        clear = delete(model)
+        if user_id is not None:
+            clear = clear.where(model.user_id == user_id)
+        session.exec(clear)
+
+    # Runs in the caller's transaction. Rows are upserted rather than
+    # inserted so a concurrent write that recreated one of the cleared keys
+    # adds to it instead of failing on the primary key.
+    expected = _expected_rollups(session, user_id)
+    for model, rows in ((UserDailyRollup, expected.rows()), (ActivityBucket, expected.bucket_rows())):
+        for start in range(0, len(rows), REBUILD_BATCH_SIZE):
+            allow(1)
+            _upsert(session, model, rows[start:start + REBUILD_BATCH_SIZE])
+
+    count_query = select(func.count()).select_from(UserDailyRollup)
+    if user_id is not None:
+        count_query = count_query.where(UserDailyRollup.user_id == user_id)
+    return session.exec(count_query).one()
+
+
+def _normalize_day(value) -> date:
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _as_mapping(rows: Iterable) -> Dict[RollupKey, Tuple[int, int]]:
+    mapping = {}
+    for user_id, day, activity_type, minutes, count in rows:
+        if not minutes and not count:
+            continue
+        mapping[(user_id, _normalize_day(day), ActivityType(activity_type))] = (minutes or 0, count or 0)
+    return mapping
+
+
+def check_rollups(session: Session, user_id: Optional[int] = None) -> List[dict]:
+    expected_delta = _expected_rollups(session, user_id)
+    expected = _as_mapping(
+        (row["user_id"], row["day"], row["activity_type"], row["minutes"], row["count"])
+        for row in expected_delta.rows()
+    )
+
+    stored_query = select(
+        UserDailyRollup.user_id,
+        UserDailyRollup.day,
+        UserDailyRollup.activity_type,
+        UserDailyRollup.minutes,
+        UserDailyRollup.count,
+    )
+    if user_id is not None:
+        stored_query = stored_query.where(UserDailyRollup.user_id == user_id)
+    stored = _as_mapping(session.exec(stored_query).all())
+
+    mismatches = []
+    for key in sorted(expected.keys() | stored.keys(), key=lambda k: (k[0], k[1], k[2].value)):
+        if expected.get(key) != stored.get(key):
+            mismatches.append({
+                "user_id": key[0],
+                "day": key[1].isoformat(),
+                "activity_type": key[2].value,
+                "expected": expected.get(key, (0, 0)),
+                "stored": stored.get(key, (0, 0)),
+            })
+
+    expected_buckets = {
+        (row["user_id"], row["granularity"], row["bucket"], row["tag"], row["activity_type"]): (row["minutes"], row["count"])
+        for row in expected_delta.bucket_rows()
+    }
+    bucket_query = select(
+        ActivityBucket.user_id,
+        ActivityBucket.granularity,
+        ActivityBucket.bucket,
+        ActivityBucket.tag,
+        ActivityBucket.activity_type,
+        ActivityBucket.minutes,
+        ActivityBucket.count,
+    )
+    if user_id is not None:
+        bucket_query = bucket_query.where(ActivityBucket.user_id == user_id)
+    stored_buckets = {
+        (owner, granularity, _normalize_day(start), tag, ActivityType(activity_type)): (minutes, count)
+        for owner, granularity, start, tag, activity_type, minutes, count in session.exec(bucket_query).all()
+        if minutes or count
+    }
+
+    for key in sorted(expected_buckets.keys() | stored_buckets.keys(), key=lambda k: (k[0], k[1], k[2], k[3], k[4].value)):
+        if expected_buckets.get(key) != stored_buckets.get(key):
+            mismatches.append({
+                "user_id": key[0],
+                "granularity": key[1],
+                "bucket": key[2].isoformat(),
+                "tag": key[3],
+                "activity_type": key[4].value,
+                "expected": expected_buckets.get(key, (0, 0)),
+                "stored": stored_buckets.get(key, (0, 0)),
+            })
+    return mismatches
@@ -0,0 +1,27 @@
+from fastapi import Depends
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import database
+from app.core.cache import cache, version_timestamp
+from app.services.auth import get_current_user
+
+
+# Engine for a user's reads. The user's data version records when they last
+# wrote (see cache.new_version), which is what the router needs for
+# read-your-writes; without replicas the lookup is skipped entirely. A
+# version from the in-process cache (no Redis, or Redis down) only knows
+# this worker's writes, so those reads stay on the primary.
+async def read_engine(user_id: int):
+    router = database.read_router
+    if not router.replicas:
+        return router.primary
+    version = await cache.user_version(user_id)
+    if not cache.shared:
+        return router.primary
+    return router.engine_for(version_timestamp(version))
+
+
+# Session for read-only routes.
+async def get_read_session(current_user = Depends(get_current_user)):
+    async with AsyncSession(await read_engine(current_user.id), expire_on_commit=False) as session:
+        yield session
@@ -0,0 +1,84 @@
+import re
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Float, Integer, cast, column, literal_column, table, tuple_
+from sqlmodel import Session, select, func
+
+from app.core.config import settings
+from app.models.activity import Activity, ActivityType
+from app.schemas.activity import ACTIVITY_READ_COLUMNS
+from app.services.tags import tagged_activity_ids
+
+MAX_SEARCH_TERMS = 8
+
+# PostgreSQL matches against the stored, GIN-indexed activity.search_vector
+# column; SQLite against the activity_fts FTS5 table kept in sync by
+# triggers. Both are created by the baseline migration (alembic/versions).
+activity_fts = table("activity_fts", column("rowid", Integer))
+
+
+def search_terms(query: str) -> List[str]:
+    return re.findall(r"\w+", query)[:MAX_SEARCH_TERMS]
+
+
+def _postgresql_matches(terms: List[str]):
+    vector = literal_column("activity.search_vector")
+    tsquery = func.to_tsquery(
+        literal_column(f"'{settings.search_config}'::regconfig"),
+        " & ".join(f"{term}:*" for term in terms),
+    )
+    rank = cast(func.ts_rank_cd(vector, tsquery), Float)
+    return rank, [vector.op("@@")(tsquery)]
+
+
+def _sqlite_matches(terms: List[str]):
+    fts = literal_column("activity_fts")
+    matches = select(
+        activity_fts.c.rowid.label("id"),
+        (-func.bm25(fts, 1.0, 0.4)).label("rank"),
+    ).where(
+        fts.op("MATCH")(" ".join(f'"{term}"*' for term in terms))
+    ).subquery()
+    return matches.c.rank, [Activity.id == matches.c.id]
+
+
+def search_activities(
+    session: Session,
+    user_id: int,
+    query: str,
+    limit: int,
+    after: Optional[Tuple[float, int]] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    activity_type: Optional[ActivityType] = None,
+    tag: Optional[str] = None,
+) -> List[Tuple[dict, float]]:
+    terms = search_terms(query)
+    if not terms:
+        raise ValueError("Search query has no searchable terms")
+
+    if session.get_bind().dialect.name == "postgresql":
+        rank, match = _postgresql_matches(terms)
+    else:
+        rank, match = _sqlite_matches(terms)
+
+    statement = select(*ACTIVITY_READ_COLUMNS, rank.label("rank")).where(Activity.user_id == user_id, *match)
+
+    if start:
+        statement = statement.where(Activity.date >= start)
+    if end:
+        statement = statement.where(Activity.date < end)
+    if activity_type:
+        statement = statement.where(Activity.activity_type == activity_type)
+    if tag:
+        statement = statement.where(Activity.id.in_(tagged_activity_ids(user_id, tag)))
+    if after:
+        statement = statement.where(tuple_(rank, Activity.id) < tuple_(*after))
+
+    statement = statement.order_by(rank.desc(), Activity.id.desc()).limit(limit)
+    results = []
+    for row in session.exec(statement).all():
+        activity = row._asdict()
+        results.append((activity, float(activity.pop("rank"))))
+    return results
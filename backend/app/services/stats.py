@@ -0,0 +1,136 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import Integer, bindparam, case
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlmodel import Session, select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import cache
+from app.models.activity import Activity, ActivityType
+from app.models.rollup import UserDailyRollup
+
+DAILY_GOAL_MINUTES = 480
+RECENT_ACTIVITIES_LIMIT = 5
+
+
+class day_number(FunctionElement):
+    type = Integer()
+    inherit_cache = True
+    name = "day_number"
+
+
+@compiles(day_number, "sqlite")
+def _day_number_sqlite(element, compiler, **kw):
+    return "CAST(julianday(date(%s)) AS INTEGER)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(day_number, "postgresql")
+def _day_number_postgresql(element, compiler, **kw):
+    return "(CAST(%s AS DATE) - DATE '1970-01-01')" % compiler.process(element.clauses, **kw)
+
+
+def _type_breakdown(session: Session, user_id: int, today: date):
+    week_ago = today - timedelta(days=7)
+    rollup = UserDailyRollup
+
+    query = select(
+        rollup.activity_type,
+        func.sum(rollup.count),
+        func.sum(rollup.minutes),
+        func.sum(case((rollup.day >= week_ago, rollup.minutes), else_=0)),
+        func.sum(case((rollup.day == today, rollup.minutes), else_=0)),
+    ).where(
+        rollup.user_id == user_id
+    ).group_by(rollup.activity_type)
+
+    return session.exec(query).all()
+
+
+def _consecutive_days(session: Session, user_id: int, today: date) -> int:
+    # Gaps-and-islands: walking the distinct active days backwards from today,
+    # a day belongs to the current streak while it sits exactly rn - 1 days
+    # before today. Once a gap appears that offset can only grow.
+    today_number = day_number(bindparam("today", today))
+
+    active_days = select(
+        day_number(UserDailyRollup.day).label("day")
+    ).where(
+        UserDailyRollup.user_id == user_id,
+        UserDailyRollup.count > 0,
+    ).distinct().subquery()
+
+    ranked_days = select(
+        active_days.c.day,
+        func.row_number().over(order_by=active_days.c.day.desc()).label("rn"),
+    ).where(
+        active_days.c.day <= today_number
+    ).subquery()
+
+    query = select(func.count()).select_from(ranked_days).where(
+        ranked_days.c.day == today_number - ranked_days.c.rn + 1
+    )
+
+    return session.exec(query).one() or 0
+
+
+def _recent_activities(session: Session, user_id: int):
+    query = select(Activity).where(
+        Activity.user_id == user_id
+    ).order_by(Activity.date.desc()).limit(RECENT_ACTIVITIES_LIMIT)
+
+    return session.exec(query).all()
+
+
+def compute_user_stats(session: Session, user_id: int, today: Optional[date] = None) -> dict:
+    if today is None:
+        today = datetime.now(timezone.utc).date()
+
+    counts_by_type = {}
+    total_activities = 0
+    total_minutes = 0
+    week_minutes = 0
+    today_minutes = 0
+
+    for activity_type, count, minutes, week, today_sum in _type_breakdown(session, user_id, today):
+        counts_by_type[ActivityType(activity_type)] = count
+        total_activities += count
+        total_minutes += minutes or 0
+        week_minutes += week or 0
+        today_minutes += today_sum or 0
+
+    activities_by_type = {
+        activity_type.value: counts_by_type[activity_type]
+        for activity_type in ActivityType
+        if counts_by_type.get(activity_type, 0) > 0
+    }
+
+    most_frequent_type = max(activities_by_type.items(), key=lambda x: x[1]) if activities_by_type else None
+
+    consecutive_days = _consecutive_days(session, user_id, today)
+
+    daily_goal_percentage = min(100, int((today_minutes / DAILY_GOAL_MINUTES) * 100)) if DAILY_GOAL_MINUTES > 0 else 0
+
+    return {
+        "total_activities": total_activities,
+        "total_minutes": total_minutes,
+        "total_hours": round(total_minutes / 60, 1),
+        "week_minutes": week_minutes,
+        "week_hours": round(week_minutes / 60, 1),
+        "activities_by_type": activities_by_type,
+        "most_frequent_type": most_frequent_type[0] if most_frequent_type else None,
+        "consecutive_days": consecutive_days,
+        "daily_goal_percentage": daily_goal_percentage,
+        "today_minutes": today_minutes,
+        "recent_activities": _recent_activities(session, user_id),
+    }
+
+
+async def cached_user_stats(session: AsyncSession, user_id: int, today: date) -> dict:
+    async def compute():
+        stats = await session.run_sync(compute_user_stats, user_id, today)
+        return jsonable_encoder(stats)
+
+    return await cache.get_or_compute(user_id, f"stats:{today.isoformat()}", compute)
@@ -0,0 +1,85 @@
+from typing import List, Optional
+
+from sqlalchemy import delete, true
+from sqlmodel import Session, select, func
+
+from app.models.activity import Activity, ActivityTag
+from app.models.rollup import ActivityBucket
+from app.services.rollup import ALL_TAGS, DIALECT_INSERTS
+
+
+def _tag_values(dialect_name: str):
+    if dialect_name == "postgresql":
+        return func.json_array_elements_text(Activity.tags).table_valued("value")
+    return func.json_each(Activity.tags).table_valued("value")
+
+
+def insert_activity_tags(session: Session, *conditions) -> None:
+    # Expands the JSON tags of the matching activities into activity_tag in
+    # one INSERT ... SELECT, so bulk writes never load rows into Python.
+    dialect_name = session.get_bind().dialect.name
+    values = _tag_values(dialect_name)
+    rows = select(Activity.id, values.c.value, Activity.user_id).join(values, true()).where(
+        values.c.value != "",
+        *conditions,
+    ).distinct()
+
+    statement = DIALECT_INSERTS[dialect_name](ActivityTag.__table__).from_select(
+        ["activity_id", "tag", "user_id"],
+        rows,
+    ).on_conflict_do_nothing()
+    session.exec(statement)
+
+
+def record_activity_tags(session: Session, activity: Activity):
+    session.flush()
+    session.exec(delete(ActivityTag).where(ActivityTag.activity_id == activity.id))
+    insert_activity_tags(session, Activity.id == activity.id)
+
+
+def forget_activity_tags(session: Session, activity: Activity):
+    session.exec(delete(ActivityTag).where(ActivityTag.activity_id == activity.id))
+
+
+def rebuild_activity_tags(session: Session, user_id: Optional[int] = None) -> int:
+    clear = delete(ActivityTag)
+    conditions = []
+    if user_id is not None:
+        clear = clear.where(ActivityTag.user_id == user_id)
+        conditions.append(Activity.user_id == user_id)
+    session.exec(clear)
+    insert_activity_tags(session, *conditions)
+    session.commit()
+
+    count_query = select(func.count()).select_from(ActivityTag)
+    if user_id is not None:
+        count_query = count_query.where(ActivityTag.user_id == user_id)
+    return session.exec(count_query).one()
+
+
+def tagged_activity_ids(user_id: int, tag: str):
+    return select(ActivityTag.activity_id).where(
+        ActivityTag.user_id == user_id,
+        ActivityTag.tag == tag,
+    )
+
+
+def compute_tag_stats(session: Session, user_id: int) -> List[dict]:
+    # Monthly buckets already hold per-tag totals, so this reads a few rows
+    # per tag and month instead of the activities themselves.
+    query = select(
+        ActivityBucket.tag,
+        func.sum(ActivityBucket.count).label("count"),
+        func.sum(ActivityBucket.minutes).label("minutes"),
+    ).where(
+        ActivityBucket.user_id == user_id,
+        ActivityBucket.granularity == "month",
+        ActivityBucket.tag != ALL_TAGS,
+    ).group_by(ActivityBucket.tag)
+
+    rows = [
+        {"tag": tag, "count": count, "minutes": minutes}
+        for tag, count, minutes in session.exec(query).all()
+        if count
+    ]
+    return sorted(rows, key=lambda row: (-row["count"], -row["minutes"], row["tag"]))
@@ -0,0 +1,308 @@
+import asyncio
+import fcntl
+import glob
+import json
+import logging
+import os
+from collections import deque
+from typing import Deque, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.database import async_engine
+from app.core.metrics import registry
+from app.models.activity import ActivityCreate
+from app.models.journal import WriteBehindCheckpoint
+from app.services.events import stats_events
+from app.services.ingest import insert_activity_rows
+from app.services.rollup import DIALECT_INSERTS
+
+logger = logging.getLogger(__name__)
+
+# Write-behind for high-frequency creates. A create is acknowledged once its
+# record is appended and fsynced to a local journal; concurrent appends share
+# one fsync. A background task inserts the journaled records in multi-row
+# transactions when batch_size records are waiting or flush_interval elapses,
+# and each transaction also advances the journal's checkpoint, so replaying
+# the journal after a crash inserts exactly the records that were missing.
+#
+# Workers sharing a journal path each hold an exclusive lock on their own
+# file, <path>.<slot>, with its own sequence numbers and checkpoint row. A
+# starting worker takes the lowest unlocked slot and replays it, then drains
+# any other unlocked journal left behind by workers that no longer run.
+
+
+class JournalRecord(NamedTuple):
+    seq: int
+    user_id: int
+    activity: dict
+
+
+class WriteBehindBuffer:
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        path: str,
+        batch_size: int = 500,
+        flush_interval: float = 0.2,
+        fsync: bool = True,
+    ):
+        self.engine = engine
+        self.base_path = os.path.abspath(path)
+        self.path: Optional[str] = None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+
+        self.queue: Deque[JournalRecord] = deque()
+        self.last_seq = 0
+        self.flushed = 0
+        self.dropped = 0
+
+        self._file = None
+        self._pending: List[Tuple[int, ActivityCreate, asyncio.Future]] = []
+        self._journal_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def open(self):
+        slot = 0
+        while self._file is None:
+            self.path = f"{self.base_path}.{slot}"
+            self._file = self._lock(self.path)
+            slot += 1
+
+    @staticmethod
+    def _lock(path: str):
+        journal = open(path, "ab")
+        try:
+            fcntl.flock(journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            journal.close()
+            return None
+        return journal
+
+    async def start(self):
+        if self._file is None:
+            self.open()
+        await self._recover_orphans()
+        replayed = await self.replay()
+        if replayed:
+            logger.warning("Replaying %d write-behind records from %s", replayed, self.path)
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+        if self.queue:
+            self._wakeup.set()
+
+    async def stop(self):
+        # The flusher is asked to finish rather than cancelled: cancelling it
+        # between a batch's commit and its removal from the queue would
+        # insert that batch twice.
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    async def submit(self, user_id: int, activity: ActivityCreate) -> int:
+        # Records waiting for the journal lock are written together by
+        # whichever submitter gets it next, then queued for the flusher in
+        # the same critical section, so compaction never sees a journaled
+        # record that is missing from the queue.
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((user_id, activity, future))
+        async with self._journal_lock:
+            if not future.done():
+                batch, self._pending = self._pending, []
+                await self._append(batch)
+        seq = await future
+
+        if len(self.queue) >= self.batch_size:
+            self._wakeup.set()
+        return seq
+
+    async def _append(self, batch):
+        records = []
+        for user_id, activity, _ in batch:
+            self.last_seq += 1
+            records.append(JournalRecord(self.last_seq, user_id, activity.model_dump(mode="json")))
+
+        lines = b"".join(json.dumps(record._asdict(), separators=(",", ":")).encode() + b"\n" for record in records)
+        try:
+            await asyncio.to_thread(self._write, lines)
+        except Exception as e:
+            self.last_seq -= len(records)
+            for *_, future in batch:
+                future.set_exception(e)
+            return
+
+        self.queue.extend(records)
+        for record, (*_, future) in zip(records, batch):
+            future.set_result(record.seq)
+
+    def _write(self, data: bytes):
+        self._file.write(data)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Write-behind flush failed, retrying in %.2fs", self.flush_interval)
+
+    async def flush(self) -> int:
+        flushed = 0
+        async with self._flush_lock:
+            while self.queue:
+                batch = [self.queue[index] for index in range(min(self.batch_size, len(self.queue)))]
+                await self._flush_batch(batch)
+                for _ in batch:
+                    self.queue.popleft()
+                flushed += len(batch)
+
+            if flushed:
+                await self._compact()
+        return flushed
+
+    async def _flush_batch(self, batch: List[JournalRecord]):
+        async with AsyncSession(self.engine, expire_on_commit=False) as session:
+            try:
+                await session.run_sync(self._insert, batch)
+            except (IntegrityError, DataError):
+                # A record the database rejects (e.g. its user was deleted)
+                # must not block the journal: insert the batch one record at
+                # a time and skip the ones that fail.
+                await session.rollback()
+                for record in batch:
+                    try:
+                        await session.run_sync(self._insert, [record])
+                    except (IntegrityError, DataError) as e:
+                        await session.rollback()
+                        await session.run_sync(self._checkpoint, record.seq, True)
+                        self.dropped += 1
+                        logger.error("Dropping write-behind record %d: %s", record.seq, getattr(e, "orig", e))
+
+        self.flushed += len(batch)
+        for user_id in {record.user_id for record in batch}:
+            await cache.bump_user_version(user_id)
+            await stats_events.publish(user_id)
+
+    def _insert(self, session: Session, batch: List[JournalRecord]):
+        insert_activity_rows(session, [
+            (record.user_id, ActivityCreate.model_validate(record.activity))
+            for record in batch
+        ])
+        self._checkpoint(session, batch[-1].seq, commit=False)
+        session.commit()
+
+    def _checkpoint(self, session: Session, seq: int, commit: bool = True):
+        table = WriteBehindCheckpoint.__table__
+        statement = DIALECT_INSERTS[session.get_bind().dialect.name](table).values(journal=self.path, seq=seq)
+        statement = statement.on_conflict_do_update(index_elements=[table.c.journal], set_={"seq": statement.excluded.seq})
+        session.exec(statement)
+        if commit:
+            session.commit()
+
+    async def _compact(self):
+        # Everything journaled so far is committed once the queue is empty;
+        # holding the journal lock keeps new appends out while truncating.
+        async with self._journal_lock:
+            if not self.queue and self._file is not None:
+                await asyncio.to_thread(self._file.truncate, 0)
+
+    async def _recover_orphans(self):
+        for path in sorted(glob.glob(f"{glob.escape(self.base_path)}.*")):
+            if path == self.path or not path.rsplit(".", 1)[1].isdigit():
+                continue
+            orphan = WriteBehindBuffer(self.engine, self.base_path, self.batch_size, fsync=self.fsync)
+            orphan._file = self._lock(path)
+            if orphan._file is None:
+                continue
+
+            orphan.path = path
+            try:
+                replayed = await orphan.replay()
+                if replayed:
+                    logger.warning("Recovering %d write-behind records from %s", replayed, path)
+                    await orphan.flush()
+                    self.flushed += orphan.flushed
+                    self.dropped += orphan.dropped
+            except Exception:
+                logger.exception("Could not recover write-behind journal %s, leaving it for the next start", path)
+            finally:
+                orphan._file.close()
+
+    async def replay(self) -> int:
+        async with AsyncSession(self.engine) as session:
+            checkpoint = (await session.exec(
+                select(WriteBehindCheckpoint.seq).where(WriteBehindCheckpoint.journal == self.path)
+            )).first() or 0
+
+        self.last_seq = max(self.last_seq, checkpoint)
+        if not os.path.exists(self.path):
+            return 0
+
+        replayed = 0
+        with open(self.path, "rb") as journal:
+            for line in journal:
+                try:
+                    record = JournalRecord(**json.loads(line))
+                except (ValueError, TypeError):
+                    # A torn final line from a crash mid-append was never
+                    # acknowledged, so it is safe to skip.
+                    continue
+                self.last_seq = max(self.last_seq, record.seq)
+                if record.seq > checkpoint:
+                    self.queue.append(record)
+                    replayed += 1
+        return replayed
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self.queue),
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "last_seq": self.last_seq,
+        }
+
+
+write_behind = WriteBehindBuffer(
+    async_engine,
+    settings.write_behind_journal_path,
+    batch_size=settings.write_behind_batch_size,
+    flush_interval=settings.write_behind_flush_interval_ms / 1000,
+    fsync=settings.write_behind_fsync,
+)
+
+
+@registry.collector
+def collect_write_behind():
+    if not write_behind.running:
+        return
+    stats = write_behind.stats()
+    yield "kairoflow_write_behind_pending", "gauge", "Journaled creates waiting to be flushed.", {}, stats["pending"]
+    yield "kairoflow_write_behind_flushed_total", "counter", "Journaled creates flushed to the database.", {}, stats["flushed"]
+    yield "kairoflow_write_behind_dropped_total", "counter", "Journaled creates rejected by the database.", {}, stats["dropped"]
@@ -0,0 +1,105 @@
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import anyio.to_thread
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+
+# Compares the two ways a route can reach the database: a sync `def` route
+# holding a Starlette threadpool slot while it waits on a sync Session, and
+# an `async def` route awaiting an AsyncSession. Both modes share the same
+# pool size and run the same statement, which should be DB-latency bound
+# (pg_sleep by default) so the difference is only in how waiting is done.
+
+
+def async_url(database_url: str) -> str:
+    if database_url.startswith("sqlite:"):
+        return database_url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    return database_url
+
+
+def build_app(database_url: str, statement: str, pool_size: int, max_overflow: int):
+    engine = create_engine(database_url, pool_size=pool_size, max_overflow=max_overflow)
+    async_engine = create_async_engine(async_url(database_url), pool_size=pool_size, max_overflow=max_overflow)
+    query = text(statement)
+    app = FastAPI()
+
+    @app.get("/sync")
+    def sync_route():
+        with Session(engine) as session:
+            session.exec(query)
+        return {"mode": "sync"}
+
+    @app.get("/async")
+    async def async_route():
+        async with AsyncSession(async_engine) as session:
+            await session.exec(query)
+        return {"mode": "async"}
+
+    return app, engine, async_engine
+
+
+async def drive(app: FastAPI, path: str, total: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "throughput": total / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load comparison of sync and async database routes")
+    parser.add_argument("--database-url", default=settings.database_url)
+    parser.add_argument("--statement", default="SELECT pg_sleep(0.02)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 40, 100, 200])
+    parser.add_argument("--pool-size", type=int, default=50)
+    parser.add_argument("--max-overflow", type=int, default=50)
+    parser.add_argument("--threadpool", type=int, default=40, help="Starlette threadpool tokens (anyio default: 40)")
+    args = parser.parse_args()
+
+    anyio.to_thread.current_default_thread_limiter().total_tokens = args.threadpool
+    app, engine, async_engine = build_app(args.database_url, args.statement, args.pool_size, args.max_overflow)
+
+    print(f"pool={args.pool_size}+{args.max_overflow} threadpool={args.threadpool} statement={args.statement!r}")
+    print(f"{'mode':<6} {'conc':>5} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for concurrency in args.concurrency:
+        for mode in ("sync", "async"):
+            result = await drive(app, f"/{mode}", args.requests, concurrency)
+            print(f"{mode:<6} {concurrency:>5} {result['throughput']:>9.0f} {result['p50']:>8.1f} {result['p95']:>8.1f}")
+
+    engine.dispose()
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
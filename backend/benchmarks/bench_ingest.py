@@ -0,0 +1,91 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from main import app
+from app.core.database import get_async_session
+from app.core.migrations import upgrade
+
+from bench_async import async_url
+
+# Bulk ingestion must sustain at least this many rows per second and beat
+# one POST /activities/ per row by at least TARGET_SPEEDUP.
+TARGET_ROWS_PER_SECOND = 5000
+TARGET_SPEEDUP = 10
+
+
+def make_rows(count: int):
+    return [
+        {
+            "title": f"Synced entry {i}",
+            "activity_type": ["WORK", "STUDY", "EXERCISE", "LEISURE", "OTHER"][i % 5],
+            "duration_minutes": 5 + i % 120,
+            "tags": ["sync"],
+            "date": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T{i % 24:02d}:00:00",
+        }
+        for i in range(count)
+    ]
+
+
+def authenticate(client: TestClient):
+    email = f"bench_{uuid.uuid4().hex[:8]}@bench.com"
+    client.post("/auth/register", json={"email": email, "password": "password123", "full_name": "Bench"})
+    token = client.post("/auth/login", params={"email": email, "password": "password123"}).json()["access_token"]
+    client.headers.update({"Authorization": f"Bearer {token}"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare single-row and bulk activity ingestion")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench_ingest.db"
+    engine = create_engine(database_url)
+    upgrade(engine)
+
+    async_engine = create_async_engine(async_url(database_url))
+
+    async def get_session_override():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_async_session] = get_session_override
+    client = TestClient(app)
+    authenticate(client)
+    rows = make_rows(args.rows)
+
+    start = time.perf_counter()
+    for row in rows:
+        client.post("/activities/", json=row)
+    single_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = client.post("/activities/bulk", json=rows).json()
+    bulk_elapsed = time.perf_counter() - start
+
+    single_rate = args.rows / single_elapsed
+    bulk_rate = result["inserted"] / bulk_elapsed
+    speedup = bulk_rate / single_rate
+
+    print(f"single-row: {single_rate:10.0f} rows/s ({single_elapsed:.2f}s)")
+    print(f"bulk:       {bulk_rate:10.0f} rows/s ({bulk_elapsed:.2f}s)")
+    print(f"speedup:    {speedup:10.1f}x (target {TARGET_SPEEDUP}x, {TARGET_ROWS_PER_SECOND} rows/s)")
+
+    app.dependency_overrides.clear()
+    if bulk_rate < TARGET_ROWS_PER_SECOND or speedup < TARGET_SPEEDUP:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.core.responses import MsgPackResponse, msgpack
+from app.models.activity import Activity, ActivityType
+from app.schemas.activity import ActivityRead
+
+# Per-row cost of turning one page of activities into a response body. The
+# previous path validated ORM objects against response_model=List[Activity]
+# and rendered them with the stdlib encoder; the lean path renders the
+# selected columns as plain dicts with orjson (or MessagePack).
+TARGET_SPEEDUP = 3
+
+
+def make_rows(count: int):
+    start = datetime(2024, 1, 1, 8, 0, 0)
+    types = list(ActivityType)
+    return [
+        {
+            "id": i + 1,
+            "user_id": 1,
+            "title": f"Activity {i}",
+            "activity_type": types[i % len(types)],
+            "duration_minutes": 5 + i % 120,
+            "description": "Some notes about what was done" if i % 3 else None,
+            "tags": ["focus", "project"] if i % 2 else [],
+            "date": start + timedelta(minutes=37 * i),
+            "created_at": start + timedelta(minutes=37 * i, seconds=12, microseconds=345),
+            "updated_at": start + timedelta(minutes=37 * i, seconds=12, microseconds=345),
+        }
+        for i in range(count)
+    ]
+
+
+def measure(render, repeat: int) -> float:
+    render()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        render()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare response serialization paths for one page of activities")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    ActivityRead.model_validate(rows[0])
+    activities = [Activity(**row) for row in rows]
+    field = create_model_field("Response_get_activities", List[Activity], mode="serialization")
+
+    def model_path():
+        content = asyncio.run(serialize_response(field=field, response_content=activities))
+        return JSONResponse(content).body
+
+    results = {
+        "response_model + json": measure(model_path, args.repeat),
+        "lean rows + orjson": measure(lambda: ORJSONResponse(rows).body, args.repeat),
+    }
+    if msgpack is not None:
+        results["lean rows + msgpack"] = measure(lambda: MsgPackResponse(rows).body, args.repeat)
+
+    baseline = results["response_model + json"]
+    for name, elapsed in results.items():
+        print(f"{name:24} {elapsed * 1e6 / args.rows:8.2f} us/row  {baseline / elapsed:6.1f}x")
+
+    if baseline / results["lean rows + orjson"] < TARGET_SPEEDUP:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
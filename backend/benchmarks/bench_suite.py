@@ -0,0 +1,343 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("CACHE_BACKEND", "memory")
+
+import httpx
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, create_engine, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from main import app
+from app.core.cache import cache
+from app.core.database import get_async_session
+from app.models.activity import Activity
+from app.models.user import User
+from app.services.auth import create_access_token
+from app.services.hashing import hashing_pool
+from app.services.pagination import encode_cursor
+from app.services.routing import get_read_session
+
+from bench_async import async_url
+from seed import BENCH_PASSWORD, TAGS, seed
+
+# Drives every API endpoint in-process over ASGI against a seeded database
+# and compares latency percentiles and throughput with a stored baseline. Baselines
+# are machine specific: record them with --update-baseline on the machine
+# that runs the comparison.
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+
+
+@dataclass
+class Scenario:
+    name: str
+    build: Callable[["Context", int], dict]
+    weight: float = 1.0
+    expected: int = 200
+    prepare: Optional[Callable] = None
+    writes: bool = False
+
+
+class Context:
+    def __init__(self, users: List[User], sample_ids: Dict[int, List[int]], cursors: Dict[int, str]):
+        self.users = users
+        self.tokens = {user.id: create_access_token(user, timedelta(days=1)) for user in users}
+        self.sample_ids = sample_ids
+        self.cursors = cursors
+        self.etags: Dict[int, str] = {}
+        self.created: List[tuple] = []
+
+    def user(self, i: int) -> User:
+        return self.users[i % len(self.users)]
+
+    def auth(self, user: User) -> dict:
+        return {"Authorization": f"Bearer {self.tokens[user.id]}"}
+
+    def get(self, i: int, url: str, **kwargs) -> dict:
+        user = self.user(i)
+        return {"method": "GET", "url": url, "headers": self.auth(user), **kwargs}
+
+
+def today() -> date:
+    return date.today()
+
+
+def new_activity(i: int) -> dict:
+    return {
+        "title": f"Benchmark write {i}",
+        "activity_type": ["WORK", "STUDY", "EXERCISE"][i % 3],
+        "duration_minutes": 15 + i % 60,
+        "tags": [TAGS[i % 5]],
+    }
+
+
+def create_request(ctx: Context, i: int) -> dict:
+    user = ctx.user(i)
+    return {"method": "POST", "url": "/activities/", "headers": ctx.auth(user), "json": new_activity(i), "user": user}
+
+
+def update_request(ctx: Context, i: int) -> dict:
+    user = ctx.user(i)
+    activity_id = ctx.sample_ids[user.id][i % len(ctx.sample_ids[user.id])]
+    return {"method": "PUT", "url": f"/activities/{activity_id}", "headers": ctx.auth(user), "json": {"duration_minutes": 10 + i % 90}}
+
+
+def delete_request(ctx: Context, i: int) -> dict:
+    user_id, activity_id = ctx.created.pop()
+    user = next(user for user in ctx.users if user.id == user_id)
+    return {"method": "DELETE", "url": f"/activities/{activity_id}", "headers": ctx.auth(user)}
+
+
+def bulk_request(ctx: Context, i: int) -> dict:
+    user = ctx.user(i)
+    return {"method": "POST", "url": "/activities/bulk", "headers": ctx.auth(user), "json": [new_activity(i * 100 + n) for n in range(100)]}
+
+
+async def refresh_etags(client: httpx.AsyncClient, ctx: Context):
+    for user in ctx.users:
+        response = await client.get("/activities/", headers=ctx.auth(user))
+        ctx.etags[user.id] = response.headers.get("ETag", "")
+
+
+def conditional_request(ctx: Context, i: int) -> dict:
+    user = ctx.user(i)
+    return {"method": "GET", "url": "/activities/", "headers": {**ctx.auth(user), "If-None-Match": ctx.etags.get(user.id, "")}}
+
+
+def login_request(ctx: Context, i: int) -> dict:
+    user = ctx.user(i)
+    return {"method": "POST", "url": "/auth/login", "params": {"email": user.email, "password": BENCH_PASSWORD}}
+
+
+# Reads run before writes so the read figures are not skewed by cache
+# invalidation in the middle of a scenario. SQLite allows a single writer,
+# so write scenarios run one request at a time there; concurrent writers
+# would only measure lock retries.
+SCENARIOS = [
+    Scenario("list_first_page", lambda ctx, i: ctx.get(i, "/activities/", params={"limit": 100})),
+    Scenario("list_cursor_page", lambda ctx, i: ctx.get(i, "/activities/", params={"limit": 100, "cursor": ctx.cursors[ctx.user(i).id]})),
+    Scenario("list_by_type", lambda ctx, i: ctx.get(i, "/activities/", params={"limit": 100, "activity_type": "STUDY"})),
+    Scenario("list_by_tag", lambda ctx, i: ctx.get(i, "/activities/", params={"limit": 100, "tag": TAGS[i % 10]})),
+    Scenario("list_not_modified", conditional_request, expected=304, prepare=refresh_etags),
+    Scenario("search", lambda ctx, i: ctx.get(i, "/activities/search", params={"q": ["plan", "python", "corrida", "review"][i % 4]})),
+    Scenario("get_activity", lambda ctx, i: ctx.get(i, f"/activities/{ctx.sample_ids[ctx.user(i).id][i % 10]}")),
+    Scenario("export_month", lambda ctx, i: ctx.get(i, "/activities/export", params={"start": (today() - timedelta(days=30)).isoformat()}), weight=0.2),
+    Scenario("stats", lambda ctx, i: ctx.get(i, "/stats/")),
+    Scenario("stats_heatmap", lambda ctx, i: ctx.get(i, "/stats/heatmap", params={"tz": "America/Sao_Paulo"})),
+    Scenario("stats_tags", lambda ctx, i: ctx.get(i, "/stats/tags")),
+    Scenario("analytics_daily", lambda ctx, i: ctx.get(i, "/analytics/daily")),
+    Scenario("analytics_weekly", lambda ctx, i: ctx.get(i, "/analytics/weekly", params={"tag": TAGS[i % 5]})),
+    Scenario("analytics_monthly", lambda ctx, i: ctx.get(i, "/analytics/monthly", params={"start": (today() - timedelta(days=730)).isoformat()})),
+    Scenario("create_activity", create_request, expected=201, writes=True),
+    Scenario("update_activity", update_request, writes=True),
+    Scenario("delete_activity", delete_request, writes=True),
+    Scenario("bulk_ingest_100", bulk_request, weight=0.2, writes=True),
+    Scenario("login", login_request, weight=0.05),
+]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run_scenario(client: httpx.AsyncClient, ctx: Context, scenario: Scenario, total: int, concurrency: int) -> dict:
+    await cache.clear()
+    if scenario.prepare is not None:
+        await scenario.prepare(client, ctx)
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        request = scenario.build(ctx, i)
+        user = request.pop("user", None)
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(**request)
+            latencies.append(time.perf_counter() - start)
+        if response.status_code != scenario.expected:
+            errors += 1
+        elif user is not None:
+            ctx.created.append((user.id, response.json()["id"]))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+
+    # The first requests of a scenario fill caches and compile statements;
+    # keep them out of the percentiles.
+    latencies = sorted(latencies[len(latencies) // 10:])
+    return {
+        "requests": total,
+        "errors": errors,
+        "throughput": round(total / elapsed, 1),
+        "p50": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def prepare_context(database_url: str, users: List[User]) -> Context:
+    engine = create_engine(database_url)
+    sample_ids = {}
+    cursors = {}
+    with Session(engine) as session:
+        for user in users:
+            rows = session.exec(
+                select(Activity.id, Activity.date).where(Activity.user_id == user.id)
+                .order_by(Activity.date.desc(), Activity.id.desc()).limit(200)
+            ).all()
+            sample_ids[user.id] = [row.id for row in rows[:100]] or [0]
+            cursors[user.id] = encode_cursor(rows[-1].date, rows[-1].id) if rows else ""
+    engine.dispose()
+    return Context(users, sample_ids, cursors)
+
+
+def load_users(database_url: str) -> List[User]:
+    engine = create_engine(database_url)
+    with Session(engine) as session:
+        counted = select(Activity.user_id).group_by(Activity.user_id).having(func.count(Activity.id) > 0)
+        users = list(session.exec(select(User).where(User.id.in_(counted), User.email.like("bench_%"))).all())
+        session.expunge_all()
+    engine.dispose()
+    return users
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float, tail_tolerance: float) -> List[str]:
+    # p50 and throughput are stable enough for a tight bound; in-process p95
+    # picks up GC and scheduler pauses, so the tail gets its own, looser one.
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        if result["p50"] > reference["p50"] * (1 + tolerance):
+            regressions.append(f"{name}: p50 {result['p50']} ms > {reference['p50']} ms (+{tolerance:.0%})")
+        if result["p95"] > reference["p95"] * (1 + tail_tolerance):
+            regressions.append(f"{name}: p95 {result['p95']} ms > {reference['p95']} ms (+{tail_tolerance:.0%})")
+        if result["throughput"] < reference["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: {result['throughput']} req/s < {reference['throughput']} req/s (-{tolerance:.0%})")
+        if result["errors"]:
+            regressions.append(f"{name}: {result['errors']} unexpected status code(s)")
+    return regressions
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Seeded end-to-end latency and throughput benchmark for every endpoint")
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite file")
+    parser.add_argument("--activities", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reuse", action="store_true", help="Skip seeding and use the bench users already in the database")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario (scaled by its weight)")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--only", nargs="*", default=None, help="Run only these scenarios")
+    parser.add_argument("--baseline", default=None, help="Defaults to baselines/<dialect>-<activities>.json")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="Allowed relative regression of p50 and throughput")
+    parser.add_argument("--tail-tolerance", type=float, default=2.0, help="Allowed relative regression of p95")
+    parser.add_argument("--output", default=None, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/bench_suite.db"
+    dialect = database_url.split(":", 1)[0].split("+", 1)[0]
+    baseline_path = args.baseline or os.path.join(BASELINE_DIR, f"{dialect}-{args.activities}.json")
+
+    if args.reuse:
+        users = load_users(database_url)
+    else:
+        print(f"Seeding {args.activities} activities for {args.users} users ({dialect})")
+        users = seed(database_url, args.activities, args.users, seed_value=args.seed)
+    ctx = prepare_context(database_url, users)
+
+    async_engine = create_async_engine(async_url(database_url))
+
+    async def get_session_override():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_async_session] = get_session_override
+    app.dependency_overrides[get_read_session] = get_session_override
+    transport = httpx.ASGITransport(app=app)
+    scenarios = [scenario for scenario in SCENARIOS if not args.only or scenario.name in args.only]
+
+    rounds: Dict[str, List[dict]] = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for round_number in range(args.rounds):
+            print(f"Round {round_number + 1}/{args.rounds}")
+            for scenario in scenarios:
+                total = max(1, int(args.requests * scenario.weight))
+                if scenario.name == "delete_activity":
+                    total = min(total, len(ctx.created))
+                    if not total:
+                        continue
+                concurrency = 1 if scenario.writes and dialect == "sqlite" else args.concurrency
+                rounds.setdefault(scenario.name, []).append(await run_scenario(client, ctx, scenario, total, concurrency))
+
+    # Each metric is the median over the rounds, which keeps a single noisy
+    # round from failing the comparison.
+    results = {
+        name: {
+            "requests": sum(run["requests"] for run in runs),
+            "errors": sum(run["errors"] for run in runs),
+            **{metric: statistics.median(run[metric] for run in runs) for metric in ("throughput", "p50", "p95", "p99")},
+        }
+        for name, runs in rounds.items()
+    }
+    print(f"{'scenario':<20} {'req':>5} {'err':>4} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, result in results.items():
+        print(f"{name:<20} {result['requests']:>5} {result['errors']:>4} {result['throughput']:>8.1f} "
+              f"{result['p50']:>8.2f} {result['p95']:>8.2f} {result['p99']:>8.2f}")
+
+    app.dependency_overrides.clear()
+    hashing_pool.shutdown()
+    await async_engine.dispose()
+
+    report = {
+        "meta": {"dialect": dialect, "activities": args.activities, "users": len(users),
+                 "requests": args.requests, "concurrency": args.concurrency, "rounds": args.rounds},
+        "scenarios": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {baseline_path}")
+        return
+
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path}; run with --update-baseline to record one")
+        return
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)["scenarios"]
+    regressions = compare(results, baseline, args.tolerance, args.tail_tolerance)
+    errors = [f"{name}: {result['errors']} unexpected status code(s)" for name, result in results.items()
+              if result["errors"] and name not in baseline]
+    if regressions or errors:
+        print("Regressions against the baseline:")
+        for line in regressions + errors:
+            print(f"   - {line}")
+        sys.exit(1)
+    print(f"No regressions against {baseline_path} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
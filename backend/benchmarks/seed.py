@@ -0,0 +1,152 @@
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import insert
+from sqlmodel import Session, create_engine, select
+
+from app.core.migrations import upgrade
+from app.models.activity import ActivityCreate, ActivityType
+from app.models.user import User
+from app.services.auth import get_password_hash
+from app.services.ingest import insert_chunk
+
+# Synthetic activity history, reproducible for a given --seed. Users get a
+# Zipf-like share of the rows (a few heavy accounts, a long tail), types and
+# tags follow skewed frequencies, and start times follow per-type daily
+# rhythms with quieter weekends. Rows go through the bulk ingestion path
+# (COPY on PostgreSQL), which also maintains tags, rollups and buckets.
+
+BENCH_PASSWORD = "password123"
+
+TYPE_WEIGHTS = {
+    ActivityType.WORK: 40,
+    ActivityType.STUDY: 20,
+    ActivityType.EXERCISE: 15,
+    ActivityType.LEISURE: 15,
+    ActivityType.OTHER: 10,
+}
+
+TYPE_HOURS = {
+    ActivityType.WORK: (9, 18),
+    ActivityType.STUDY: (7, 23),
+    ActivityType.EXERCISE: (6, 21),
+    ActivityType.LEISURE: (17, 24),
+    ActivityType.OTHER: (8, 22),
+}
+
+TITLES = {
+    ActivityType.WORK: ["Reunião de planejamento", "Code review", "Roadmap review", "Deploy", "Daily standup", "Relatório mensal"],
+    ActivityType.STUDY: ["Curso de Python", "Leitura técnica", "Estudo de SQL", "Revisão de inglês", "Artigo sobre bancos"],
+    ActivityType.EXERCISE: ["Corrida", "Academia", "Yoga", "Natação", "Ciclismo"],
+    ActivityType.LEISURE: ["Filme", "Série", "Jogo", "Música", "Passeio"],
+    ActivityType.OTHER: ["Mercado", "Consulta médica", "Organização da casa", "Banco"],
+}
+
+DESCRIPTION_WORDS = [
+    "projeto", "cliente", "backend", "frontend", "performance", "índice", "consulta",
+    "planejamento", "treino", "capítulo", "exercícios", "documentação", "testes",
+]
+
+TAGS = [f"tag{i:02d}" for i in range(50)]
+TAG_WEIGHTS = [1 / (rank + 1) for rank in range(len(TAGS))]
+
+
+def user_shares(users: int, activities: int) -> List[int]:
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(users)]
+    total = sum(weights)
+    shares = [math.floor(activities * weight / total) for weight in weights]
+    shares[0] += activities - sum(shares)
+    return shares
+
+
+def make_activity(rng: random.Random, now: datetime, days: int) -> ActivityCreate:
+    activity_type = rng.choices(list(TYPE_WEIGHTS), weights=list(TYPE_WEIGHTS.values()))[0]
+
+    day = now - timedelta(days=int(rng.triangular(0, days, 0)))
+    if day.weekday() >= 5 and activity_type == ActivityType.WORK and rng.random() < 0.8:
+        activity_type = ActivityType.LEISURE
+    first_hour, last_hour = TYPE_HOURS[activity_type]
+    start = day.replace(hour=rng.randrange(first_hour, last_hour), minute=rng.randrange(60), second=0, microsecond=0)
+
+    tags = sorted(set(rng.choices(TAGS, weights=TAG_WEIGHTS, k=rng.choice([0, 1, 1, 2, 3]))))
+    description = None
+    if rng.random() < 0.3:
+        description = " ".join(rng.choices(DESCRIPTION_WORDS, k=rng.randint(3, 12)))
+
+    return ActivityCreate.model_construct(
+        title=f"{rng.choice(TITLES[activity_type])} {rng.randint(1, 999)}",
+        activity_type=activity_type,
+        duration_minutes=max(5, min(480, int(rng.lognormvariate(3.6, 0.7)))),
+        description=description,
+        tags=tags,
+        date=start,
+    )
+
+
+def create_users(session: Session, users: int, run_id: str) -> List[User]:
+    hashed_password = get_password_hash(BENCH_PASSWORD)
+    emails = [f"bench_{run_id}_{i}@bench.com" for i in range(users)]
+    session.exec(
+        insert(User.__table__),
+        params=[{"email": email, "hashed_password": hashed_password, "full_name": f"Bench {i}",
+                 "created_at": datetime.now(timezone.utc), "is_active": True, "is_superuser": False}
+                for i, email in enumerate(emails)],
+    )
+    session.commit()
+    return list(session.exec(select(User).where(User.email.in_(emails)).order_by(User.id)).all())
+
+
+def seed(database_url: str, activities: int, users: int, days: int = 730, seed_value: int = 42, chunk_size: int = 5000) -> List[User]:
+    engine = create_engine(database_url)
+    upgrade(engine)
+    rng = random.Random(seed_value)
+    now = datetime.now(timezone.utc)
+
+    with Session(engine) as session:
+        seeded = create_users(session, users, f"{seed_value}_{int(time.time())}")
+        started = time.perf_counter()
+        inserted = 0
+
+        for user, share in zip(seeded, user_shares(users, activities)):
+            remaining = share
+            while remaining:
+                batch = [make_activity(rng, now, days) for _ in range(min(chunk_size, remaining))]
+                inserted += insert_chunk(session, user.id, batch)
+                remaining -= len(batch)
+
+            elapsed = time.perf_counter() - started
+            print(f"\r   {inserted:>10} / {activities} activities ({inserted / max(elapsed, 1e-9):,.0f} rows/s)", end="", flush=True)
+
+        print()
+        for user in seeded:
+            session.refresh(user)
+        session.expunge_all()
+
+    engine.dispose()
+    return seeded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a database with synthetic activities for benchmarks")
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--activities", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    users = seed(args.database_url, args.activities, args.users, args.days, args.seed, args.chunk_size)
+    print(f"{len(users)} users created, password: {BENCH_PASSWORD}")
+
+
+if __name__ == "__main__":
+    main()
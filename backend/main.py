@@ -1,14 +1,47 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import Depends, FastAPI, HTTPException, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from sqlmodel import SQLModel
-from app.core.database import engine
-from app.api import auth, activities, stats
+from sqlalchemy.exc import OperationalError
+from app.core.admission import DeadlineExceeded, is_deadline_error
+from app.core.cache import cache
+from app.core.config import settings
+from app.core import database
+from app.core.database import async_engine, engine
+from app.core.migrations import check_schema_version
+from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from app.api import auth, activities, analytics, stats
+from app.services.admission import admit
+from app.services.hashing import hashing_pool
+from app.services.events import stats_events
+from app.services.principals import principal_cache_stats
+from app.services.write_behind import write_behind
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    SQLModel.metadata.create_all(engine)
+    # Schema changes ship as migrations (alembic upgrade head), never at boot.
+    check_schema_version(engine)
+    monitor = None
+    if database.read_router.replicas:
+        monitor = asyncio.create_task(database.read_router.monitor(settings.replica_health_interval_seconds))
+    listener = None
+    if stats_events.fan_out:
+        listener = asyncio.create_task(stats_events.listen())
+    if settings.write_behind_enabled:
+        await write_behind.start()
     yield
+    if monitor is not None:
+        monitor.cancel()
+    if listener is not None:
+        listener.cancel()
+    # Flushes every journaled create before the engines go away.
+    if write_behind.running:
+        await write_behind.stop()
+    hashing_pool.shutdown()
+    await stats_events.close()
+    await database.read_router.dispose()
+    await async_engine.dispose()
     engine.dispose()
 
 app = FastAPI(
@@ -22,12 +55,58 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
 )
 
-app.include_router(auth.router, prefix="/auth")
-app.include_router(activities.router, prefix="/activities", tags=["activities"])
-app.include_router(stats.router, prefix="/stats", tags=["statistics"])
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
+app.include_router(auth.router, prefix="/auth", dependencies=[Depends(admit)])
+app.include_router(activities.router, prefix="/activities", tags=["activities"], dependencies=[Depends(admit)])
+app.include_router(stats.router, prefix="/stats", tags=["statistics"], dependencies=[Depends(admit)])
+app.include_router(analytics.router, prefix="/analytics", tags=["analytics"], dependencies=[Depends(admit)])
+
+# A request that ran out of its deadline, either before a statement or when
+# PostgreSQL cancelled one through statement_timeout, is shed like an
+# overload instead of surfacing as a server error.
+@app.exception_handler(DeadlineExceeded)
+@app.exception_handler(OperationalError)
+async def handle_deadline_exceeded(request: Request, exc: Exception):
+    if not is_deadline_error(exc):
+        raise exc
+    return JSONResponse(
+        {"detail": "Request deadline exceeded"},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": "1"}
+    )
 
 @app.get("/")
 def read_root():
-    return {"message": "KairoFlow API is running"}
\ No newline at end of file
+    return {"message": "KairoFlow API is running"}
+
+@registry.collector
+def collect_caches():
+    principals = principal_cache_stats()
+    for name, counts in (("responses", cache.stats()), ("principals", principals["principals"]), ("tokens", principals["tokens"])):
+        labels = {"cache": name}
+        yield "kairoflow_cache_hits_total", "counter", "Cache hits.", labels, counts["hits"]
+        yield "kairoflow_cache_misses_total", "counter", "Cache misses.", labels, counts["misses"]
+        yield "kairoflow_cache_hit_ratio", "gauge", "Cache hit ratio since the last reset.", labels, counts["hit_rate"]
+
+@registry.collector
+def collect_hashing():
+    pool_stats = hashing_pool.stats()
+    yield "kairoflow_hashing_in_flight", "gauge", "Password hashes being computed or queued.", {}, pool_stats["in_flight"]
+    yield "kairoflow_password_hash_queue_depth", "gauge", "Password hashes waiting for a free worker.", {}, pool_stats["queue_depth"]
+    yield "kairoflow_hashing_rejected_total", "counter", "Password hashes rejected by the queue limit.", {}, pool_stats["rejected"]
+
+@app.get("/health/db", include_in_schema=False)
+async def read_database_health():
+    health = await database.read_router.status(max_age=settings.database_health_cache_seconds)
+    return JSONResponse(health, status_code=200 if health["primary"]["healthy"] else status.HTTP_503_SERVICE_UNAVAILABLE)
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
\ No newline at end of file
@@ -0,0 +1,32 @@
+import argparse
+import sys
+
+from sqlmodel import Session
+
+from app.core.database import engine
+from app.services.rollup import check_rollups, rebuild_rollups
+from app.services.tags import rebuild_activity_tags
+
+parser = argparse.ArgumentParser(description="Reconstrói ou verifica as tabelas user_daily_rollup, activity_bucket e activity_tag")
+parser.add_argument("--user-id", type=int, default=None, help="Limita a operação a um usuário")
+parser.add_argument("--check", action="store_true", help="Apenas verifica a consistência, sem reconstruir")
+args = parser.parse_args()
+
+with Session(engine) as session:
+    if args.check:
+        mismatches = check_rollups(session, args.user_id)
+        if not mismatches:
+            print("Rollups consistentes com a tabela activity")
+            sys.exit(0)
+
+        print(f"{len(mismatches)} divergência(s) encontrada(s):")
+        for mismatch in mismatches:
+            print(f"   - {mismatch}")
+        sys.exit(1)
+
+    tags = rebuild_activity_tags(session, args.user_id)
+    print(f"Tags reindexadas: {tags} linha(s)")
+
+    rows = rebuild_rollups(session, args.user_id)
+    session.commit()
+    print(f"Rollups reconstruídos: {rows} linha(s)")
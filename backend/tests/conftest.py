@@ -1,7 +1,13 @@
 import pytest
+import asyncio
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 from fastapi.testclient import TestClient
-from sqlmodel import create_engine, SQLModel, Session
-from sqlmodel.pool import StaticPool
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 import sys
 import os
 import warnings
@@ -14,24 +20,55 @@ warnings.filterwarnings("ignore", category=DeprecationWarning)
 sys.path.insert(0, os.path.dirname(__file__))
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 
+os.environ.setdefault("CACHE_BACKEND", "memory")
+os.environ.setdefault("QUERY_BUDGET_MODE", "raise")
+os.environ.setdefault("RATE_LIMIT_BACKEND", "memory")
+
 from main import app
-from app.core.database import get_session
+from app.core.admission import rate_limiter
+from app.core.cache import cache, principal_cache
+from app.core.migrations import upgrade
+from app.services.principals import token_counters, verified_tokens
+from app.core.database import get_async_session
+from app.services.routing import get_read_session
 
 
 def pytest_configure():
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
 
 
-@pytest.fixture(name="session")
-def session_fixture():
+@pytest.fixture(name="database_path")
+def database_path_fixture(tmp_path):
+    return tmp_path / "test.db"
+
+
+@pytest.fixture(name="engine")
+def engine_fixture(database_path):
     engine = create_engine(
-        "sqlite:///:memory:",
+        f"sqlite:///{database_path}",
         connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
         echo=False
     )
-    SQLModel.metadata.create_all(engine)
-    
+    upgrade(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(name="async_engine")
+def async_engine_fixture(engine, database_path):
+    # NullPool: the TestClient may drive each request on a different event
+    # loop, so aiosqlite connections must not be reused across requests.
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{database_path}",
+        poolclass=NullPool,
+        echo=False
+    )
+    yield async_engine
+    asyncio.run(async_engine.dispose())
+
+
+@pytest.fixture(name="session")
+def session_fixture(engine):
     with Session(engine) as session:
         try:
             yield session
@@ -40,11 +77,18 @@ def session_fixture():
 
 
 @pytest.fixture(name="client")
-def client_fixture(session: Session):
-    def get_session_override():
-        return session
+def client_fixture(async_engine):
+    async def get_async_session_override():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
     
-    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_async_session] = get_async_session_override
+    app.dependency_overrides[get_read_session] = get_async_session_override
+    asyncio.run(cache.clear())
+    asyncio.run(principal_cache.clear())
+    verified_tokens.clear()
+    token_counters.reset()
+    rate_limiter.memory.clear()
     
     client = TestClient(app)
     yield client
@@ -83,4 +127,38 @@ def authenticated_client(client: TestClient):
 def unauthenticated_client(client: TestClient):
     if "Authorization" in client.headers:
         del client.headers["Authorization"]
-    return client
\ No newline at end of file
+    return client
+
+# Helpers shared by the test modules (imported with `from conftest import ...`).
+
+def noon(days_ago: int) -> str:
+    day = datetime.now(timezone.utc).replace(hour=12, minute=0, second=0, microsecond=0)
+    return (day - timedelta(days=days_ago)).isoformat()
+
+
+def create_activity(client: TestClient, title: str = "Activity", activity_type: str = "WORK", duration: int = 30, **fields) -> dict:
+    response = client.post(
+        "/activities/",
+        json={"title": title, "activity_type": activity_type, "duration_minutes": duration, **fields}
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def user_id(client: TestClient) -> int:
+    return client.get("/auth/me").json()["id"]
+
+
+@contextmanager
+def count_queries(async_engine: AsyncEngine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = async_engine.sync_engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
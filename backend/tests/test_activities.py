@@ -1,5 +1,9 @@
+import pytest
 from fastapi.testclient import TestClient
 
+from conftest import create_activity
+
+
 def test_create_activity_with_token(authenticated_client: TestClient):
     response = authenticated_client.post(
         "/activities/",
@@ -29,4 +33,68 @@ def test_get_activities_with_token(authenticated_client: TestClient):
 
 def test_activities_without_token(client: TestClient):
     response = client.get("/activities/")
-    assert response.status_code in [401, 404]
\ No newline at end of file
+    assert response.status_code in [401, 404]
+
+def test_get_activities_cursor_pagination(authenticated_client: TestClient):
+    ids = [create_activity(authenticated_client, date=f"2024-01-0{day}T10:00:00")["id"] for day in range(1, 6)]
+    same_date_id = create_activity(authenticated_client, date="2024-01-03T10:00:00")["id"]
+    
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = authenticated_client.get("/activities/", params=params)
+        assert response.status_code == 200
+        seen.extend(activity["id"] for activity in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        
+        if len(seen) == 2:
+            create_activity(authenticated_client, date="2024-02-01T10:00:00")
+    
+    assert seen == [ids[4], ids[3], same_date_id, ids[2], ids[1], ids[0]]
+
+def test_get_activities_cursor_with_type_filter(authenticated_client: TestClient):
+    study_ids = [create_activity(authenticated_client, activity_type="STUDY", date=f"2024-03-0{day}T08:00:00")["id"] for day in range(1, 4)]
+    create_activity(authenticated_client, activity_type="WORK", date="2024-03-02T09:00:00")
+    
+    response = authenticated_client.get("/activities/", params={"limit": 2, "activity_type": "STUDY"})
+    first_page = [activity["id"] for activity in response.json()]
+    cursor = response.headers["X-Next-Cursor"]
+    
+    response = authenticated_client.get("/activities/", params={"limit": 2, "activity_type": "STUDY", "cursor": cursor})
+    second_page = [activity["id"] for activity in response.json()]
+    
+    assert first_page + second_page == list(reversed(study_ids))
+    assert "X-Next-Cursor" not in response.headers
+
+def test_get_activities_invalid_cursor(authenticated_client: TestClient):
+    response = authenticated_client.get("/activities/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+def test_list_payload_matches_single_activity(authenticated_client: TestClient):
+    activity_id = create_activity(authenticated_client, date="2024-03-01T08:00:00.250000")["id"]
+    
+    listed = authenticated_client.get("/activities/").json()[0]
+    single = authenticated_client.get(f"/activities/{activity_id}").json()
+    
+    assert listed == single
+
+def test_get_activities_as_msgpack(authenticated_client: TestClient):
+    msgpack = pytest.importorskip("msgpack")
+    create_activity(authenticated_client, activity_type="STUDY", date="2024-03-01T08:00:00")
+    
+    response = authenticated_client.get("/activities/", headers={"Accept": "application/msgpack"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    assert response.headers["vary"] == "Accept"
+    
+    activities = msgpack.unpackb(response.content)
+    assert activities[0]["activity_type"] == "STUDY"
+    assert activities[0]["date"] == "2024-03-01T08:00:00"
+    
+    response = authenticated_client.get("/stats/", headers={"Accept": "application/msgpack"})
+    assert msgpack.unpackb(response.content)["total_activities"] == 1
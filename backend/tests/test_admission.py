@@ -0,0 +1,114 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.api import activities
+from app.core import admission as control
+from app.core.admission import Admission, ConcurrencyLimiter, MemoryBuckets, RateLimiter
+from app.core.config import settings
+from conftest import create_activity
+
+
+def test_concurrency_limiter_queues_then_sheds():
+    async def run():
+        limiter = ConcurrencyLimiter(limit=1, max_queue=1)
+        assert await limiter.acquire(0)
+        assert not await limiter.acquire(0)
+        assert not await limiter.acquire(0.01)
+
+        waiter = asyncio.create_task(limiter.acquire(1))
+        await asyncio.sleep(0)
+        assert limiter.waiting == 1
+        assert not await limiter.acquire(1)
+
+        limiter.release()
+        assert await waiter
+        assert limiter.active == 1 and limiter.waiting == 0
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(run())
+
+
+def test_memory_token_bucket_refills():
+    async def run():
+        buckets = MemoryBuckets(max_entries=2)
+        assert [await buckets.take("a", 10, 2, 1) for _ in range(2)] == [0, 0]
+        wait = await buckets.take("a", 10, 2, 1)
+        assert 0 < wait <= 0.1
+        await asyncio.sleep(wait)
+        assert await buckets.take("a", 10, 2, 1) == 0
+
+        await buckets.take("b", 10, 2, 1)
+        await buckets.take("c", 10, 2, 1)
+        assert "a" not in buckets._buckets
+
+    asyncio.run(run())
+
+
+def test_rate_limited_identity_gets_429(authenticated_client: TestClient, monkeypatch):
+    monkeypatch.setattr(control, "rate_limiter", RateLimiter(backend="memory", rate=0.01, burst=2))
+
+    assert authenticated_client.get("/stats/").status_code == 200
+    assert authenticated_client.get("/activities/").status_code == 200
+    response = authenticated_client.get("/stats/")
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+
+    anonymous = authenticated_client.get("/activities/", headers={"Authorization": ""})
+    assert anonymous.status_code == 401
+
+
+def test_saturated_route_sheds_with_503(authenticated_client: TestClient, monkeypatch):
+    limits = Admission(max_concurrency=10, route_concurrency={"GET /stats/": 1}, max_queue=0, queue_timeout=0)
+    monkeypatch.setattr(control, "admission", limits)
+    held = asyncio.run(limits.acquire("GET /stats/"))
+
+    response = authenticated_client.get("/stats/")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert authenticated_client.get("/activities/").status_code == 200
+    assert limits.total.active == 1
+
+    for limiter in held:
+        limiter.release()
+    assert authenticated_client.get("/stats/").status_code == 200
+    assert limits.total.active == 0 and limits.routes["GET /stats/"].active == 0
+
+
+def test_expired_deadline_stops_sql_with_503(authenticated_client: TestClient, monkeypatch):
+    monkeypatch.setattr(settings, "request_route_timeouts_ms", {"GET /stats/": 0.001})
+
+    response = authenticated_client.get("/stats/")
+    assert response.status_code == 503
+    assert response.json()["detail"] == "Request deadline exceeded"
+    assert authenticated_client.get("/activities/").status_code == 200
+
+
+def test_admission_can_be_disabled(authenticated_client: TestClient, monkeypatch):
+    monkeypatch.setattr(settings, "admission_enabled", False)
+    monkeypatch.setattr(control, "rate_limiter", RateLimiter(backend="memory", rate=0.01, burst=1))
+
+    for _ in range(3):
+        assert authenticated_client.get("/stats/").status_code == 200
+
+
+def test_export_holds_its_slot_while_streaming(authenticated_client: TestClient, monkeypatch):
+    limits = Admission(max_concurrency=10, route_concurrency={"GET /activities/export": 2}, max_queue=0, queue_timeout=0)
+    monkeypatch.setattr(control, "admission", limits)
+    create_activity(authenticated_client)
+    stream_export = activities.stream_export
+    seen = []
+
+    async def probed_stream_export(*args):
+        async for chunk in stream_export(*args):
+            seen.append((limits.routes["GET /activities/export"].active, limits.total.active, control.remaining_seconds()))
+            yield chunk
+
+    monkeypatch.setattr(activities, "stream_export", probed_stream_export)
+    response = authenticated_client.get("/activities/export")
+    assert response.status_code == 200
+
+    assert seen and all(route == 1 and total == 1 for route, total, _ in seen)
+    assert all(remaining is not None and remaining > 0 for *_, remaining in seen)
+    assert limits.routes["GET /activities/export"].active == 0 and limits.total.active == 0
@@ -0,0 +1,89 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.services.rollup import check_rollups, rebuild_rollups
+from conftest import count_queries, create_activity
+
+
+def test_daily_series_is_zero_filled(authenticated_client: TestClient):
+    create_activity(authenticated_client, activity_type="WORK", duration=60, date="2024-05-01T10:00:00Z")
+    create_activity(authenticated_client, activity_type="STUDY", duration=30, date="2024-05-03T10:00:00Z")
+    create_activity(authenticated_client, activity_type="WORK", duration=15, date="2024-05-03T15:00:00Z")
+
+    response = authenticated_client.get("/analytics/daily", params={"start": "2024-05-01", "end": "2024-05-03"})
+    assert response.status_code == 200
+    series = response.json()["series"]
+
+    assert [point["bucket"] for point in series] == ["2024-05-01", "2024-05-02", "2024-05-03"]
+    assert series[0]["minutes"]["WORK"] == 60
+    assert series[1]["total_minutes"] == 0
+    assert series[2]["minutes"] == {"WORK": 15, "STUDY": 30, "EXERCISE": 0, "LEISURE": 0, "OTHER": 0}
+    assert series[2]["total_count"] == 2
+
+
+def test_weekly_and_monthly_series(authenticated_client: TestClient):
+    create_activity(authenticated_client, activity_type="WORK", duration=10, date="2024-04-28T10:00:00Z")
+    create_activity(authenticated_client, activity_type="WORK", duration=20, date="2024-04-29T10:00:00Z")
+    create_activity(authenticated_client, activity_type="EXERCISE", duration=40, date="2024-05-05T10:00:00Z")
+
+    weekly = authenticated_client.get("/analytics/weekly", params={"start": "2024-04-22", "end": "2024-05-06"}).json()
+    assert [(point["bucket"], point["total_minutes"]) for point in weekly["series"]] == [
+        ("2024-04-22", 10),
+        ("2024-04-29", 60),
+        ("2024-05-06", 0),
+    ]
+
+    monthly = authenticated_client.get("/analytics/monthly", params={"start": "2024-04-15", "end": "2024-05-15"}).json()
+    assert [(point["bucket"], point["total_minutes"]) for point in monthly["series"]] == [
+        ("2024-04-01", 30),
+        ("2024-05-01", 40),
+    ]
+
+
+def test_series_tag_filter_follows_updates(authenticated_client: TestClient, session: Session):
+    first = create_activity(authenticated_client, activity_type="WORK", duration=60, date="2024-05-01T10:00:00Z", tags=["deep", "focus"])
+    create_activity(authenticated_client, activity_type="WORK", duration=30, date="2024-05-01T12:00:00Z", tags=["focus"])
+
+    params = {"start": "2024-05-01", "end": "2024-05-01"}
+    assert authenticated_client.get("/analytics/daily", params={**params, "tag": "deep"}).json()["series"][0]["total_minutes"] == 60
+    assert authenticated_client.get("/analytics/daily", params={**params, "tag": "focus"}).json()["series"][0]["total_minutes"] == 90
+
+    authenticated_client.put(f"/activities/{first['id']}", json={"tags": ["focus"]})
+    assert authenticated_client.get("/analytics/daily", params={**params, "tag": "deep"}).json()["series"][0]["total_minutes"] == 0
+    assert authenticated_client.get("/analytics/daily", params=params).json()["series"][0]["total_minutes"] == 90
+
+    assert check_rollups(session) == []
+
+
+def test_series_cost_does_not_grow_with_range(authenticated_client: TestClient, async_engine):
+    create_activity(authenticated_client, activity_type="WORK", duration=60, date="2020-01-15T10:00:00Z")
+    create_activity(authenticated_client, activity_type="WORK", duration=30, date="2024-05-01T10:00:00Z")
+
+    with count_queries(async_engine) as statements:
+        response = authenticated_client.get("/analytics/monthly", params={"start": "2020-01-01", "end": "2024-12-31"})
+    series = response.json()["series"]
+
+    assert len(series) == 60
+    assert sum(point["total_minutes"] for point in series) == 90
+    assert 0 < len(statements) <= 3
+
+
+def test_series_rejects_oversized_ranges(authenticated_client: TestClient):
+    response = authenticated_client.get("/analytics/daily", params={"start": "2000-01-01", "end": "2024-01-01"})
+    assert response.status_code == 400
+
+
+def test_rebuild_restores_buckets(authenticated_client: TestClient, session: Session):
+    create_activity(authenticated_client, activity_type="WORK", duration=60, date="2024-05-01T10:00:00Z", tags=["deep"])
+    response = authenticated_client.post(
+        "/activities/bulk",
+        json=[{"title": "Bulk", "activity_type": "STUDY", "duration_minutes": 20, "tags": ["deep"], "date": "2024-05-02T10:00:00Z"}]
+    )
+    assert response.json()["inserted"] == 1
+    assert check_rollups(session) == []
+
+    rebuild_rollups(session)
+    session.commit()
+    assert check_rollups(session) == []
+    weekly = authenticated_client.get("/analytics/weekly", params={"start": "2024-04-29", "end": "2024-04-29", "tag": "deep"}).json()
+    assert weekly["series"][0]["minutes"]["STUDY"] == 20
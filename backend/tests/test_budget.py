@@ -0,0 +1,71 @@
+import logging
+
+import pytest
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+
+from main import app
+from app.core.budget import QueryBudget, QueryBudgetExceeded, slow_queries
+from conftest import create_activity
+
+
+def route_budget(path: str, method: str) -> QueryBudget:
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.path == path and method in route.methods:
+            return next(
+                dependency.dependency for dependency in route.dependencies
+                if isinstance(dependency.dependency, QueryBudget)
+            )
+    raise LookupError(path)
+
+
+def test_every_database_route_declares_a_budget():
+    unbudgeted = [
+        f"{sorted(route.methods)} {route.path}"
+        for route in app.routes
+        if isinstance(route, APIRoute)
+        and route.path.startswith(("/auth", "/activities", "/stats", "/analytics"))
+        and not any(isinstance(dependency.dependency, QueryBudget) for dependency in route.dependencies)
+    ]
+    assert unbudgeted == []
+
+
+def test_budget_overrun_raises_in_tests(authenticated_client: TestClient, monkeypatch):
+    activity = create_activity(authenticated_client)
+    monkeypatch.setattr(route_budget("/activities/{activity_id}", "GET"), "limit", 0)
+
+    with pytest.raises(QueryBudgetExceeded, match=r"GET /activities/\{activity_id\} ran 1 SQL statements, budget is 0"):
+        authenticated_client.get(f"/activities/{activity['id']}")
+
+
+def test_budget_overrun_is_logged_in_production(authenticated_client: TestClient, monkeypatch, caplog):
+    activity = create_activity(authenticated_client)
+    monkeypatch.setattr(route_budget("/activities/{activity_id}", "GET"), "limit", 0)
+    monkeypatch.setattr("app.core.budget.settings.query_budget_mode", "log")
+
+    with caplog.at_level(logging.WARNING, logger="app.core.budget"):
+        response = authenticated_client.get(f"/activities/{activity['id']}")
+
+    assert response.status_code == 200
+    assert "budget is 0" in caplog.text
+
+
+def test_bulk_budget_grows_per_chunk(authenticated_client: TestClient, monkeypatch):
+    monkeypatch.setattr("app.services.ingest.settings.bulk_chunk_size", 2)
+    rows = [{"title": f"Row {i}", "activity_type": "STUDY", "duration_minutes": 5} for i in range(12)]
+
+    response = authenticated_client.post("/activities/bulk", json=rows)
+    assert response.json()["inserted"] == 12
+
+
+def test_slow_statements_are_explained(authenticated_client: TestClient, monkeypatch):
+    create_activity(authenticated_client)
+    monkeypatch.setattr("app.core.budget.settings.slow_query_ms", 1e-6)
+    slow_queries.clear()
+
+    assert authenticated_client.get("/activities/", params={"activity_type": "WORK"}).status_code == 200
+
+    listed = [entry for entry in slow_queries if entry["route"] == "GET /activities/"]
+    assert listed
+    assert "activity" in listed[0]["statement"].lower()
+    assert listed[0]["plan"] and ("SCAN" in listed[0]["plan"] or "SEARCH" in listed[0]["plan"])
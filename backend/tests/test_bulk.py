@@ -0,0 +1,90 @@
+import json
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.services.rollup import check_rollups
+
+
+def test_bulk_json_reports_row_errors(authenticated_client: TestClient, session: Session):
+    rows = [
+        {"title": "Deep work", "activity_type": "WORK", "duration_minutes": 90, "date": "2024-05-01T09:00:00"},
+        {"title": "", "activity_type": "WORK", "duration_minutes": 30},
+        {"title": "Run", "activity_type": "EXERCISE", "duration_minutes": 40, "tags": ["outdoor"]},
+        {"title": "Too long", "activity_type": "WORK", "duration_minutes": 5000},
+        "not an object",
+    ]
+
+    response = authenticated_client.post("/activities/bulk", json=rows)
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["received"] == 5
+    assert data["inserted"] == 2
+    assert data["failed"] == 3
+    assert [error["row"] for error in data["errors"]] == [1, 3, 4]
+    assert data["errors"][0]["errors"][0]["field"] == "title"
+
+    activities = authenticated_client.get("/activities/").json()
+    assert sorted(activity["title"] for activity in activities) == ["Deep work", "Run"]
+    assert check_rollups(session) == []
+
+
+def test_bulk_ndjson_in_chunks(authenticated_client: TestClient, monkeypatch):
+    monkeypatch.setattr("app.services.ingest.settings.bulk_chunk_size", 3)
+    lines = [
+        json.dumps({"title": f"Item {i}", "activity_type": "STUDY", "duration_minutes": 10})
+        for i in range(10)
+    ]
+    lines.insert(4, "{broken")
+
+    response = authenticated_client.post(
+        "/activities/bulk",
+        content="\n".join(lines) + "\n",
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["inserted"] == 10
+    assert [error["row"] for error in data["errors"]] == [4]
+
+    stats = authenticated_client.get("/stats/").json()
+    assert stats["total_activities"] == 10
+    assert stats["activities_by_type"] == {"STUDY": 10}
+
+
+def test_bulk_csv(authenticated_client: TestClient):
+    body = (
+        "title,activity_type,duration_minutes,description,tags,date\n"
+        'Reading,STUDY,45,"Chapter 1\nand notes",books;focus,2024-06-01T20:00:00\n'
+        "Gym,EXERCISE,60,,,2024-06-02T07:00:00\n"
+        "Broken,WORK,abc,,,\n"
+    )
+
+    response = authenticated_client.post(
+        "/activities/bulk",
+        content=body,
+        headers={"Content-Type": "text/csv"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["inserted"] == 2
+    assert [error["row"] for error in data["errors"]] == [2]
+
+    activities = {activity["title"]: activity for activity in authenticated_client.get("/activities/").json()}
+    assert activities["Reading"]["description"] == "Chapter 1\nand notes"
+    assert activities["Reading"]["tags"] == ["books", "focus"]
+
+
+def test_bulk_rejects_unknown_content_type(authenticated_client: TestClient):
+    response = authenticated_client.post(
+        "/activities/bulk",
+        content="<xml/>",
+        headers={"Content-Type": "application/xml"}
+    )
+    assert response.status_code == 415
+
+
+def test_bulk_requires_token(client: TestClient):
+    response = client.post("/activities/bulk", json=[])
+    assert response.status_code == 401
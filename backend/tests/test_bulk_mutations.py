@@ -0,0 +1,98 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.services.rollup import check_rollups
+from conftest import count_queries
+
+
+def create_activities(client: TestClient, count: int, **overrides) -> list:
+    rows = [
+        {
+            "title": f"Entry {i}",
+            "activity_type": "WORK",
+            "duration_minutes": 10,
+            "tags": ["inbox"],
+            "date": f"2024-02-{i % 28 + 1:02d}T12:00:00Z",
+            **overrides,
+        }
+        for i in range(count)
+    ]
+    assert client.post("/activities/bulk", json=rows).json()["inserted"] == count
+    return client.get("/activities/", params={"limit": 1000}).json()
+
+
+def test_bulk_update_by_ids_retags_in_one_statement(authenticated_client: TestClient, session: Session, async_engine):
+    activities = create_activities(authenticated_client, 200)
+    ids = [activity["id"] for activity in activities[:150]]
+
+    with count_queries(async_engine) as statements:
+        response = authenticated_client.patch(
+            "/activities/bulk",
+            json={"ids": ids, "changes": {"tags": ["archived"], "activity_type": "STUDY"}}
+        )
+    assert response.status_code == 200
+    assert response.json() == {"updated": 150}
+    assert len([statement for statement in statements if statement.lstrip().upper().startswith("UPDATE ACTIVITY")]) == 1
+
+    archived = authenticated_client.get("/activities/", params={"tag": "archived", "limit": 1000}).json()
+    assert sorted(activity["id"] for activity in archived) == sorted(ids)
+    assert len(authenticated_client.get("/activities/", params={"tag": "inbox", "limit": 1000}).json()) == 50
+    assert authenticated_client.get("/stats/").json()["activities_by_type"] == {"WORK": 50, "STUDY": 150}
+    assert check_rollups(session) == []
+
+
+def test_bulk_update_by_filter(authenticated_client: TestClient, session: Session):
+    create_activities(authenticated_client, 28)
+
+    response = authenticated_client.patch(
+        "/activities/bulk",
+        json={
+            "filter": {"start": "2024-02-10T00:00:00Z", "end": "2024-02-20T00:00:00Z", "tag": "inbox"},
+            "changes": {"duration_minutes": 45, "date": "2024-03-01T08:00:00Z"}
+        }
+    )
+    assert response.json() == {"updated": 10}
+
+    march = authenticated_client.get("/analytics/monthly", params={"start": "2024-02-01", "end": "2024-03-31"}).json()
+    assert [point["total_minutes"] for point in march["series"]] == [180, 450]
+    assert check_rollups(session) == []
+
+
+def test_bulk_delete_by_filter_and_ids(authenticated_client: TestClient, session: Session):
+    activities = create_activities(authenticated_client, 20)
+    create_activities(authenticated_client, 5, activity_type="EXERCISE", tags=["gym"])
+
+    response = authenticated_client.request("DELETE", "/activities/bulk", json={"filter": {"tag": "gym"}})
+    assert response.json() == {"deleted": 5}
+
+    response = authenticated_client.request("DELETE", "/activities/bulk", json={"ids": [activities[0]["id"], activities[1]["id"]]})
+    assert response.json() == {"deleted": 2}
+
+    stats = authenticated_client.get("/stats/").json()
+    assert stats["total_activities"] == 18
+    assert stats["activities_by_type"] == {"WORK": 18}
+    assert authenticated_client.get("/stats/tags").json()[0]["count"] == 18
+    assert check_rollups(session) == []
+
+
+def test_bulk_mutations_only_touch_own_activities(authenticated_client: TestClient, client: TestClient):
+    activities = create_activities(authenticated_client, 3)
+    ids = [activity["id"] for activity in activities]
+
+    client.post("/auth/register", json={"email": "other_bulk@test.com", "password": "password123", "full_name": "Other"})
+    token = client.post("/auth/login", params={"email": "other_bulk@test.com", "password": "password123"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    response = client.patch("/activities/bulk", json={"ids": ids, "changes": {"title": "Hijacked"}}, headers=headers)
+    assert response.json() == {"updated": 0}
+    response = client.request("DELETE", "/activities/bulk", json={"filter": {}}, headers=headers)
+    assert response.json() == {"deleted": 0}
+
+
+def test_bulk_selection_is_validated(authenticated_client: TestClient):
+    assert authenticated_client.patch("/activities/bulk", json={"ids": [1], "changes": {}}).status_code == 422
+    assert authenticated_client.patch("/activities/bulk", json={"changes": {"title": "x"}}).status_code == 422
+    assert authenticated_client.patch(
+        "/activities/bulk", json={"ids": [1], "filter": {}, "changes": {"title": "x"}}
+    ).status_code == 422
+    assert authenticated_client.patch("/activities/bulk", json={"ids": [1], "changes": {"title": None}}).status_code == 422
@@ -0,0 +1,118 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from app.core.cache import Cache, CacheCounters, MemoryBackend, cache
+
+
+def test_memory_backend_evicts_least_recently_used():
+    counters = CacheCounters()
+    backend = MemoryBackend(max_entries=2, counters=counters)
+
+    backend.set("a", "1")
+    backend.set("b", "2")
+    assert backend.get("a") == "1"
+
+    backend.set("c", "3")
+
+    assert backend.get("b") is None
+    assert backend.get("a") == "1"
+    assert backend.get("c") == "3"
+    assert counters.evictions == 1
+
+
+def test_memory_backend_expires_entries():
+    counters = CacheCounters()
+    backend = MemoryBackend(max_entries=10, counters=counters)
+
+    backend.set("a", "1", ttl=1)
+    backend._entries["a"] = ("1", time.monotonic() - 1)
+
+    assert backend.get("a") is None
+    assert counters.evictions == 1
+
+
+def test_cache_falls_back_to_memory_without_redis():
+    local_cache = Cache(backend="auto", redis_url="redis://127.0.0.1:1")
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return {"value": len(calls)}
+
+    async def scenario():
+        assert await local_cache.get_or_compute(1, "figure", compute) == {"value": 1}
+        assert await local_cache.get_or_compute(1, "figure", compute) == {"value": 1}
+
+        await local_cache.bump_user_version(1)
+        assert await local_cache.get_or_compute(1, "figure", compute) == {"value": 2}
+
+    asyncio.run(scenario())
+
+    stats = local_cache.stats()
+    assert stats["backend"] == "memory"
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_stats_are_served_from_cache_until_a_write(authenticated_client: TestClient):
+    first = authenticated_client.get("/stats/").json()
+    second = authenticated_client.get("/stats/").json()
+    assert first == second
+    assert cache.stats()["hits"] == 1
+
+    response = authenticated_client.post(
+        "/activities/",
+        json={"title": "Write", "activity_type": "WORK", "duration_minutes": 25}
+    )
+    assert response.status_code == 201
+
+    after_write = authenticated_client.get("/stats/").json()
+    assert after_write["total_activities"] == first["total_activities"] + 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_memory_versions_expire_with_the_entries():
+    local_cache = Cache(backend="memory", ttl=300)
+
+    async def scenario():
+        version = await local_cache.user_version(1)
+        key = local_cache._version_key(1)
+        value, expires_at = local_cache.memory._entries[key]
+        assert expires_at is not None
+
+        local_cache.memory._entries[key] = (value, time.monotonic() - 1)
+        assert await local_cache.user_version(1) != version
+
+    asyncio.run(scenario())
+
+
+def test_bumps_during_a_redis_outage_are_replayed(monkeypatch):
+    store = {}
+
+    class FakeRedis:
+        async def ping(self):
+            return True
+
+        async def get(self, key):
+            return store.get(key)
+
+        async def set(self, key, value, ex=None, nx=False):
+            if nx and key in store:
+                return False
+            store[key] = value
+            return True
+
+    local_cache = Cache(backend="auto", redis_url="redis://127.0.0.1:1", retry_interval=0)
+
+    async def scenario():
+        await local_cache.bump_user_version(1)
+        assert local_cache.active_backend == "memory"
+
+        store[local_cache._version_key(1)] = "before-the-outage"
+        monkeypatch.setattr("redis.asyncio.Redis.from_url", lambda *args, **kwargs: FakeRedis())
+        assert await local_cache.user_version(1) != "before-the-outage"
+
+    asyncio.run(scenario())
+    assert local_cache.active_backend == "redis"
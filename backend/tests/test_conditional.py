@@ -0,0 +1,63 @@
+from email.utils import parsedate_to_datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from conftest import count_queries, create_activity
+
+
+def test_unchanged_list_returns_304_without_queries(authenticated_client: TestClient, async_engine: AsyncEngine):
+    create_activity(authenticated_client)
+    
+    response = authenticated_client.get("/activities/")
+    etag = response.headers["ETag"]
+    assert parsedate_to_datetime(response.headers["Last-Modified"])
+    
+    with count_queries(async_engine) as statements:
+        response = authenticated_client.get("/activities/", headers={"If-None-Match": etag})
+    
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    assert not [statement for statement in statements if "activity" in statement]
+
+
+def test_writes_change_the_etag(authenticated_client: TestClient):
+    activity = create_activity(authenticated_client)
+    
+    list_etag = authenticated_client.get("/activities/").headers["ETag"]
+    stats_etag = authenticated_client.get("/stats/").headers["ETag"]
+    assert authenticated_client.get("/stats/", headers={"If-None-Match": stats_etag}).status_code == 304
+    
+    authenticated_client.put(f"/activities/{activity['id']}", json={"duration_minutes": 45})
+    
+    response = authenticated_client.get("/activities/", headers={"If-None-Match": list_etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != list_etag
+    
+    response = authenticated_client.get("/stats/", headers={"If-None-Match": stats_etag})
+    assert response.status_code == 200
+    assert response.json()["total_minutes"] == 45
+
+
+def test_etag_depends_on_query_and_media_type(authenticated_client: TestClient):
+    create_activity(authenticated_client)
+    
+    plain = authenticated_client.get("/activities/").headers["ETag"]
+    filtered = authenticated_client.get("/activities/", params={"activity_type": "STUDY"}).headers["ETag"]
+    assert plain != filtered
+    
+    response = authenticated_client.get(
+        "/activities/",
+        params={"activity_type": "STUDY"},
+        headers={"If-None-Match": plain}
+    )
+    assert response.status_code == 200
+
+
+def test_single_activity_and_weak_comparison(authenticated_client: TestClient):
+    activity = create_activity(authenticated_client)
+    
+    etag = authenticated_client.get(f"/activities/{activity['id']}").headers["ETag"]
+    response = authenticated_client.get(f"/activities/{activity['id']}", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert response.status_code == 304
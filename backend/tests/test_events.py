@@ -0,0 +1,181 @@
+import asyncio
+import json
+from datetime import date, datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.database import ReadRouter
+from app.services.dates import UTC
+from app.services.events import StatsEvents, stats_events
+from conftest import user_id
+
+
+def parse(event: bytes):
+    name, data = event.decode().strip().split("\n")
+    return name.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+def apply_patch(target: dict, patch: dict) -> dict:
+    result = dict(target)
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        elif isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = apply_patch(result[key], value)
+        else:
+            result[key] = value
+    return result
+
+
+def counting_snapshot(calls: list):
+    async def snapshot(user_id: int, day: date) -> dict:
+        calls.append((user_id, day))
+        return {"day": day.isoformat(), "computed": len(calls)}
+    return snapshot
+
+
+def test_stream_events_match_stats_after_writes(authenticated_client: TestClient, async_engine, monkeypatch):
+    monkeypatch.setattr("app.core.database.read_router", ReadRouter(async_engine))
+    owner = user_id(authenticated_client)
+    subscription = stats_events.subscribe(owner, UTC)
+    try:
+        name, stats = parse(asyncio.run(stats_events.next_event(subscription)))
+        assert (name, stats) == ("stats", authenticated_client.get("/stats/").json())
+        assert not subscription.ready.is_set()
+
+        now = datetime.now(timezone.utc).isoformat()
+        created = authenticated_client.post(
+            "/activities/",
+            json={"title": "Live", "activity_type": "WORK", "duration_minutes": 30, "date": now}
+        ).json()
+        authenticated_client.put(f"/activities/{created['id']}", json={"duration_minutes": 45})
+        authenticated_client.post("/activities/", json={"title": "Read", "activity_type": "STUDY", "duration_minutes": 10, "date": now})
+        authenticated_client.post("/activities/", json={"title": "Read more", "activity_type": "STUDY", "duration_minutes": 5, "date": now})
+        assert subscription.ready.is_set()
+
+        name, delta = parse(asyncio.run(stats_events.next_event(subscription)))
+        assert name == "delta"
+        stats = apply_patch(stats, delta)
+        assert stats == authenticated_client.get("/stats/").json()
+        assert stats["today_minutes"] == 60
+        assert stats["most_frequent_type"] == "STUDY"
+        assert stats["consecutive_days"] == 1
+        assert stats["daily_goal_percentage"] == 12
+        assert sorted(activity["title"] for activity in stats["recent_activities"]) == ["Live", "Read", "Read more"]
+
+        authenticated_client.post("/activities/bulk", json=[{"title": "Imported", "activity_type": "WORK", "duration_minutes": 5}])
+        assert parse(asyncio.run(stats_events.next_event(subscription)))[1]["total_activities"] == 4
+        # Nothing changed since the last event: no delta to send.
+        subscription.mark_stale()
+        assert asyncio.run(stats_events.next_event(subscription)) == b": keepalive\n\n"
+    finally:
+        stats_events.unsubscribe(subscription)
+
+
+def test_stream_sends_keepalives_and_refreshes_at_local_midnight():
+    calls = []
+    events = StatsEvents(snapshot=counting_snapshot(calls))
+    today = datetime.now(timezone.utc).date()
+
+    async def run():
+        stream = events.stream(7, UTC, keepalive=0.01)
+        received = [await anext(stream), await anext(stream)]
+
+        # The last snapshot was taken before local midnight: the next
+        # keepalive tick recomputes "today" instead.
+        subscription, = events._streams[7]
+        subscription.day = today - timedelta(days=1)
+        received.append(await anext(stream))
+
+        await events.publish(7)
+        received.append(await anext(stream))
+        assert events.streams(7) == 1
+        await stream.aclose()
+        return received
+
+    first, keepalive, after_midnight, after_write = asyncio.run(run())
+    assert parse(first) == ("stats", {"day": today.isoformat(), "computed": 1})
+    assert keepalive == b": keepalive\n\n"
+    assert parse(after_midnight) == ("delta", {"computed": 2})
+    assert parse(after_write) == ("delta", {"computed": 3})
+    assert events.streams() == 0
+
+
+def test_streams_share_snapshots_computed_after_their_last_change():
+    calls = []
+    gate = None
+
+    async def snapshot(user_id: int, day: date) -> dict:
+        calls.append(day)
+        computed = len(calls)
+        await gate.wait()
+        return {"computed": computed}
+
+    events = StatsEvents(snapshot=snapshot)
+    first, second, third = (events.subscribe(7, UTC) for _ in range(3))
+
+    async def run():
+        nonlocal gate
+        gate = asyncio.Event()
+        pending = [asyncio.create_task(events.next_event(first)), asyncio.create_task(events.next_event(second))]
+        await asyncio.sleep(0)
+        # A write lands while the shared snapshot is being computed, which
+        # may not include it: later readers get a fresh computation.
+        events.deliver(7)
+        pending.append(asyncio.create_task(events.next_event(third)))
+        await asyncio.sleep(0)
+        gate.set()
+        return [parse(event)[1]["computed"] for event in await asyncio.gather(*pending)]
+
+    assert asyncio.run(run()) == [1, 1, 2]
+    assert first.stale and second.stale and not third.stale
+
+
+def test_fan_out_messages_reach_other_workers_only():
+    sender, receiver = StatsEvents(), StatsEvents(snapshot=counting_snapshot([]))
+    subscription = receiver.subscribe(7, UTC)
+    subscription.stale = False
+    subscription.ready.clear()
+
+    message = {"origin": sender.origin, "user_id": 7, "zone": None}
+    asyncio.run(receiver.receive(json.dumps({**message, "origin": receiver.origin})))
+    assert not subscription.ready.is_set()
+
+    version = asyncio.run(cache.user_version(7))
+    asyncio.run(receiver.receive(json.dumps(message)))
+    assert subscription.stale and subscription.ready.is_set()
+    assert asyncio.run(cache.user_version(7)) != version
+
+    asyncio.run(receiver.receive(json.dumps({**message, "zone": "America/Sao_Paulo"})))
+    assert subscription.zone.key == "America/Sao_Paulo"
+
+
+def test_stream_limit_per_user(authenticated_client: TestClient, monkeypatch):
+    monkeypatch.setattr(settings, "events_max_streams_per_user", 1)
+    subscription = stats_events.subscribe(user_id(authenticated_client), UTC)
+    try:
+        assert authenticated_client.get("/stats/stream").status_code == 429
+    finally:
+        stats_events.unsubscribe(subscription)
+
+
+def test_browsers_open_the_stream_with_a_scoped_token(authenticated_client: TestClient, monkeypatch):
+    owner = user_id(authenticated_client)
+    response = authenticated_client.post("/stats/stream-token")
+    assert response.status_code == 200
+    token = response.json()["token"]
+    access_token = authenticated_client.headers.pop("Authorization").removeprefix("Bearer ")
+
+    # The limit answers before the (endless) stream starts, once the
+    # request is authenticated.
+    monkeypatch.setattr(settings, "events_max_streams_per_user", 1)
+    subscription = stats_events.subscribe(owner, UTC)
+    try:
+        assert authenticated_client.get("/stats/stream", params={"token": token}).status_code == 429
+        assert authenticated_client.get("/stats/stream", params={"token": access_token}).status_code == 401
+        assert authenticated_client.get("/stats/stream").status_code == 401
+        assert authenticated_client.get("/stats/", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+    finally:
+        stats_events.unsubscribe(subscription)
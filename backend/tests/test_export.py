@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+
+from fastapi.testclient import TestClient
+
+
+def seed(client: TestClient):
+    rows = [
+        {"title": "Plan", "activity_type": "WORK", "duration_minutes": 30, "tags": ["q1"], "date": "2024-01-10T09:00:00"},
+        {"title": "Read", "activity_type": "STUDY", "duration_minutes": 45, "description": "Notes, \"quoted\"", "date": "2024-01-11T20:00:00"},
+        {"title": "Ship", "activity_type": "WORK", "duration_minutes": 90, "tags": ["q1", "release"], "date": "2024-02-01T10:00:00"},
+    ]
+    response = client.post("/activities/bulk", json=rows)
+    assert response.json()["inserted"] == 3
+
+
+def test_export_ndjson(authenticated_client: TestClient):
+    seed(authenticated_client)
+
+    response = authenticated_client.get("/activities/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["title"] for row in rows] == ["Plan", "Read", "Ship"]
+    assert rows[2]["tags"] == ["q1", "release"]
+    assert rows[0]["activity_type"] == "WORK"
+
+
+def test_export_filters(authenticated_client: TestClient):
+    seed(authenticated_client)
+
+    response = authenticated_client.get(
+        "/activities/export",
+        params={"start": "2024-01-01T00:00:00", "end": "2024-02-01T00:00:00", "activity_type": "WORK"}
+    )
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["title"] for row in rows] == ["Plan"]
+
+
+def test_export_csv_round_trips_through_bulk(authenticated_client: TestClient):
+    seed(authenticated_client)
+
+    response = authenticated_client.get("/activities/export", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+
+    records = list(csv.DictReader(io.StringIO(response.text)))
+    assert [record["title"] for record in records] == ["Plan", "Read", "Ship"]
+    assert records[1]["description"] == 'Notes, "quoted"'
+    assert records[2]["tags"] == "q1;release"
+
+    response = authenticated_client.post(
+        "/activities/bulk",
+        content=response.text,
+        headers={"Content-Type": "text/csv"}
+    )
+    assert response.json()["inserted"] == 3
+
+
+def test_export_requires_token(client: TestClient):
+    response = client.get("/activities/export")
+    assert response.status_code == 401
@@ -0,0 +1,59 @@
+import asyncio
+import time
+
+import bcrypt
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.models.user import User
+from app.services.hashing import HashingPool
+
+
+def test_pool_rejects_when_queue_is_full():
+    pool = HashingPool(workers=1, queue_limit=1)
+
+    async def scenario():
+        running = [asyncio.ensure_future(pool.run(time.sleep, 0.5)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert pool.queue_depth == 1
+
+        with pytest.raises(HTTPException) as error:
+            await pool.run(time.sleep, 0)
+        assert error.value.status_code == 503
+        assert error.value.headers["Retry-After"] == "1"
+
+        await asyncio.gather(*running)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+
+    stats = pool.stats()
+    assert stats["completed"] == 2
+    assert stats["rejected"] == 1
+    assert stats["in_flight"] == 0
+    assert stats["latency_ms"]["max"] >= 500
+
+
+def test_login_rehashes_legacy_bcrypt(client: TestClient, session: Session):
+    client.post(
+        "/auth/register",
+        json={"email": "legacy@test.com", "password": "password123", "full_name": "Legacy"}
+    )
+
+    user = session.exec(select(User).where(User.email == "legacy@test.com")).one()
+    user.hashed_password = bcrypt.hashpw(b"password123", bcrypt.gensalt()).decode()
+    session.add(user)
+    session.commit()
+
+    response = client.post("/auth/login", params={"email": "legacy@test.com", "password": "password123"})
+    assert response.status_code == 200
+
+    session.refresh(user)
+    assert user.hashed_password.startswith("$argon2")
+
+    response = client.post("/auth/login", params={"email": "legacy@test.com", "password": "password123"})
+    assert response.status_code == 200
@@ -0,0 +1,83 @@
+import re
+
+from fastapi.testclient import TestClient
+
+from app.core.metrics import Histogram, registry
+
+
+def sample(text: str, name: str, **labels) -> float:
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        match = re.fullmatch(r"([a-z_]+)(?:\{(.*)\})? (\S+)", line)
+        if match is None or match.group(1) != name:
+            continue
+        found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(2) or ""))
+        if all(found.get(key) == value for key, value in labels.items()):
+            return float(match.group(3))
+    return 0.0
+
+
+def test_metrics_exposition_format(client: TestClient):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+    text = response.text
+    assert "# TYPE kairoflow_http_request_duration_seconds histogram" in text
+    assert "# TYPE kairoflow_http_requests_in_flight gauge" in text
+    assert "# TYPE kairoflow_cache_hit_ratio gauge" in text
+    assert "# TYPE kairoflow_db_pool_checkout_wait_seconds histogram" in text
+
+
+def test_metrics_record_route_templates_and_sql(authenticated_client: TestClient):
+    created = authenticated_client.post(
+        "/activities/",
+        json={"title": "Metered", "activity_type": "WORK", "duration_minutes": 30}
+    ).json()
+
+    before = authenticated_client.get("/metrics").text
+    for _ in range(3):
+        assert authenticated_client.get(f"/activities/{created['id']}").status_code == 200
+    authenticated_client.get("/does-not-exist")
+    after = authenticated_client.get("/metrics").text
+
+    route = {"method": "GET", "route": "/activities/{activity_id}"}
+    assert sample(after, "kairoflow_http_requests_total", status="200", **route) - sample(before, "kairoflow_http_requests_total", status="200", **route) == 3
+    assert sample(after, "kairoflow_http_request_duration_seconds_count", **route) - sample(before, "kairoflow_http_request_duration_seconds_count", **route) == 3
+    assert sample(after, "kairoflow_http_request_sql_statements_sum", **route) > sample(before, "kairoflow_http_request_sql_statements_sum", **route)
+    assert sample(after, "kairoflow_http_requests_total", route="<unmatched>", status="404") >= 1
+    assert f"/activities/{created['id']}\"" not in after
+    assert sample(after, "kairoflow_http_requests_in_flight", method="GET") == 1
+
+
+def test_metrics_expose_cache_hit_rate(authenticated_client: TestClient):
+    authenticated_client.get("/stats/")
+    authenticated_client.get("/stats/")
+
+    text = authenticated_client.get("/metrics").text
+    assert sample(text, "kairoflow_cache_hits_total", cache="responses") >= 1
+    assert 0 < sample(text, "kairoflow_cache_hit_ratio", cache="responses") <= 1
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_latency_seconds", "Test latency.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, "/x")
+
+    lines = histogram.samples()
+    assert 'test_latency_seconds_bucket{route="/x",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{route="/x",le="1.0"} 3' in lines
+    assert 'test_latency_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 'test_latency_seconds_count{route="/x"} 4' in lines
+    assert histogram not in registry.metrics
+
+
+def test_metrics_expose_password_hashing(client: TestClient):
+    before = sample(client.get("/metrics").text, "kairoflow_password_hash_duration_seconds_count")
+    client.post("/auth/register", json={"email": "metered@test.com", "password": "password123", "full_name": "Metered"})
+
+    text = client.get("/metrics").text
+    assert "# TYPE kairoflow_password_hash_queue_depth gauge" in text
+    assert sample(text, "kairoflow_password_hash_queue_depth") == 0
+    assert sample(text, "kairoflow_password_hash_duration_seconds_count") == before + 1
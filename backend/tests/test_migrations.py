@@ -0,0 +1,96 @@
+import io
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.core.migrations import SchemaVersionMismatch, alembic_config, check_schema_version, downgrade, upgrade
+from app.models.user import User
+from app.services.rollup import check_rollups, rebuild_rollups
+from app.services.search import search_activities
+from app.services.tags import rebuild_activity_tags
+
+
+@pytest.fixture(name="blank_engine")
+def blank_engine_fixture(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'blank.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_migrations_match_models(engine):
+    def include_object(object, name, type_, reflected, compare_to):
+        return not (type_ == "table" and name.startswith("activity_fts"))
+
+    with engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={"include_object": include_object})
+        assert compare_metadata(context, SQLModel.metadata) == []
+
+
+def test_schema_check_requires_head(blank_engine):
+    with pytest.raises(SchemaVersionMismatch, match="no revision"):
+        check_schema_version(blank_engine)
+
+    upgrade(blank_engine, "0001")
+    with pytest.raises(SchemaVersionMismatch, match="at 0001"):
+        check_schema_version(blank_engine)
+
+    upgrade(blank_engine)
+    check_schema_version(blank_engine)
+
+
+def test_downgrade_to_base_and_back(blank_engine):
+    upgrade(blank_engine)
+    downgrade(blank_engine, "base")
+    with blank_engine.connect() as connection:
+        tables = connection.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'").scalars().all()
+    assert tables == ["alembic_version"]
+
+    upgrade(blank_engine)
+    check_schema_version(blank_engine)
+
+
+def test_stamped_create_all_database_upgrades_to_head(blank_engine):
+    # 0001 is the schema create_all() used to build; upgrading such a
+    # database keeps its rows and, after rebuild_rollups.py, its stats.
+    upgrade(blank_engine, "0001")
+    with blank_engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO user (id, email, hashed_password, full_name, created_at, is_active, is_superuser) "
+            "VALUES (1, 'old@example.com', '', 'Old', '2026-01-01 00:00:00', 1, 0)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO activity (id, title, activity_type, duration_minutes, description, tags, date, user_id, created_at, updated_at) "
+            "VALUES (1, 'Legacy report', 'WORK', 30, NULL, '[\"focus\"]', '2026-01-02 12:00:00', 1, '2026-01-02 12:00:00', '2026-01-02 12:00:00')"
+        )
+
+    upgrade(blank_engine)
+    check_schema_version(blank_engine)
+    with Session(blank_engine) as session:
+        assert session.get(User, 1).timezone == "UTC"
+        assert [activity["title"] for activity, _ in search_activities(session, 1, "legacy", 10)] == ["Legacy report"]
+
+        assert rebuild_activity_tags(session) == 1
+        rebuild_rollups(session)
+        session.commit()
+        assert check_rollups(session) == []
+
+
+def test_postgresql_index_builds_run_concurrently_outside_transactions():
+    config = alembic_config()
+    config.set_main_option("sqlalchemy.url", "postgresql+psycopg://localhost/kairoflow")
+    config.output_buffer = io.StringIO()
+    command.upgrade(config, "head", sql=True)
+
+    script = config.output_buffer.getvalue()
+    for statement in (
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_user_type_date ON activity (user_id, activity_type, date)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_activity_tag_user_tag ON activity_tag (user_id, tag)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_activity_search ON activity USING gin (search_vector)",
+    ):
+        build = script.index(statement)
+        assert script.rindex("COMMIT", 0, build) > script.rindex("BEGIN", 0, build)
+    assert "DROP INDEX CONCURRENTLY IF EXISTS idx_activity_type" in script
+    assert script.count("CREATE TYPE activitytype") == 1
@@ -0,0 +1,72 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.user import User
+from app.services.principals import principal_cache_stats
+
+
+def user_queries(async_engine: AsyncEngine, client: TestClient) -> int:
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        assert client.get("/activities/").status_code == 200
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    return sum('FROM "user"' in statement or "FROM user" in statement for statement in statements)
+
+
+def current_user(session: Session) -> User:
+    return session.exec(select(User)).one()
+
+
+def test_principal_is_cached_between_requests(authenticated_client: TestClient, async_engine: AsyncEngine):
+    assert user_queries(async_engine, authenticated_client) == 1
+    assert user_queries(async_engine, authenticated_client) == 0
+
+    stats = principal_cache_stats()
+    assert stats["principals"]["hits"] == 1
+    assert stats["tokens"]["hits"] >= 1
+
+
+def test_deactivation_invalidates_principal(authenticated_client: TestClient, session: Session):
+    assert authenticated_client.get("/activities/").status_code == 200
+
+    user = current_user(session)
+    user.deactivate()
+    session.add(user)
+    session.commit()
+
+    assert authenticated_client.get("/activities/").status_code == 401
+
+
+def test_deactivation_through_async_session_invalidates_principal(authenticated_client: TestClient, async_engine: AsyncEngine):
+    assert authenticated_client.get("/activities/").status_code == 200
+
+    async def deactivate():
+        async with AsyncSession(async_engine) as session:
+            user = (await session.exec(select(User))).one()
+            user.deactivate()
+            session.add(user)
+            await session.commit()
+
+    asyncio.run(deactivate())
+
+    assert authenticated_client.get("/activities/").status_code == 401
+
+
+def test_deleted_user_is_rejected(authenticated_client: TestClient, session: Session):
+    assert authenticated_client.get("/activities/").status_code == 200
+
+    session.delete(current_user(session))
+    session.commit()
+
+    assert authenticated_client.get("/activities/").status_code == 401
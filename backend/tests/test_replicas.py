@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import create_engine
+
+from main import app
+from app.core.cache import Cache
+from app.core.database import ReadRouter
+from app.core.migrations import upgrade
+from app.services.routing import get_read_session
+from conftest import create_activity
+
+
+@pytest.fixture
+def replica_engine(tmp_path):
+    # A second database standing in for a replica that has not caught up:
+    # same schema, none of the primary's rows.
+    path = tmp_path / "replica.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    upgrade(sync_engine)
+    sync_engine.dispose()
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    yield engine
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def read_router(async_engine, replica_engine, monkeypatch):
+    router = ReadRouter(async_engine, [replica_engine], read_your_writes_seconds=60)
+    monkeypatch.setattr("app.core.database.read_router", router)
+    # One process: the in-process cache stands in for a shared Redis.
+    monkeypatch.setattr(Cache, "shared", True)
+    return router
+
+
+@pytest.fixture
+def routed_client(authenticated_client: TestClient, read_router):
+    del app.dependency_overrides[get_read_session]
+    return authenticated_client
+
+
+def test_reads_follow_own_writes_then_use_the_replica(routed_client: TestClient, read_router: ReadRouter):
+    create_activity(routed_client)
+    assert len(routed_client.get("/activities/").json()) == 1
+
+    read_router.read_your_writes_seconds = 0
+    assert routed_client.get("/activities/", params={"limit": 10}).json() == []
+    assert routed_client.get("/stats/").json()["total_activities"] == 0
+
+
+def test_reads_stay_on_primary_without_a_shared_cache(routed_client: TestClient, read_router: ReadRouter, monkeypatch):
+    create_activity(routed_client)
+    read_router.read_your_writes_seconds = 0
+    monkeypatch.setattr(Cache, "shared", False)
+
+    assert len(routed_client.get("/activities/").json()) == 1
+
+
+def test_unhealthy_replica_falls_back_to_primary(routed_client: TestClient, read_router: ReadRouter, tmp_path):
+    create_activity(routed_client)
+    read_router.read_your_writes_seconds = 0
+
+    read_router.replicas[0] = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path}/missing/replica.db", poolclass=NullPool
+    )
+    asyncio.run(read_router.check_health())
+
+    assert read_router.healthy == [False]
+    assert len(routed_client.get("/activities/").json()) == 1
+
+
+def test_database_health_reports_pools(routed_client: TestClient):
+    response = routed_client.get("/health/db")
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["primary"]["healthy"] is True
+    assert data["replicas"][0]["healthy"] is True
+    assert "pool" in data["replicas"][0]
+    assert "kairoflow_db_replica_up{replica=\"0\"} 1" in routed_client.get("/metrics").text
+
+
+def test_database_health_reuses_recent_probes(routed_client: TestClient, read_router: ReadRouter, monkeypatch):
+    pings = []
+    ping = read_router.ping
+
+    async def counting_ping(engine):
+        pings.append(engine)
+        return await ping(engine)
+
+    monkeypatch.setattr(read_router, "ping", counting_ping)
+    first = routed_client.get("/health/db").json()
+    second = routed_client.get("/health/db").json()
+
+    assert len(pings) == 2
+    assert second["checked_at"] == first["checked_at"]
@@ -0,0 +1,64 @@
+from fastapi.testclient import TestClient
+
+from conftest import create_activity
+
+
+def titles(response) -> list:
+    assert response.status_code == 200
+    return [activity["title"] for activity in response.json()]
+
+
+def test_search_ranks_title_matches_first(authenticated_client: TestClient):
+    create_activity(authenticated_client, "Weekly planning", description="Review the roadmap")
+    create_activity(authenticated_client, "Roadmap review", description="Quarterly goals")
+    create_activity(authenticated_client, "Gym", description="Legs")
+
+    response = authenticated_client.get("/activities/search", params={"q": "roadmap"})
+    assert titles(response) == ["Roadmap review", "Weekly planning"]
+
+
+def test_search_prefix_and_accents(authenticated_client: TestClient):
+    create_activity(authenticated_client, "Reunião de planejamento")
+    create_activity(authenticated_client, "Leitura", description="Capítulo sobre planos")
+
+    assert titles(authenticated_client.get("/activities/search", params={"q": "planej"})) == ["Reunião de planejamento"]
+    assert titles(authenticated_client.get("/activities/search", params={"q": "reuniao"})) == ["Reunião de planejamento"]
+    assert len(titles(authenticated_client.get("/activities/search", params={"q": "plan"}))) == 2
+
+
+def test_search_filters_and_follows_updates(authenticated_client: TestClient):
+    work = create_activity(authenticated_client, "Python course", activity_type="WORK", date="2024-05-01T10:00:00Z")
+    create_activity(authenticated_client, "Python book", activity_type="STUDY", date="2024-06-01T10:00:00Z")
+
+    assert titles(authenticated_client.get("/activities/search", params={"q": "python", "activity_type": "STUDY"})) == ["Python book"]
+    assert titles(authenticated_client.get("/activities/search", params={"q": "python", "end": "2024-05-15T00:00:00Z"})) == ["Python course"]
+
+    authenticated_client.put(f"/activities/{work['id']}", json={"title": "Rust course"})
+    assert titles(authenticated_client.get("/activities/search", params={"q": "python"})) == ["Python book"]
+
+    authenticated_client.delete(f"/activities/{work['id']}")
+    assert titles(authenticated_client.get("/activities/search", params={"q": "rust"})) == []
+
+
+def test_search_cursor_pagination(authenticated_client: TestClient):
+    for index in range(5):
+        create_activity(authenticated_client, f"Standup {index}")
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"q": "standup", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = authenticated_client.get("/activities/search", params=params)
+        seen.extend(titles(response))
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert sorted(seen) == [f"Standup {index}" for index in range(5)]
+
+
+def test_search_rejects_empty_terms(authenticated_client: TestClient):
+    assert authenticated_client.get("/activities/search", params={"q": "***"}).status_code == 400
+    assert authenticated_client.get("/activities/search", params={"q": "x", "cursor": "bogus"}).status_code == 400
@@ -0,0 +1,120 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from conftest import count_queries, create_activity, noon
+
+
+def test_stats_empty(authenticated_client: TestClient):
+    response = authenticated_client.get("/stats/")
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["total_activities"] == 0
+    assert data["total_minutes"] == 0
+    assert data["activities_by_type"] == {}
+    assert data["most_frequent_type"] is None
+    assert data["consecutive_days"] == 0
+    assert data["recent_activities"] == []
+
+
+def test_stats_figures(authenticated_client: TestClient):
+    create_activity(authenticated_client, activity_type="WORK", duration=120, date=noon(0))
+    create_activity(authenticated_client, activity_type="STUDY", duration=60, date=noon(0))
+    create_activity(authenticated_client, activity_type="WORK", duration=30, date=noon(1))
+    create_activity(authenticated_client, activity_type="EXERCISE", duration=45, date=noon(3))
+    create_activity(authenticated_client, activity_type="WORK", duration=15, date=noon(10))
+
+    response = authenticated_client.get("/stats/")
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["total_activities"] == 5
+    assert data["total_minutes"] == 270
+    assert data["total_hours"] == 4.5
+    assert data["week_minutes"] == 255
+    assert data["today_minutes"] == 180
+    assert data["daily_goal_percentage"] == 37
+    assert data["activities_by_type"] == {"WORK": 3, "STUDY": 1, "EXERCISE": 1}
+    assert data["most_frequent_type"] == "WORK"
+    assert data["consecutive_days"] == 2
+    assert len(data["recent_activities"]) == 5
+
+
+def test_stats_query_count_is_constant_as_streak_grows(authenticated_client: TestClient, async_engine: AsyncEngine):
+    for days_ago in range(3):
+        create_activity(authenticated_client, date=noon(days_ago))
+
+    with count_queries(async_engine) as short_streak:
+        response = authenticated_client.get("/stats/")
+    assert response.json()["consecutive_days"] == 3
+
+    for days_ago in range(3, 40):
+        create_activity(authenticated_client, date=noon(days_ago))
+
+    with count_queries(async_engine) as long_streak:
+        response = authenticated_client.get("/stats/")
+    assert response.json()["consecutive_days"] == 40
+
+    assert len(long_streak) == len(short_streak)
+    assert 0 < len(long_streak) <= 4
+
+
+def test_heatmap_buckets_by_local_weekday_and_hour(authenticated_client: TestClient):
+    rows = [
+        {"title": "Late", "activity_type": "WORK", "duration_minutes": 30, "date": "2024-01-01T02:00:00Z"},
+        {"title": "Morning", "activity_type": "STUDY", "duration_minutes": 45, "date": "2024-01-03T12:10:00Z"},
+        {"title": "Morning 2", "activity_type": "STUDY", "duration_minutes": 15, "date": "2024-01-03T12:50:00Z"},
+        {"title": "Outside", "activity_type": "WORK", "duration_minutes": 60, "date": "2024-03-01T12:00:00Z"},
+    ]
+    assert authenticated_client.post("/activities/bulk", json=rows).json()["inserted"] == 4
+
+    response = authenticated_client.get(
+        "/stats/heatmap",
+        params={"start": "2023-12-31", "end": "2024-01-31", "tz": "America/Sao_Paulo"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["weekdays"][6] == "SUN"
+    assert data["by_type"]["WORK"]["minutes"][6][23] == 30
+    assert data["by_type"]["STUDY"]["minutes"][2][9] == 60
+    assert data["by_type"]["STUDY"]["counts"][2][9] == 2
+    assert sum(map(sum, data["minutes"])) == 90
+    assert sum(map(sum, data["by_type"]["EXERCISE"]["counts"])) == 0
+
+
+def test_heatmap_handles_half_hour_offsets(authenticated_client: TestClient):
+    rows = [
+        {"title": "Before midnight", "activity_type": "WORK", "duration_minutes": 10, "date": "2024-01-01T18:15:00Z"},
+        {"title": "After midnight", "activity_type": "WORK", "duration_minutes": 20, "date": "2024-01-01T18:45:00Z"},
+    ]
+    authenticated_client.post("/activities/bulk", json=rows)
+
+    data = authenticated_client.get(
+        "/stats/heatmap",
+        params={"start": "2024-01-01", "end": "2024-01-07", "tz": "Asia/Kolkata"}
+    ).json()
+
+    assert data["minutes"][0][23] == 10
+    assert data["minutes"][1][0] == 20
+
+
+def test_heatmap_rejects_unknown_time_zone(authenticated_client: TestClient):
+    response = authenticated_client.get("/stats/heatmap", params={"tz": "Mars/Olympus"})
+    assert response.status_code == 400
+
+
+def test_heatmap_follows_daylight_saving_changes(authenticated_client: TestClient):
+    rows = [
+        {"title": "Winter", "activity_type": "WORK", "duration_minutes": 10, "date": "2024-03-09T14:00:00Z"},
+        {"title": "Summer", "activity_type": "WORK", "duration_minutes": 20, "date": "2024-03-11T13:00:00Z"},
+    ]
+    authenticated_client.post("/activities/bulk", json=rows)
+
+    data = authenticated_client.get(
+        "/stats/heatmap",
+        params={"start": "2024-03-01", "end": "2024-03-31", "tz": "America/New_York"}
+    ).json()
+
+    assert data["minutes"][5][9] == 10
+    assert data["minutes"][0][9] == 20
@@ -0,0 +1,59 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.models.activity import ActivityTag
+from app.services.tags import rebuild_activity_tags
+from conftest import create_activity
+
+
+def stored_tags(session: Session):
+    return sorted(session.exec(select(ActivityTag.activity_id, ActivityTag.tag)).all())
+
+
+def test_tag_index_follows_writes(authenticated_client: TestClient, session: Session):
+    first = create_activity(authenticated_client, "First", tags=["deep", "focus", "deep"])
+    second = create_activity(authenticated_client, "Second", tags=["focus"])
+    assert stored_tags(session) == [(first["id"], "deep"), (first["id"], "focus"), (second["id"], "focus")]
+
+    authenticated_client.put(f"/activities/{first['id']}", json={"tags": ["reading"]})
+    authenticated_client.delete(f"/activities/{second['id']}")
+    assert stored_tags(session) == [(first["id"], "reading")]
+
+
+def test_filter_activities_by_tag(authenticated_client: TestClient):
+    create_activity(authenticated_client, "Tagged", tags=["deep"])
+    create_activity(authenticated_client, "Other", tags=["shallow"])
+    response = authenticated_client.post(
+        "/activities/bulk",
+        json=[{"title": "Bulk tagged", "activity_type": "STUDY", "duration_minutes": 10, "tags": ["deep"]}]
+    )
+    assert response.json()["inserted"] == 1
+
+    response = authenticated_client.get("/activities/", params={"tag": "deep"})
+    assert response.status_code == 200
+    assert sorted(activity["title"] for activity in response.json()) == ["Bulk tagged", "Tagged"]
+
+    assert authenticated_client.get("/activities/", params={"tag": "missing"}).json() == []
+
+
+def test_tag_stats(authenticated_client: TestClient):
+    create_activity(authenticated_client, "A", duration=60, tags=["deep", "focus"])
+    create_activity(authenticated_client, "B", duration=15, tags=["focus"])
+    create_activity(authenticated_client, "C", duration=45, tags=[])
+
+    response = authenticated_client.get("/stats/tags")
+    assert response.status_code == 200
+    assert response.json() == [
+        {"tag": "focus", "count": 2, "minutes": 75},
+        {"tag": "deep", "count": 1, "minutes": 60},
+    ]
+
+
+def test_rebuild_activity_tags(authenticated_client: TestClient, session: Session):
+    first = create_activity(authenticated_client, "A", tags=["deep", "focus"])
+    for row in session.exec(select(ActivityTag)).all():
+        session.delete(row)
+    session.commit()
+
+    assert rebuild_activity_tags(session) == 2
+    assert stored_tags(session) == [(first["id"], "deep"), (first["id"], "focus")]
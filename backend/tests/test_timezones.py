@@ -0,0 +1,131 @@
+import asyncio
+import uuid
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.core.cache import principal_cache
+from app.models.user import User
+
+from app.services.dates import local_midnight_utc, local_today, parse_timezone
+from app.services.principals import principal_key
+from app.services.rollup import check_rollups, rebuild_rollups
+from conftest import create_activity
+
+
+def set_timezone(client: TestClient, name: str) -> dict:
+    response = client.patch("/auth/me", json={"timezone": name})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_register_with_time_zone(client: TestClient):
+    response = client.post(
+        "/auth/register",
+        json={
+            "email": f"tz_{uuid.uuid4().hex[:8]}@test.com",
+            "password": "password123",
+            "full_name": "Zoned User",
+            "timezone": "Asia/Tokyo"
+        }
+    )
+    assert response.status_code == 200
+    assert response.json()["timezone"] == "Asia/Tokyo"
+
+
+def test_rejects_unknown_time_zone(authenticated_client: TestClient):
+    response = authenticated_client.patch("/auth/me", json={"timezone": "Mars/Olympus"})
+    assert response.status_code == 422
+    assert authenticated_client.get("/auth/me").json()["timezone"] == "UTC"
+
+
+def test_changing_time_zone_rebuckets_rollups(authenticated_client: TestClient, session: Session):
+    create_activity(authenticated_client, date="2024-01-01T02:00:00Z", duration=45)
+    params = {"start": "2023-12-31", "end": "2024-01-01"}
+
+    series = authenticated_client.get("/analytics/daily", params=params).json()["series"]
+    assert [point["total_minutes"] for point in series] == [0, 45]
+
+    assert set_timezone(authenticated_client, "America/Sao_Paulo")["timezone"] == "America/Sao_Paulo"
+
+    series = authenticated_client.get("/analytics/daily", params=params).json()["series"]
+    assert [point["total_minutes"] for point in series] == [45, 0]
+    assert check_rollups(session) == []
+
+    create_activity(authenticated_client, date="2024-01-01T01:00:00Z", duration=15)
+    series = authenticated_client.get("/analytics/daily", params=params).json()["series"]
+    assert [point["total_minutes"] for point in series] == [60, 0]
+    assert check_rollups(session) == []
+
+
+def test_writes_use_the_committed_time_zone(authenticated_client: TestClient, session: Session):
+    activity = create_activity(authenticated_client, date="2024-01-01T02:00:00Z", duration=45)
+
+    # A zone change committed after the request resolved its principal (as
+    # an overlapping PATCH /auth/me would) must decide the day of the write.
+    key = principal_key(activity["user_id"])
+    cached = asyncio.run(principal_cache.get_json(key))
+    user = session.exec(select(User).where(User.id == activity["user_id"])).one()
+    user.timezone = "America/Sao_Paulo"
+    session.add(user)
+    session.commit()
+    rebuild_rollups(session, user.id)
+    session.commit()
+    asyncio.run(principal_cache.set_json(key, cached))
+
+    create_activity(authenticated_client, date="2024-01-01T01:00:00Z", duration=15)
+    response = authenticated_client.put(f"/activities/{activity['id']}", json={"duration_minutes": 30})
+    assert response.status_code == 200
+    assert check_rollups(session) == []
+
+    response = authenticated_client.delete(f"/activities/{activity['id']}")
+    assert response.status_code == 200
+    assert check_rollups(session) == []
+
+
+def test_today_follows_the_local_day(authenticated_client: TestClient):
+    zone = parse_timezone("Pacific/Kiritimati")
+    set_timezone(authenticated_client, zone.key)
+
+    local_midnight = local_midnight_utc(local_today(zone), zone)
+    create_activity(authenticated_client, date=local_midnight.isoformat() + "Z", duration=20)
+    create_activity(authenticated_client, date=(local_midnight - timedelta(minutes=1)).isoformat() + "Z", duration=40)
+
+    stats = authenticated_client.get("/stats/").json()
+    assert stats["today_minutes"] == 20
+    assert stats["week_minutes"] == 60
+
+
+def test_list_filters_by_local_day(authenticated_client: TestClient):
+    set_timezone(authenticated_client, "Asia/Tokyo")
+    create_activity(authenticated_client, date="2024-03-01T14:30:00Z")
+    late = create_activity(authenticated_client, date="2024-03-01T15:30:00Z")
+
+    activities = authenticated_client.get("/activities/", params={"day": "2024-03-02"}).json()
+    assert [activity["id"] for activity in activities] == [late["id"]]
+
+
+def test_heatmap_defaults_to_the_user_time_zone(authenticated_client: TestClient):
+    set_timezone(authenticated_client, "Asia/Kolkata")
+    create_activity(authenticated_client, date="2024-01-01T18:45:00Z", duration=20)
+
+    data = authenticated_client.get("/stats/heatmap", params={"start": "2024-01-01", "end": "2024-01-07"}).json()
+    assert data["timezone"] == "Asia/Kolkata"
+    assert data["minutes"][1][0] == 20
+
+
+def test_time_zone_change_commits_with_the_rebuild(authenticated_client: TestClient, session: Session, monkeypatch):
+    create_activity(authenticated_client, date="2024-01-01T02:00:00Z", duration=45)
+
+    def failing_rebuild(sync_session, user_id):
+        rebuild_rollups(sync_session, user_id)
+        raise RuntimeError("rebuild interrupted")
+
+    monkeypatch.setattr("app.api.auth.rebuild_rollups", failing_rebuild)
+    with pytest.raises(RuntimeError):
+        authenticated_client.patch("/auth/me", json={"timezone": "America/Sao_Paulo"})
+
+    assert session.exec(select(User.timezone)).one() == "UTC"
+    assert check_rollups(session) == []
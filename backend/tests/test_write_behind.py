@@ -0,0 +1,156 @@
+import asyncio
+import json
+from datetime import date, datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models.activity import Activity, ActivityCreate
+from app.models.journal import WriteBehindCheckpoint
+from app.models.rollup import UserDailyRollup
+from app.models.user import User
+from app.services import write_behind as write_behind_service
+from app.services.rollup import check_rollups
+from app.services.write_behind import WriteBehindBuffer
+from conftest import count_queries, user_id
+
+
+@pytest.fixture(name="buffer")
+def buffer_fixture(async_engine, tmp_path):
+    return WriteBehindBuffer(async_engine, str(tmp_path / "write_behind.journal"), batch_size=2, flush_interval=60, fsync=False)
+
+
+def test_respond_async_create_is_acknowledged_then_flushed(authenticated_client: TestClient, buffer, session: Session, monkeypatch):
+    monkeypatch.setattr(settings, "write_behind_enabled", True)
+    monkeypatch.setattr(write_behind_service, "write_behind", buffer)
+    buffer.open()
+    asyncio.run(buffer.replay())
+
+    payloads = [{"title": f"Queued {i}", "activity_type": "WORK", "duration_minutes": 15, "tags": ["deep"]} for i in range(3)]
+    for index, payload in enumerate(payloads, start=1):
+        response = authenticated_client.post("/activities/", json=payload, headers={"Prefer": "respond-async"})
+        assert response.status_code == 202
+        assert response.headers["preference-applied"] == "respond-async"
+        assert response.json()["sequence"] == index
+        assert response.json()["activity"]["title"] == payload["title"]
+
+    assert authenticated_client.get("/activities/").json() == []
+    assert authenticated_client.post("/activities/", json=payloads[0]).status_code == 201
+
+    assert asyncio.run(buffer.flush()) == 3
+    buffer._file.close()
+
+    activities = authenticated_client.get("/activities/", params={"tag": "deep"}).json()
+    assert len(activities) == 4
+    assert authenticated_client.get("/stats/").json()["total_activities"] == 4
+    assert check_rollups(session, user_id(authenticated_client)) == []
+    assert session.get(WriteBehindCheckpoint, buffer.path).seq == 3
+    assert open(buffer.path, "rb").read() == b""
+
+
+def test_replay_inserts_only_records_past_the_checkpoint(authenticated_client: TestClient, buffer, session: Session):
+    owner = user_id(authenticated_client)
+    buffer.open()
+    with open(buffer.path, "w") as journal:
+        for seq in (1, 2, 3):
+            activity = {"title": f"Journaled {seq}", "activity_type": "STUDY", "duration_minutes": 5}
+            journal.write(json.dumps({"seq": seq, "user_id": owner, "activity": activity}) + "\n")
+        journal.write('{"seq": 4, "user_id": ')
+
+    # Records 1 and 2 were committed before the crash, but the journal was
+    # not truncated yet.
+    session.add(WriteBehindCheckpoint(journal=buffer.path, seq=2))
+    session.commit()
+
+    async def restart():
+        await buffer.start()
+        sequence = await buffer.submit(owner, ActivityCreate(title="After restart", activity_type="WORK", duration_minutes=1))
+        await buffer.stop()
+        return sequence
+
+    assert asyncio.run(restart()) == 4
+    titles = session.exec(select(Activity.title).where(Activity.user_id == owner)).all()
+    assert sorted(titles) == ["After restart", "Journaled 3"]
+
+
+def test_stop_flushes_pending_creates(authenticated_client: TestClient, buffer, session: Session):
+    owner = user_id(authenticated_client)
+
+    async def run():
+        await buffer.start()
+        await asyncio.gather(*(
+            buffer.submit(owner, ActivityCreate(title=f"Burst {i}", activity_type="WORK", duration_minutes=1))
+            for i in range(5)
+        ))
+        await buffer.stop()
+
+    asyncio.run(run())
+    assert buffer.stats()["pending"] == 0
+    assert len(session.exec(select(Activity).where(Activity.user_id == owner)).all()) == 5
+    assert session.get(WriteBehindCheckpoint, buffer.path).seq == 5
+
+
+def test_workers_sharing_a_journal_path_keep_separate_journals(authenticated_client: TestClient, async_engine, tmp_path, session: Session):
+    owner = user_id(authenticated_client)
+    path = str(tmp_path / "write_behind.journal")
+    first, second, restarted = (
+        WriteBehindBuffer(async_engine, path, batch_size=10, flush_interval=60, fsync=False) for _ in range(3)
+    )
+
+    def create(title: str) -> ActivityCreate:
+        return ActivityCreate(title=title, activity_type="WORK", duration_minutes=1)
+
+    async def run():
+        first.open()
+        second.open()
+        assert first.path != second.path
+
+        assert await first.submit(owner, create("First")) == 1
+        assert await second.submit(owner, create("Second")) == 1
+
+        # Compacting the first journal leaves the second one's unflushed
+        # record in place; then the second worker dies before flushing.
+        assert await first.flush() == 1
+        assert open(second.path, "rb").read() != b""
+        second._file.close()
+        await first.stop()
+
+        await restarted.start()
+        assert restarted.path == first.path
+        await restarted.stop()
+
+    asyncio.run(run())
+    titles = session.exec(select(Activity.title).where(Activity.user_id == owner)).all()
+    assert sorted(titles) == ["First", "Second"]
+    assert session.get(WriteBehindCheckpoint, first.path).seq == 1
+    assert session.get(WriteBehindCheckpoint, second.path).seq == 1
+    assert open(second.path, "rb").read() == b""
+
+
+def test_batch_of_several_users_is_inserted_together(authenticated_client: TestClient, async_engine, buffer, session: Session):
+    owner = user_id(authenticated_client)
+    other = User(email="kiritimati@test.com", timezone="Pacific/Kiritimati")
+    session.add(other)
+    session.commit()
+    moment = datetime(2024, 3, 10, 12, tzinfo=timezone.utc)
+
+    async def run():
+        buffer.open()
+        for owner_id in (owner, other.id):
+            for i in range(2):
+                await buffer.submit(owner_id, ActivityCreate(title=f"Batched {i}", activity_type="WORK", duration_minutes=10, date=moment))
+        with count_queries(async_engine) as statements:
+            assert await buffer.flush() == 4
+        buffer._file.close()
+        return statements
+
+    buffer.batch_size = 4
+    statements = asyncio.run(run())
+    assert sum(statement.startswith("INSERT INTO activity ") for statement in statements) == 1
+    assert sum(statement.startswith("INSERT INTO user_daily_rollup ") for statement in statements) == 1
+
+    rollups = session.exec(select(UserDailyRollup.user_id, UserDailyRollup.day, UserDailyRollup.minutes)).all()
+    assert sorted(rollups) == [(owner, date(2024, 3, 10), 20), (other.id, date(2024, 3, 11), 20)]
+    assert check_rollups(session) == []
@@ -60,7 +60,7 @@ export default function DashboardPage() {
       </nav>
 
       <main className="max-w-7xl mx-auto py-6 px-4 sm:px-6 lg:px-8">
-        <StatsCards refreshKey={refreshKey} />
+        <StatsCards />
         
         <div className="grid grid-cols-1 lg:grid-cols-2 gap-6 mb-8">
           <div>
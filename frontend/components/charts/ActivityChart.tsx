@@ -6,10 +6,10 @@ import { format, subDays, parseISO } from 'date-fns';
 import { ptBR } from 'date-fns/locale';
 import api from '@/lib/api';
 
-interface Activity {
-  date: string;
-  activity_type: string;
-  duration_minutes: number;
+interface SeriesPoint {
+  bucket: string;
+  total_minutes: number;
+  minutes: { [type: string]: number };
 }
 
 interface ChartData {
@@ -38,10 +38,14 @@ export default function ActivityChart({ refreshKey }: ActivityChartProps) {
 
   const fetchChartData = async () => {
     try {
-      const response = await api.get('/activities');
-      const activities: Activity[] = response.data;
-      const processedData = processActivitiesForChart(activities, timeRange);
-      setChartData(processedData);
+      const end = new Date();
+      const response = await api.get('/analytics/daily', {
+        params: {
+          start: format(subDays(end, timeRange - 1), 'yyyy-MM-dd'),
+          end: format(end, 'yyyy-MM-dd')
+        }
+      });
+      setChartData(response.data.series.map(toChartData));
     } catch (error) {
       console.error('Erro ao buscar dados:', error);
     } finally {
@@ -49,55 +53,19 @@ export default function ActivityChart({ refreshKey }: ActivityChartProps) {
     }
   };
 
-  const processActivitiesForChart = (activities: Activity[], days: number): ChartData[] => {
-    const data: ChartData[] = [];
+  const toChartData = (point: SeriesPoint): ChartData => {
+    const dateFormatted = format(parseISO(point.bucket), 'EEE', { locale: ptBR });
     
-    for (let i = days - 1; i >= 0; i--) {
-      const date = subDays(new Date(), i);
-      const dateStr = format(date, 'yyyy-MM-dd');
-      const dateFormatted = format(date, 'EEE', { locale: ptBR });
-      
-      data.push({
-        date: dateStr,
-        dateFormatted: dateFormatted.charAt(0).toUpperCase() + dateFormatted.slice(1),
-        work: 0,
-        study: 0,
-        exercise: 0,
-        leisure: 0,
-        other: 0,
-        total: 0
-      });
-    }
-
-    activities.forEach(activity => {
-      const activityDate = format(parseISO(activity.date), 'yyyy-MM-dd');
-      const dayData = data.find(d => d.date === activityDate);
-      
-      if (dayData) {
-        const activityTypeLower = activity.activity_type.toLowerCase();
-        
-        switch (activityTypeLower) {
-          case 'work':
-            dayData.work += activity.duration_minutes;
-            break;
-          case 'study':
-            dayData.study += activity.duration_minutes;
-            break;
-          case 'exercise':
-            dayData.exercise += activity.duration_minutes;
-            break;
-          case 'leisure':
-            dayData.leisure += activity.duration_minutes;
-            break;
-          case 'other':
-            dayData.other += activity.duration_minutes;
-            break;
-        }
-        dayData.total += activity.duration_minutes;
-      }
-    });
-
-    return data;
+    return {
+      date: point.bucket,
+      dateFormatted: dateFormatted.charAt(0).toUpperCase() + dateFormatted.slice(1),
+      work: point.minutes.WORK,
+      study: point.minutes.STUDY,
+      exercise: point.minutes.EXERCISE,
+      leisure: point.minutes.LEISURE,
+      other: point.minutes.OTHER,
+      total: point.total_minutes
+    };
   };
 
   const getTypeColor = (type: string) => {
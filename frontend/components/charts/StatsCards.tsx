@@ -1,7 +1,6 @@
 'use client';
 
-import { useState, useEffect } from 'react';
-import api from '@/lib/api';
+import useLiveStats from '@/lib/useLiveStats';
 
 interface StatsData {
   total_activities: number;
@@ -14,28 +13,8 @@ interface StatsData {
   activities_by_type: Record<string, number>;
 }
 
-interface StatsCardsProps {
-  refreshKey?: number;
-}
-
-export default function StatsCards({ refreshKey }: StatsCardsProps) {
-  const [stats, setStats] = useState<StatsData | null>(null);
-  const [loading, setLoading] = useState(true);
-
-  useEffect(() => {
-    fetchStats();
-  }, [refreshKey]);
-
-  const fetchStats = async () => {
-    try {
-      const response = await api.get('/stats');
-      setStats(response.data);
-    } catch (error) {
-      console.error('Erro ao buscar estatísticas:', error);
-    } finally {
-      setLoading(false);
-    }
-  };
+export default function StatsCards() {
+  const stats = useLiveStats<StatsData>();
 
   const getTypeName = (type: string) => {
     const names: Record<string, string> = {
@@ -48,7 +27,7 @@ export default function StatsCards({ refreshKey }: StatsCardsProps) {
     return names[type] || type;
   };
 
-  if (loading) {
+  if (!stats) {
     return (
       <div className="grid grid-cols-1 md:grid-cols-4 gap-6 mb-8">
         {[...Array(4)].map((_, i) => (
@@ -61,8 +40,6 @@ export default function StatsCards({ refreshKey }: StatsCardsProps) {
     );
   }
 
-  if (!stats) return null;
-
   return (
     <div className="grid grid-cols-1 md:grid-cols-4 gap-6 mb-8">
       <div className="bg-white p-6 rounded-lg shadow">
@@ -0,0 +1,78 @@
+import { useEffect, useState } from 'react';
+import api, { API_URL } from '@/lib/api';
+
+type Json = { [key: string]: any };
+
+const RETRY_MS = 5000;
+
+// JSON merge patch (RFC 7386), as carried by the stream's "delta" events.
+function applyPatch(target: object, patch: Json): Json {
+  const result: Json = { ...target };
+  for (const [key, value] of Object.entries(patch)) {
+    if (value === null) {
+      delete result[key];
+    } else if (isObject(value) && isObject(result[key])) {
+      result[key] = applyPatch(result[key], value);
+    } else {
+      result[key] = value;
+    }
+  }
+  return result;
+}
+
+function isObject(value: unknown): value is Json {
+  return typeof value === 'object' && value !== null && !Array.isArray(value);
+}
+
+// Live /stats/ payload from /stats/stream: a full "stats" event on connect,
+// then "delta" events after each change. EventSource cannot send the
+// Authorization header, so every connection asks for a short-lived stream
+// token; a dropped stream reconnects with a new one.
+export default function useLiveStats<T extends object>(): T | null {
+  const [stats, setStats] = useState<T | null>(null);
+
+  useEffect(() => {
+    let source: EventSource | null = null;
+    let retry: ReturnType<typeof setTimeout> | undefined;
+    let closed = false;
+
+    const reconnect = () => {
+      if (!closed) {
+        retry = setTimeout(connect, RETRY_MS);
+      }
+    };
+
+    const connect = async () => {
+      try {
+        const response = await api.post('/stats/stream-token');
+        if (closed) {
+          return;
+        }
+        source = new EventSource(`${API_URL}/stats/stream?token=${encodeURIComponent(response.data.token)}`);
+        source.addEventListener('stats', (event: MessageEvent) => {
+          setStats(JSON.parse(event.data));
+        });
+        source.addEventListener('delta', (event: MessageEvent) => {
+          const patch = JSON.parse(event.data);
+          setStats((current) => current && (applyPatch(current, patch) as T));
+        });
+        source.onerror = () => {
+          source?.close();
+          reconnect();
+        };
+      } catch (error) {
+        console.error('Erro ao conectar às estatísticas ao vivo:', error);
+        reconnect();
+      }
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retry);
+      source?.close();
+    };
+  }, []);
+
+  return stats;
+}